@@ -0,0 +1,212 @@
+"""
+Benchmark das views de leitura: pilha WSGI (síncrona) x ASGI (uvicorn).
+
+Sobe o gunicorn nos dois modos (``SERVER_MODE``, ver gunicorn.conf.py)
+com o mesmo número de workers e, para cada um, abre conexões de
+"clientes lentos" (mandam o pedido um byte por vez e leem a resposta aos
+poucos, como celulares em rede ruim) enquanto clientes normais fazem
+requisições. Mede vazão e latência dos clientes normais.
+
+Um worker síncrono fica preso a cada cliente lento até ele terminar;
+sob ASGI a conexão lenta só ocupa o event loop enquanto há bytes.
+
+Uso (a partir de djangoapp/, com o banco e as variáveis do .env que o
+manage.py usa):
+
+    python -m benchmarks.async_views
+    python -m benchmarks.async_views --slow-clients 100 --path /post/x/
+    python -m benchmarks.async_views --url wsgi=http://127.0.0.1:8000
+
+Precisa do gunicorn e, para o modo asgi, do uvicorn-worker
+(requirements.txt).
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+APP_DIR = Path(__file__).resolve().parents[1]
+MODES = ('wsgi', 'asgi')
+FIRST_PORT = 8765
+
+# Bytes lidos por vez (e a pausa entre leituras) pelos clientes lentos
+SLOW_READ_CHUNK = 1024
+SLOW_READ_PAUSE = 0.05
+
+
+async def fetch(host, port, path, slow=0.0):
+    """
+    Um GET com ``Connection: close``.
+
+    Args:
+        slow: Segundos que o cliente leva para mandar o pedido; acima de
+            zero ele também lê a resposta aos poucos
+
+    Returns:
+        tuple: (status HTTP ou 0 em caso de erro, segundos)
+    """
+    start = time.perf_counter()
+    request = (f'GET {path} HTTP/1.1\r\nHost: {host}\r\n'
+               f'Connection: close\r\n\r\n').encode()
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return 0, time.perf_counter() - start
+    try:
+        if slow:
+            pause = slow / len(request)
+            for index in range(len(request)):
+                writer.write(request[index:index + 1])
+                await writer.drain()
+                await asyncio.sleep(pause)
+        else:
+            writer.write(request)
+            await writer.drain()
+
+        status_line = await reader.readline()
+        while True:
+            chunk = await reader.read(SLOW_READ_CHUNK if slow else 65536)
+            if not chunk:
+                break
+            if slow:
+                await asyncio.sleep(SLOW_READ_PAUSE)
+        status = int(status_line.split()[1]) if status_line else 0
+    except (OSError, ValueError, IndexError):
+        status = 0
+    finally:
+        writer.close()
+    return status, time.perf_counter() - start
+
+
+async def run_load(url, path, requests, concurrency, slow_clients,
+                   slow_seconds):
+    """
+    Clientes lentos + ``requests`` GETs normais, ``concurrency`` por vez.
+
+    Returns:
+        dict: Resultados dos clientes normais e quantos lentos terminaram
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    # Primeira requisição fora da medição (cache de página, conexões)
+    await fetch(host, port, path)
+
+    slow_tasks = [
+        asyncio.create_task(fetch(host, port, path, slow=slow_seconds))
+        for _ in range(slow_clients)
+    ]
+    # Os lentos conectam primeiro, como em um pico de tráfego móvel
+    await asyncio.sleep(min(1.0, slow_seconds / 2))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fast():
+        async with semaphore:
+            return await fetch(host, port, path)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(fast() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    slow_results = await asyncio.gather(*slow_tasks)
+
+    latencies = sorted(seconds for status, seconds in results
+                       if status == 200)
+    return {
+        'ok': len(latencies),
+        'errors': requests - len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else 0,
+        'p50': statistics.median(latencies) if latencies else None,
+        'p95': (latencies[int(len(latencies) * 0.95) - 1]
+                if latencies else None),
+        'slow_ok': sum(1 for status, _ in slow_results if status == 200),
+    }
+
+
+def start_server(mode, port, workers):
+    env = dict(os.environ, SERVER_MODE=mode,
+               GUNICORN_BIND=f'127.0.0.1:{port}',
+               WEB_CONCURRENCY=str(workers))
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+        cwd=APP_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(url, timeout=30):
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status, _ = await fetch(parts.hostname, parts.port, '/')
+        if status:
+            return True
+        await asyncio.sleep(0.2)
+    return False
+
+
+def _ms(seconds):
+    return '-' if seconds is None else f'{seconds * 1000:.0f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--path', default='/',
+                        help='Página medida (padrão: a home).')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Requisições dos clientes normais.')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='Clientes normais ao mesmo tempo.')
+    parser.add_argument('--slow-clients', type=int, default=50,
+                        help='Conexões lentas abertas durante a medição.')
+    parser.add_argument('--slow-seconds', type=float, default=5.0,
+                        help='Tempo que cada cliente lento leva no pedido.')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='Workers do gunicorn em cada modo.')
+    parser.add_argument('--url', action='append', default=[],
+                        metavar='MODO=URL',
+                        help='Usa um servidor já rodando em vez de subir '
+                             'o gunicorn (ex.: asgi=http://127.0.0.1:8000).')
+    args = parser.parse_args()
+
+    targets = dict(item.split('=', 1) for item in args.url)
+    print(f'{args.requests} requisições a {args.path} ({args.concurrency} '
+          f'por vez) com {args.slow_clients} clientes lentos de '
+          f'{args.slow_seconds:g}s; {args.workers} workers\n')
+    header = (f'{"modo":<6}{"ok":>6}{"erros":>7}{"req/s":>9}'
+              f'{"p50 (ms)":>10}{"p95 (ms)":>10}{"lentos ok":>11}')
+    print(header)
+    print('-' * len(header))
+
+    for index, mode in enumerate(MODES):
+        if args.url and mode not in targets:
+            continue
+        server = None
+        url = targets.get(mode)
+        if url is None:
+            url = f'http://127.0.0.1:{FIRST_PORT + index}'
+            server = start_server(mode, FIRST_PORT + index, args.workers)
+        try:
+            if not asyncio.run(wait_ready(url)):
+                print(f'{mode:<6} servidor não respondeu em {url}')
+                continue
+            result = asyncio.run(run_load(
+                url, args.path, args.requests, args.concurrency,
+                args.slow_clients, args.slow_seconds))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+        print(f'{mode:<6}{result["ok"]:>6}{result["errors"]:>7}'
+              f'{result["rps"]:>9.1f}{_ms(result["p50"]):>10}'
+              f'{_ms(result["p95"]):>10}'
+              f'{result["slow_ok"]:>7}/{args.slow_clients:<3}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmark do resize_image: implementação antiga x decodificação reduzida.
+
+Cada execução roda em um processo novo, para que o pico de memória (RSS)
+medido seja só o daquela imagem. Os arquivos são copiados para uma pasta
+temporária antes (o resize grava por cima do original).
+
+Uso (a partir de djangoapp/):
+
+    python -m benchmarks.resize_image                   # ../media/posts
+    python -m benchmarks.resize_image --width 320 foto.jpg
+    python -m benchmarks.resize_image --synthetic 6000x4000
+
+Não precisa do Django configurado.
+"""
+
+import argparse
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image  # type: ignore
+
+DEFAULT_SAMPLES = Path(__file__).resolve().parents[2] / 'media' / 'posts'
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.webp', '.gif'}
+
+
+def legacy_resize(image_path, new_width, optimize=True, quality=60):
+    """
+    Implementação anterior: decodifica a imagem inteira e aplica o
+    LANCZOS direto do tamanho original.
+    """
+    with Image.open(image_path) as img:
+        original_width, original_height = img.size
+        if original_width <= new_width:
+            return
+        new_height = round(new_width * original_height / original_width)
+        new_image = img.resize((new_width, new_height), Image.LANCZOS)
+        save_kwargs = {'optimize': optimize}
+        if img.format and img.format.lower() in ['jpeg', 'jpg']:
+            save_kwargs['quality'] = quality
+            save_kwargs['progressive'] = True
+        new_image.save(image_path, format=img.format, **save_kwargs)
+
+
+def reduced_resize(image_path, new_width):
+    from utils.images import resize_image_file
+    resize_image_file(image_path, new_width, max_pixels=10 ** 9)
+
+
+IMPLEMENTATIONS = {
+    'antiga': legacy_resize,
+    'reduzida': reduced_resize,
+}
+
+
+def _peak_rss_mb():
+    """
+    Pico de RSS do processo atual.
+
+    No Linux usa o VmHWM do /proc, que começa do zero no exec (o
+    ru_maxrss herdaria o pico do processo pai).
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_child(implementation, path, width):
+    """
+    Executado no processo filho: mede uma única chamada.
+    """
+    # Importa antes de medir, para o tempo ser só o do resize
+    import utils.images  # noqa: F401
+
+    func = IMPLEMENTATIONS[implementation]
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    func(Path(path), width)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'seconds': elapsed,
+        'peak_rss_mb': _peak_rss_mb() - baseline,
+    }))
+
+
+def measure(implementation, source, width, workdir):
+    copy = workdir / f'{implementation}-{source.name}'
+    shutil.copyfile(source, copy)
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.resize_image', '--child',
+         implementation, str(copy), str(width)],
+        capture_output=True, text=True, check=True,
+        cwd=Path(__file__).resolve().parents[1],
+    )
+    return json.loads(result.stdout)
+
+
+def make_synthetic(size, workdir):
+    width, height = (int(value) for value in size.lower().split('x'))
+    path = workdir / f'sintetica-{width}x{height}.jpg'
+    # Ruído comprime mal: o JPEG fica grande como uma foto de câmera
+    Image.effect_noise((width, height), 64).convert('RGB').save(
+        path, quality=90)
+    return path
+
+
+def collect(paths):
+    files = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files += sorted(
+                item for item in path.rglob('*')
+                if item.suffix.lower() in IMAGE_SUFFIXES
+            )
+        elif path.exists():
+            files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('paths', nargs='*', default=[str(DEFAULT_SAMPLES)])
+    parser.add_argument('--width', type=int, default=320,
+                        help='Largura de destino (padrão: 320).')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Execuções por imagem; vale a mediana.')
+    parser.add_argument('--synthetic', action='append', default=[],
+                        metavar='LxA', help='Gera uma foto LxA para o teste.')
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        implementation, path, width = args.child
+        run_child(implementation, path, int(width))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        files = collect(args.paths)
+        files += [make_synthetic(size, workdir) for size in args.synthetic]
+        if not files:
+            parser.error('Nenhuma imagem encontrada.')
+
+        header = (f'{"arquivo":<34} {"tamanho":>11} {"impl.":<9}'
+                  f'{"tempo (ms)":>11} {"pico RSS (MB)":>14}')
+        print(f'Largura de destino: {args.width}px, '
+              f'mediana de {args.repeat} execuções; pico de RSS acima do '
+              f'processo já com o Pillow carregado\n')
+        print(header)
+        print('-' * len(header))
+
+        for source in files:
+            with Image.open(source) as img:
+                size = f'{img.width}x{img.height}'
+            for implementation in IMPLEMENTATIONS:
+                runs = sorted(
+                    (measure(implementation, source, args.width, workdir)
+                     for _ in range(args.repeat)),
+                    key=lambda run: run['seconds'],
+                )
+                median = runs[len(runs) // 2]
+                peak = max(run['peak_rss_mb'] for run in runs)
+                print(f'{source.name[:34]:<34} {size:>11} {implementation:<9}'
+                      f'{median["seconds"] * 1000:>11.1f} {peak:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from blog.models import Tag, Category, Page, Post
+from blog.tags import set_post_tags
 from django_summernote.admin import SummernoteModelAdmin  # type: ignore
 
 
@@ -71,3 +72,13 @@ class PostAdmin(SummernoteModelAdmin):
 
         # Chama o método original para salvar o objeto no banco
         super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        """
+        Aplica as tags com a mesma diferença (um remove e um add) usada
+        pelo formulário do site, em vez do set() padrão do admin.
+        """
+        tags = form.cleaned_data.pop('tags', None)
+        super().save_related(request, form, formsets, change)
+        if tags is not None:
+            set_post_tags(form.instance, tags)
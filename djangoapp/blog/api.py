@@ -0,0 +1,373 @@
+"""
+API JSON somente leitura (``/api/...``) para o app e o front estático.
+
+- Posts: lista (e por categoria, tag ou autor), detalhe e exportação.
+  A visibilidade é a mesma da página do post (``visible_to``): visitantes
+  veem os publicados; o autor logado também vê os próprios rascunhos.
+- Páginas (publicadas) e categorias.
+
+Listas são paginadas por cursor sobre o ``pk`` (``?after=``, como nas
+listagens em HTML, blog/pagination.py): ``{"results": [...], "next":
+url ou null}``, sem OFFSET nem COUNT(*). ``?limit=`` vai até
+``API_MAX_LIMIT``.
+
+``?fields=id,title,...`` escolhe os campos da resposta. Só as colunas
+desses campos são lidas (``only``), e os JOINs/prefetch de categoria,
+autor e tags só acontecem quando eles são pedidos.
+
+A exportação (``/api/posts/export/``) devolve todos os posts visíveis em
+um único array JSON escrito aos poucos (``StreamingHttpResponse`` sobre
+``.iterator(chunk_size=EXPORT_CHUNK_SIZE)``): a memória não cresce com o
+número de posts. Sob ASGI o gerador é assíncrono (``.aiterator``): o
+Django leria um gerador síncrono inteiro para a memória antes de enviar.
+"""
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views import View
+
+from .models import Category, Page, Post, Tag
+from .pagination import AFTER_PARAM, decode_cursor, encode_cursor
+
+User = get_user_model()
+
+API_DEFAULT_LIMIT = 20
+API_MAX_LIMIT = 100
+
+# Posts lidos por consulta na exportação
+EXPORT_CHUNK_SIZE = 500
+
+FIELDS_PARAM = 'fields'
+LIMIT_PARAM = 'limit'
+
+
+class ApiError(Exception):
+    """
+    Erro do cliente (parâmetro inválido), respondido como JSON 400.
+    """
+
+
+class ApiField:
+    """
+    Campo da API: as colunas que ele precisa e como ler o valor.
+
+    Args:
+        columns: Campos para o ``only()`` (podem atravessar relações,
+            ex.: ``category__slug``)
+        get: Função ``objeto -> valor``; sem ela, lê o atributo de mesmo
+            nome da primeira coluna
+        related: Relações para o ``select_related``
+        prefetch: Relações para o ``prefetch_related``
+    """
+
+    def __init__(self, *columns, get=None, related=(), prefetch=()):
+        self.columns = columns
+        self.get = get or (lambda obj: getattr(obj, columns[0]))
+        self.related = related
+        self.prefetch = prefetch
+
+
+def _category(post):
+    category = post.category
+    if category is None:
+        return None
+    return {'id': category.pk, 'slug': category.slug, 'name': category.name}
+
+
+def _author(post):
+    author = post.created_by
+    if author is None:
+        return None
+    return {'id': author.pk,
+            'name': author.get_full_name() or author.username}
+
+
+POST_FIELDS = {
+    'id': ApiField('id'),
+    'slug': ApiField('slug'),
+    'title': ApiField('title'),
+    'excerpt': ApiField('excerpt'),
+    'is_published': ApiField('is_published'),
+    'created_at': ApiField('created_at'),
+    'updated_at': ApiField('updated_at'),
+    'url': ApiField('slug', 'is_published',
+                    get=lambda post: post.get_absolute_url()),
+    'cover': ApiField(
+        'cover', get=lambda post: post.cover.url if post.cover else None),
+    'category': ApiField(
+        'category__id', 'category__slug', 'category__name',
+        get=_category, related=('category',)),
+    'author': ApiField(
+        'created_by__id', 'created_by__username', 'created_by__first_name',
+        'created_by__last_name', get=_author, related=('created_by',)),
+    'tags': ApiField(
+        get=lambda post: [
+            {'slug': tag.slug, 'name': tag.name} for tag in post.tags.all()
+        ],
+        prefetch=('tags',)),
+    'content_html': ApiField('content_html'),
+    'content_text': ApiField('content_text'),
+    'word_count': ApiField('word_count'),
+    'reading_time': ApiField(
+        'word_count', get=lambda post: post.reading_time),
+    'toc': ApiField('toc'),
+}
+POST_LIST_FIELDS = ('id', 'slug', 'title', 'excerpt', 'url', 'cover',
+                    'category', 'author', 'created_at', 'updated_at')
+
+PAGE_FIELDS = {
+    'id': ApiField('id'),
+    'slug': ApiField('slug'),
+    'title': ApiField('title'),
+    'url': ApiField(
+        'slug', get=lambda page: reverse('blog:page', args=(page.slug,))),
+    'updated_at': ApiField('updated_at'),
+    'content_html': ApiField('content_html'),
+    'content_text': ApiField('content_text'),
+    'word_count': ApiField('word_count'),
+    'toc': ApiField('toc'),
+}
+PAGE_LIST_FIELDS = ('id', 'slug', 'title', 'url', 'updated_at')
+
+CATEGORY_FIELDS = {
+    'id': ApiField('id'),
+    'slug': ApiField('slug'),
+    'name': ApiField('name'),
+    'post_count': ApiField(
+        'published_post_count',
+        get=lambda category: category.published_post_count),
+    'url': ApiField(
+        'slug',
+        get=lambda category: reverse('blog:category', args=(category.slug,))),
+}
+CATEGORY_LIST_FIELDS = tuple(CATEGORY_FIELDS)
+
+
+def select_fields(queryset, specs, fields):
+    """
+    Restringe o queryset às colunas e relações dos campos pedidos.
+    """
+    columns = {'id'}
+    related = set()
+    prefetch = set()
+    for name in fields:
+        spec = specs[name]
+        columns.update(spec.columns)
+        related.update(spec.related)
+        prefetch.update(spec.prefetch)
+    return queryset.only(*columns).select_related(
+        *related).prefetch_related(*prefetch)
+
+
+def serialize(obj, specs, fields):
+    return {name: specs[name].get(obj) for name in fields}
+
+
+class ApiView(View):
+    """
+    Base das views da API: campos, erros e 404 em JSON.
+
+    As subclasses definem ``field_specs``, ``default_fields`` e o
+    ``queryset`` (ou um ``get_queryset``, como nos generic views).
+    """
+    field_specs = {}
+    default_fields = ()
+    queryset = None
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        except Http404 as error:
+            return JsonResponse(
+                {'error': str(error) or 'Não encontrado.'}, status=404)
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        response = super().http_method_not_allowed(request, *args, **kwargs)
+        return JsonResponse({'error': 'Somente leitura.'},
+                            status=response.status_code,
+                            headers={'Allow': response['Allow']})
+
+    def get_fields(self):
+        """
+        Campos pedidos em ``?fields=`` (ou os padrão da view).
+
+        Raises:
+            ApiError: se algum campo não existe
+        """
+        raw = self.request.GET.get(FIELDS_PARAM, '')
+        fields = [name.strip() for name in raw.split(',') if name.strip()]
+        if not fields:
+            return list(self.default_fields)
+        unknown = [name for name in fields if name not in self.field_specs]
+        if unknown:
+            raise ApiError(
+                f'Campos desconhecidos: {", ".join(unknown)}. '
+                f'Disponíveis: {", ".join(self.field_specs)}.')
+        # Sem repetidos, na ordem pedida
+        return list(dict.fromkeys(fields))
+
+    def get_queryset(self):
+        # .all() para não reaproveitar o cache do queryset da classe
+        return self.queryset.all()
+
+    def get_selected_queryset(self, fields):
+        return select_fields(self.get_queryset(), self.field_specs, fields)
+
+
+class ApiListView(ApiView):
+    """
+    Lista paginada por cursor sobre o pk, do mais novo para o mais velho.
+    """
+
+    def get_limit(self):
+        raw = self.request.GET.get(LIMIT_PARAM)
+        if raw is None:
+            return API_DEFAULT_LIMIT
+        try:
+            limit = int(raw)
+        except ValueError:
+            raise ApiError(f'{LIMIT_PARAM} precisa ser um número.')
+        return min(max(limit, 1), API_MAX_LIMIT)
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        limit = self.get_limit()
+        qs = self.get_selected_queryset(fields).order_by('-pk')
+        after = request.GET.get(AFTER_PARAM)
+        if after:
+            qs = qs.filter(pk__lt=decode_cursor(after))
+
+        # Uma linha a mais diz se há próxima página, sem COUNT(*)
+        rows = list(qs[:limit + 1])
+        next_url = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            params = request.GET.copy()
+            params[AFTER_PARAM] = encode_cursor(rows[-1].pk)
+            next_url = f'{request.path}?{params.urlencode()}'
+
+        return JsonResponse({
+            'results': [
+                serialize(obj, self.field_specs, fields) for obj in rows
+            ],
+            'next': next_url,
+        })
+
+
+class ApiDetailView(ApiView):
+    """
+    Um objeto pelo slug, com todos os campos por padrão.
+    """
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        obj = get_object_or_404(
+            self.get_selected_queryset(fields), slug=kwargs['slug'])
+        return JsonResponse(serialize(obj, self.field_specs, fields))
+
+
+# ===================================================================
+# POSTS
+# ===================================================================
+
+class PostApiMixin:
+    field_specs = POST_FIELDS
+
+    def get_queryset(self):
+        return Post.objects.visible_to(self.request.user)
+
+
+class PostListApi(PostApiMixin, ApiListView):
+    """
+    ``/api/posts/`` e as listas por categoria, tag e autor (pelo
+    argumento da URL).
+    """
+    default_fields = POST_LIST_FIELDS
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if 'category' in self.kwargs:
+            category = get_object_or_404(
+                Category, slug=self.kwargs['category'])
+            qs = qs.filter(category=category)
+        if 'tag' in self.kwargs:
+            tag = get_object_or_404(Tag, slug=self.kwargs['tag'])
+            qs = qs.filter(tags=tag)
+        if 'author' in self.kwargs:
+            author = get_object_or_404(User, pk=self.kwargs['author'])
+            qs = qs.filter(created_by=author)
+        return qs
+
+
+class PostDetailApi(PostApiMixin, ApiDetailView):
+    default_fields = tuple(POST_FIELDS)
+
+
+class PostExportApi(PostApiMixin, ApiView):
+    """
+    Todos os posts visíveis em um array JSON, gerado em streaming.
+    """
+    default_fields = POST_LIST_FIELDS
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        queryset = self.get_selected_queryset(fields).order_by('pk')
+        if isinstance(request, ASGIRequest):
+            # O StreamingHttpResponse do Django 5.2 consome um iterador
+            # síncrono com list() sob ASGI: tudo iria para a memória
+            content = self.astream(queryset, fields)
+        else:
+            content = self.stream(queryset, fields)
+        return StreamingHttpResponse(
+            content, content_type='application/json')
+
+    def encode(self, index, obj, fields):
+        item = json.dumps(
+            serialize(obj, self.field_specs, fields), cls=DjangoJSONEncoder)
+        return f',{item}' if index else item
+
+    def stream(self, queryset, fields):
+        yield '['
+        rows = queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for index, obj in enumerate(rows):
+            yield self.encode(index, obj, fields)
+        yield ']'
+
+    async def astream(self, queryset, fields):
+        yield '['
+        index = 0
+        async for obj in queryset.aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield self.encode(index, obj, fields)
+            index += 1
+        yield ']'
+
+
+# ===================================================================
+# PÁGINAS E CATEGORIAS
+# ===================================================================
+
+class PageApiMixin:
+    field_specs = PAGE_FIELDS
+    queryset = Page.objects.filter(is_published=True)
+
+
+class PageListApi(PageApiMixin, ApiListView):
+    default_fields = PAGE_LIST_FIELDS
+
+
+class PageDetailApi(PageApiMixin, ApiDetailView):
+    default_fields = tuple(PAGE_FIELDS)
+
+
+class CategoryListApi(ApiListView):
+    field_specs = CATEGORY_FIELDS
+    default_fields = CATEGORY_LIST_FIELDS
+    queryset = Category.objects.all()
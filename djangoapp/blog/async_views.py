@@ -0,0 +1,212 @@
+"""
+Versões assíncronas das views de leitura do blog (home, categoria, tag,
+autor, busca, post e página), usadas quando ``BLOG_ASYNC_VIEWS`` está
+ligado (padrão com ``SERVER_MODE=asgi``, ver blog/urls.py).
+
+Sob ASGI uma view síncrona roda em uma thread, e o número de threads
+limita quantas requisições andam ao mesmo tempo. Aqui as consultas usam o
+ORM assíncrono (``aget``, ``acount``, ``async for``) e as idas ao cache
+saem do event loop em ``sync_to_async``; enquanto esperam o banco, o
+worker atende outras requisições (e clientes lentos não prendem nada).
+
+Cada view herda da síncrona de mesmo nome (blog/views.py) e reaproveita
+o contexto, as dependências do cache de página e os validadores do GET
+condicional; só o ``dispatch``, o ``get`` e a busca do objeto da
+listagem são reescritos. O template é
+renderizado fora do event loop (as tags do post e os relacionados são
+consultados nesse momento, como na versão síncrona).
+"""
+
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.paginator import InvalidPage
+from django.http import Http404
+from django.shortcuts import aget_object_or_404
+from django.utils.translation import gettext as _
+from django.views import View
+
+from . import page_cache, views
+from .conditional import not_modified, uses_validators
+from .models import Category, Tag
+from .page_cache import AnonymousPageCacheMixin
+from .pagination import AFTER_PARAM, BEFORE_PARAM, KeysetPaginator
+
+User = get_user_model()
+
+
+class AsyncReadMixin:
+    """
+    Cache de página e GET condicional no fluxo assíncrono.
+
+    Faz o papel do ``dispatch`` do ``ConditionalGetMixin`` e do
+    ``AnonymousPageCacheMixin`` (este só se a view síncrona o usa). As
+    subclasses implementam um ``get`` assíncrono que termina em
+    ``arender_to_response``.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            # 405 e OPTIONS como no View.dispatch, sem cache nem validadores
+            return await View.dispatch(self, request, *args, **kwargs)
+
+        # O request.user preguiçoso consultaria a sessão de forma síncrona
+        request.user = await request.auser()
+        self.request_started = time.time_ns()
+
+        key = None
+        if (isinstance(self, AnonymousPageCacheMixin) and
+                page_cache.is_cacheable(request)):
+            key, cached, token = await sync_to_async(page_cache.lookup)(
+                request)
+            if cached is not None:
+                return self.check_validators(request, cached)
+
+        created = time.time_ns()
+        try:
+            response = await self.get(request, *args, **kwargs)
+        except Exception:
+            if key is not None:
+                await sync_to_async(page_cache.release)(key, token)
+            raise
+        if key is not None:
+            # O template é renderizado aqui (e não pelo Django depois), para
+            # a trava ser liberada mesmo se ele falhar
+            await sync_to_async(page_cache.render_and_store)(
+                response, key, token, self.get_cache_dependencies, created)
+        return self.check_validators(request, response)
+
+    @staticmethod
+    def check_validators(request, response):
+        if not uses_validators(request):
+            return response
+        return not_modified(request, response)
+
+    async def arender_to_response(self, context):
+        if uses_validators(self.request):
+            # Os carimbos vêm do cache: lidos fora do event loop e
+            # entregues ao render_to_response do ConditionalGetMixin
+            self.validators = await sync_to_async(
+                self.compute_validators)(context)
+        return self.render_to_response(context)
+
+    def get_validators(self, context):
+        return self.validators
+
+
+class AsyncPostListMixin(AsyncReadMixin):
+    """
+    Listagens de posts: a página é buscada antes do contexto.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        await self.aload_listing_object()
+        # O 304 das listagens sai antes da consulta da página
+        response = await sync_to_async(self.get_early_response)()
+        if response is not None:
+            return response
+        self.object_list = self.get_queryset()
+        self.pagination = await self.apaginate_queryset(
+            self.object_list, self.get_paginate_by(self.object_list))
+        return await self.arender_to_response(self.get_context_data())
+
+    async def aload_listing_object(self):
+        """
+        Versão assíncrona do ``load_listing_object``.
+        """
+
+    def paginate_queryset(self, queryset, page_size):
+        # Já buscada no get(), com o ORM assíncrono
+        return self.pagination
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """
+        O ``paginate_queryset`` da ``PostListViewBase`` (e do ListView),
+        com as consultas assíncronas.
+
+        Raises:
+            Http404: se a página ou o cursor não são válidos
+        """
+        if self.keyset_pagination:
+            paginator = KeysetPaginator(queryset, page_size)
+            page = await paginator.aget_page(
+                after=self.request.GET.get(AFTER_PARAM),
+                before=self.request.GET.get(BEFORE_PARAM),
+                params=self.request.GET,
+            )
+            return paginator, page, page, page.has_other_pages()
+
+        paginator = self.get_paginator(
+            queryset, page_size, orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty())
+        await paginator.acount()
+        page = (self.kwargs.get(self.page_kwarg) or
+                self.request.GET.get(self.page_kwarg) or 1)
+        try:
+            page_number = int(page)
+        except ValueError:
+            if page != 'last':
+                raise Http404(_('Page is not “last”, nor can it be '
+                                'converted to an int.'))
+            page_number = paginator.num_pages
+        try:
+            page = await paginator.apage(page_number)
+        except InvalidPage as error:
+            raise Http404(_('Invalid page (%(page_number)s): %(message)s') % {
+                'page_number': page_number, 'message': str(error)})
+        return paginator, page, page, page.has_other_pages()
+
+
+class AsyncDetailMixin(AsyncReadMixin):
+    """
+    Post ou página pelo slug.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        self.object = await aget_object_or_404(
+            self.get_queryset(),
+            **{self.get_slug_field(): self.kwargs.get(self.slug_url_kwarg)})
+        context = self.get_context_data(object=self.object)
+        return await self.arender_to_response(context)
+
+
+# ===================================================================
+# VIEWS DE LISTAGEM
+# ===================================================================
+
+class IndexView(AsyncPostListMixin, views.IndexView):
+    pass
+
+
+class CategoryView(AsyncPostListMixin, views.CategoryView):
+    async def aload_listing_object(self):
+        self.category = await aget_object_or_404(
+            Category, slug=self.kwargs.get('slug'))
+
+
+class TagView(AsyncPostListMixin, views.TagView):
+    async def aload_listing_object(self):
+        self.tag = await aget_object_or_404(Tag, slug=self.kwargs.get('slug'))
+
+
+class CreatedByView(AsyncPostListMixin, views.CreatedByView):
+    async def aload_listing_object(self):
+        self.author = await aget_object_or_404(
+            User.objects.select_related('post_stats'), pk=self.kwargs.get('id'))
+
+
+class SearchView(AsyncPostListMixin, views.SearchView):
+    pass
+
+
+# ===================================================================
+# VIEWS DE DETALHE
+# ===================================================================
+
+class PageDetailView(AsyncDetailMixin, views.PageDetailView):
+    pass
+
+
+class PostDetailView(AsyncDetailMixin, views.PostDetailView):
+    pass
@@ -0,0 +1,70 @@
+"""
+Coleta de lixo dos anexos do editor (manage.py gc_attachments).
+
+O Summernote grava o arquivo assim que ele é inserido no editor, e nada o
+apaga quando a imagem sai do texto (ou o post nunca é salvo). Aqui são
+encontrados os ``PostAttachment`` cujo arquivo não aparece no
+``content`` de nenhum Post ou Page.
+
+Os textos são lidos em blocos (``iterator``), sem carregar todos os posts
+na memória; só o conjunto dos arquivos citados fica guardado.
+"""
+
+import re
+from datetime import timedelta
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Page, Post, PostAttachment
+
+# Posts lidos por consulta ao percorrer os textos
+CONTENT_CHUNK_SIZE = 200
+
+# Anexos mais novos que isso podem estar em um post ainda não salvo
+DEFAULT_GRACE_PERIOD = timedelta(days=7)
+
+
+def _media_url_pattern():
+    # Pega o caminho depois do MEDIA_URL em src/href, relativo ou com o
+    # domínio (ex.: https://site/media/django-summernote/ab/abcd.jpg)
+    return re.compile(
+        re.escape(settings.MEDIA_URL) + r'''([^"'\s<>?#)]+)''')
+
+
+def referenced_media(querysets=None):
+    """
+    Arquivos de mídia citados no ``content`` dos posts e páginas.
+
+    Returns:
+        set: Nomes relativos ao MEDIA_ROOT
+    """
+    if querysets is None:
+        querysets = (Post.objects.all(), Page.objects.all())
+    pattern = _media_url_pattern()
+    names = set()
+    for queryset in querysets:
+        contents = queryset.values_list('content', flat=True).iterator(
+            chunk_size=CONTENT_CHUNK_SIZE)
+        for content in contents:
+            names.update(
+                unquote(match) for match in pattern.findall(content or ''))
+    return names
+
+
+def unreferenced_attachments(grace_period=DEFAULT_GRACE_PERIOD):
+    """
+    Anexos que nenhum texto usa, enviados há mais de ``grace_period``.
+
+    Returns:
+        list: ``PostAttachment`` órfãos, dos mais antigos aos mais novos
+    """
+    referenced = referenced_media()
+    candidates = PostAttachment.objects.filter(
+        uploaded__lt=timezone.now() - grace_period,
+    ).only('pk', 'name', 'file', 'uploaded').order_by('uploaded', 'pk')
+    return [
+        attachment for attachment in candidates.iterator()
+        if attachment.file.name not in referenced
+    ]
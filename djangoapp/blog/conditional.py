@@ -0,0 +1,211 @@
+"""
+GET condicional (ETag / Last-Modified) nas páginas públicas do blog.
+
+Visitantes que voltam e crawlers mandam ``If-None-Match`` /
+``If-Modified-Since``; se nada mudou desde a última visita respondemos
+``304 Not Modified`` sem renderizar o template.
+
+Os validadores saem do que a view já sabe antes de renderizar:
+
+- o ``updated_at`` do post/página (ou de cada post da página listada);
+- a versão do SiteSetup (menu, título e favicon em todas as páginas);
+- os carimbos das dependências do cache de página (blog/page_cache.py),
+  que mudam sempre que um post, categoria, tag ou autor exibido é
+  alterado.
+
+Nas listagens os validadores saem só do pk e do ``updated_at`` dos posts
+da página pedida (``get_validators_context``): o 304 não lê as colunas
+dos cards nem conta os posts.
+
+O ETag é fraco (``W/"..."``): ele garante o mesmo conteúdo, não os
+mesmos bytes (o token CSRF, por exemplo, muda entre respostas).
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+from site_setup.cache import get_version as get_site_setup_version
+
+from . import page_cache
+
+
+def weak_etag(*parts):
+    """
+    Monta um ETag fraco a partir das partes, ex.: ``W/"3f2a..."``.
+    """
+    raw = '|'.join(str(part) for part in parts)
+    return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def uses_validators(request):
+    """
+    Só GET/HEAD de visitantes anônimos usam ETag/Last-Modified.
+
+    As páginas dos usuários logados mudam com coisas que os validadores
+    não enxergam (mensagens, rascunhos, o próprio usuário).
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    user = getattr(request, 'user', None)
+    return not (user and user.is_authenticated)
+
+
+def not_modified(request, response):
+    """
+    Responde 304 se a resposta pronta (ex.: vinda do cache de página)
+    tem os mesmos validadores que o navegador enviou.
+    """
+    if response.status_code != 200 or not response.has_header('ETag'):
+        return response
+    return get_conditional_response(
+        request,
+        etag=response['ETag'],
+        last_modified=parse_http_date_safe(
+            response.get('Last-Modified', '')),
+        response=response,
+    )
+
+
+def set_validators(response, etag, last_modified):
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    # Sem isso o navegador pode reaproveitar a página por um tempo
+    # "heurístico" (proporcional à idade do Last-Modified) sem perguntar
+    # ao servidor, e mostrar uma edição atrasada.
+    patch_cache_control(response, no_cache=True)
+
+
+def serve_cached(request, build):
+    """
+    Entrega uma resposta que não depende do usuário (feeds, sitemaps)
+    pelo cache de página, com ETag do conteúdo e 304.
+
+    Diferente das páginas, aqui os validadores saem do corpo pronto: ele
+    é barato de guardar e o ETag (hash) não muda quando a resposta é
+    gerada de novo com o mesmo conteúdo.
+
+    Args:
+        request: A requisição
+        build: Função sem argumentos que gera a resposta e devolve
+            ``(response, deps, last_modified)``; ``last_modified`` é um
+            timestamp em segundos (ou None)
+
+    Returns:
+        HttpResponse: A resposta (do cache ou nova) ou um 304
+    """
+    key = token = None
+    if settings.BLOG_PAGE_CACHE and request.method in ('GET', 'HEAD'):
+        # O corpo tem URLs absolutas, então o domínio entra na chave
+        key, cached, token = page_cache.lookup(
+            request, request.build_absolute_uri('/'))
+        if cached is not None:
+            return not_modified(request, cached)
+
+    created = time.time_ns()
+    try:
+        response, deps, last_modified = build()
+        response.headers['ETag'] = (
+            f'"{hashlib.md5(response.content).hexdigest()}"')
+        if last_modified is not None:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        if key is not None:
+            page_cache.store_response(key, response, deps, created)
+    finally:
+        page_cache.release(key, token)
+    return not_modified(request, response)
+
+
+class ConditionalGetMixin:
+    """
+    Mixin para views baseadas em template que responde GETs condicionais.
+
+    Usa o ``get_cache_dependencies(context)`` da view (o mesmo do cache
+    de página) e o ``get_modified_objects(context)``, que devolve os
+    objetos exibidos (com ``pk`` e ``updated_at``). Deve vir antes do
+    ``AnonymousPageCacheMixin``, para também validar as respostas que
+    vêm do cache.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        # Carimbo dado às dependências ainda sem versão: anterior ao
+        # início da requisição, como no store_response do cache de página
+        self.request_started = time.time_ns()
+        response = super().dispatch(request, *args, **kwargs)
+        if not uses_validators(request):
+            return response
+        return not_modified(request, response)
+
+    def get_modified_objects(self, context):
+        return []
+
+    def get_early_response(self):
+        """
+        304 sem a consulta principal nem o template, para as views que
+        chamam este método antes dela e implementam
+        ``get_validators_context()``: o contexto mínimo para os
+        validadores (ex.: só o pk e o updated_at da página de uma
+        listagem), ou None se eles só saem do contexto completo.
+
+        Returns:
+            HttpResponse | None: O 304, ou None para seguir normalmente
+        """
+        if not uses_validators(self.request):
+            return None
+        context = self.get_validators_context()
+        if context is None:
+            return None
+        etag, last_modified = self.compute_validators(context)
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            set_validators(response, etag, last_modified)
+        return response
+
+    def get_validators(self, context):
+        return self.compute_validators(context)
+
+    def compute_validators(self, context):
+        """
+        Calcula os validadores da página antes de renderizá-la.
+
+        Returns:
+            tuple: (ETag, Last-Modified como timestamp em segundos)
+        """
+        site_version = get_site_setup_version()
+        versions = page_cache.get_versions(
+            self.get_cache_dependencies(context),
+            missing_version=self.request_started - 1)
+        objects = [
+            (obj.pk, obj.updated_at)
+            for obj in self.get_modified_objects(context)
+        ]
+
+        etag = weak_etag(
+            self.request.path,
+            self.request.META.get('QUERY_STRING', ''),
+            site_version,
+            *sorted(f'{name}={version}' for name, version in versions.items()),
+            *(f'{pk}@{updated_at.isoformat()}' for pk, updated_at in objects),
+        )
+
+        stamps = [int(site_version) // 10**9]
+        stamps += [version // 10**9 for version in versions.values()]
+        stamps += [int(updated_at.timestamp()) for _, updated_at in objects]
+        return etag, max(stamps)
+
+    def render_to_response(self, context, **response_kwargs):
+        if not uses_validators(self.request):
+            return super().render_to_response(context, **response_kwargs)
+
+        etag, last_modified = self.get_validators(context)
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().render_to_response(context, **response_kwargs)
+        set_validators(response, etag, last_modified)
+        return response
@@ -0,0 +1,228 @@
+"""
+Processamento do conteúdo dos posts e páginas, feito uma vez no save.
+
+O ``content`` vem do Summernote como HTML. ``render_content`` devolve o
+que os templates precisam, para nada disso ser recalculado a cada
+visualização:
+
+- ``html``: o mesmo HTML com ``loading="lazy"``/``decoding="async"`` nas
+  imagens e um ``id`` em cada título (âncoras do sumário);
+- ``text``: o texto puro (sem tags, scripts e estilos);
+- ``word_count``: número de palavras do texto;
+- ``toc``: sumário, lista de ``{'level', 'id', 'title'}`` dos títulos.
+
+O HTML é reescrito token a token (``html.parser``): o que não é imagem
+nem título sai exatamente como entrou.
+"""
+
+import re
+from html import escape, unescape
+from html.parser import HTMLParser
+
+from django.utils.text import slugify
+from unidecode import unidecode
+
+# Títulos que recebem âncora e entram no sumário
+TOC_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4}
+
+# Atributos acrescentados às imagens (se o autor já não definiu)
+IMAGE_ATTRS = (('loading', 'lazy'), ('decoding', 'async'))
+
+# Palavras por minuto para o tempo de leitura
+WORDS_PER_MINUTE = 200
+
+# Conteúdo que não é texto visível
+_SKIPPED_TAGS = {'script', 'style', 'template'}
+
+# Tags que separam palavras no texto puro (<p>a</p><p>b</p> -> "a b")
+_BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl',
+    'dt', 'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5',
+    'h6', 'header', 'hr', 'li', 'ol', 'p', 'pre', 'section', 'table',
+    'td', 'th', 'tr', 'ul',
+}
+
+_WORD_RE = re.compile(r'\w+')
+_SPACES_RE = re.compile(r'\s+')
+
+
+def _render_tag(tag, attrs, self_closing=False):
+    rendered = ''.join(
+        f' {name}' if value is None else f' {name}="{escape(value)}"'
+        for name, value in attrs
+    )
+    return f'<{tag}{rendered}{" /" if self_closing else ""}>'
+
+
+class _ContentParser(HTMLParser):
+
+    def __init__(self):
+        # Entidades (&amp; etc.) chegam separadas e são copiadas como estão
+        super().__init__(convert_charrefs=False)
+        self.output = []
+        self.text = []
+        self.toc = []
+        self.used_ids = set()
+        self.skipping = 0
+        # Título aberto: (tag, posição da tag no output, atributos, texto)
+        self.heading = None
+
+    # --- tags ---
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=True)
+
+    def _start(self, tag, attrs, self_closing):
+        if tag in _SKIPPED_TAGS and not self_closing:
+            self.skipping += 1
+        if tag in _BLOCK_TAGS:
+            self.text.append(' ')
+
+        if tag == 'img':
+            names = {name for name, _ in attrs}
+            missing = [attr for attr in IMAGE_ATTRS if attr[0] not in names]
+            if missing:
+                self.output.append(
+                    _render_tag(tag, [*attrs, *missing], self_closing))
+                return
+        elif tag in TOC_TAGS and self.heading is None and not self_closing:
+            self.heading = (tag, len(self.output), attrs, [])
+
+        self.output.append(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS and self.skipping:
+            self.skipping -= 1
+        if tag in _BLOCK_TAGS:
+            self.text.append(' ')
+        if self.heading and tag == self.heading[0]:
+            self._close_heading()
+        self.output.append(f'</{tag}>')
+
+    def _close_heading(self):
+        tag, position, attrs, parts = self.heading
+        self.heading = None
+        title = _SPACES_RE.sub(' ', ''.join(parts)).strip()
+        if not title:
+            return
+
+        attrs = dict(attrs)
+        anchor = attrs.get('id')
+        if not anchor:
+            anchor = self._unique_id(
+                slugify(unidecode(title)) or 'secao')
+            self.output[position] = _render_tag(
+                tag, [*attrs.items(), ('id', anchor)])
+        self.used_ids.add(anchor)
+        self.toc.append(
+            {'level': TOC_TAGS[tag], 'id': anchor, 'title': title})
+
+    def _unique_id(self, base):
+        anchor, number = base, 2
+        while anchor in self.used_ids:
+            anchor = f'{base}-{number}'
+            number += 1
+        return anchor
+
+    # --- texto ---
+
+    def handle_data(self, data):
+        self.output.append(data)
+        self._add_text(data)
+
+    def handle_entityref(self, name):
+        self.output.append(f'&{name};')
+        self._add_text(unescape(f'&{name};'))
+
+    def handle_charref(self, name):
+        self.output.append(f'&#{name};')
+        self._add_text(unescape(f'&#{name};'))
+
+    def _add_text(self, text):
+        if self.skipping:
+            return
+        self.text.append(text)
+        if self.heading:
+            self.heading[3].append(text)
+
+    # --- o resto sai como entrou ---
+
+    def handle_comment(self, data):
+        self.output.append(f'<!--{data}-->')
+
+    def handle_decl(self, decl):
+        self.output.append(f'<!{decl}>')
+
+    def handle_pi(self, data):
+        self.output.append(f'<?{data}>')
+
+    def unknown_decl(self, data):
+        self.output.append(f'<![{data}]>')
+
+
+def render_content(html):
+    """
+    Processa o HTML do conteúdo.
+
+    Args:
+        html: O ``content`` do Post/Page
+
+    Returns:
+        dict: 'html', 'text', 'word_count' e 'toc'
+    """
+    parser = _ContentParser()
+    parser.feed(html or '')
+    parser.close()
+    if parser.heading:
+        # Título sem a tag de fechamento no fim do conteúdo
+        parser._close_heading()
+
+    text = _SPACES_RE.sub(' ', ''.join(parser.text)).strip()
+    return {
+        'html': ''.join(parser.output),
+        'text': text,
+        'word_count': len(_WORD_RE.findall(text)),
+        'toc': parser.toc,
+    }
+
+
+def reading_time(word_count):
+    """
+    Minutos de leitura (pelo menos 1).
+    """
+    return max(1, round(word_count / WORDS_PER_MINUTE))
+
+
+# Campos do model preenchidos por ``apply_rendered_content``
+RENDERED_FIELDS = ('content_html', 'content_text', 'word_count', 'toc')
+
+
+def apply_rendered_content(instance, update_fields=None):
+    """
+    Preenche os campos processados do Post/Page a partir do ``content``.
+
+    Args:
+        instance: Post ou Page
+        update_fields: O ``update_fields`` do save, se houver
+
+    Returns:
+        O ``update_fields`` a usar no save (com os campos processados,
+        quando o conteúdo está sendo salvo)
+    """
+    if update_fields is not None and 'content' not in update_fields:
+        return update_fields
+    # Objeto carregado sem o conteúdo (only/defer): nada a processar
+    if 'content' in instance.get_deferred_fields():
+        return update_fields
+
+    rendered = render_content(instance.content)
+    instance.content_html = rendered['html']
+    instance.content_text = rendered['text']
+    instance.word_count = rendered['word_count']
+    instance.toc = rendered['toc']
+    if update_fields is None:
+        return None
+    return {*update_fields, *RENDERED_FIELDS}
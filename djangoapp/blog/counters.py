@@ -0,0 +1,104 @@
+"""
+Contadores desnormalizados de posts publicados.
+
+Category, Tag e AuthorStats guardam ``published_post_count`` para que as
+listagens não precisem rodar ``COUNT(*)`` com JOIN a cada página. Os
+contadores são ajustados com incrementos atômicos (``F()``) pelos signals
+de ``blog/signals.py``; ``rebuild_counters`` recalcula tudo do zero caso
+eles saiam de sincronia (ex.: ``QuerySet.update`` não dispara signals).
+"""
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Category, Post, Tag
+
+
+def _bump(model, ids, delta, pk_field='pk'):
+    """
+    Soma ``delta`` ao contador das linhas com os ids informados.
+
+    O Greatest evita contadores negativos se eles já estiverem
+    dessincronizados (o rebuild corrige o valor depois).
+    """
+    ids = [pk for pk in ids if pk is not None]
+    if not ids or not delta:
+        return
+    model.objects.filter(**{f'{pk_field}__in': ids}).update(
+        published_post_count=Greatest(
+            F('published_post_count') + delta, Value(0))
+    )
+
+
+def bump_categories(ids, delta):
+    _bump(Category, ids, delta)
+
+
+def bump_tags(ids, delta):
+    _bump(Tag, ids, delta)
+
+
+def bump_authors(ids, delta):
+    ids = [pk for pk in ids if pk is not None]
+    if not ids:
+        return
+    # Garante que a linha de contadores do autor exista
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(author_id=pk) for pk in ids], ignore_conflicts=True)
+    _bump(AuthorStats, ids, delta, pk_field='author_id')
+
+
+def _count_subquery(queryset, group_field):
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values(group_field)
+            .annotate(total=Count('pk')).values('total')[:1]
+        ),
+        Value(0),
+    )
+
+
+def rebuild_counters():
+    """
+    Recalcula todos os contadores a partir das tabelas de posts.
+
+    Returns:
+        dict: Quantidade de linhas atualizadas por tipo de contador
+    """
+    published = Post.objects.filter(is_published=True)
+
+    categories = Category.objects.update(
+        published_post_count=_count_subquery(
+            published.filter(category=OuterRef('pk')), 'category')
+    )
+
+    through = Post.tags.through
+    tags = Tag.objects.update(
+        published_post_count=_count_subquery(
+            through.objects.filter(
+                tag=OuterRef('pk'), post__is_published=True),
+            'tag')
+    )
+
+    author_counts = {
+        row['created_by']: row['total']
+        for row in published.filter(created_by__isnull=False)
+        .order_by().values('created_by').annotate(total=Count('pk'))
+    }
+    AuthorStats.objects.bulk_create(
+        [
+            AuthorStats(author_id=author_id, published_post_count=total)
+            for author_id, total in author_counts.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['author'],
+        update_fields=['published_post_count'],
+    )
+    AuthorStats.objects.exclude(
+        author_id__in=author_counts).update(published_post_count=0)
+
+    return {
+        'categories': categories,
+        'tags': tags,
+        'authors': AuthorStats.objects.count(),
+    }
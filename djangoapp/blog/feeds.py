@@ -0,0 +1,215 @@
+"""
+Feeds RSS e Atom do blog: o site todo, por categoria, por tag e por autor.
+
+Os leitores de feed consultam a cada poucos minutos, então:
+
+- o XML gerado fica no cache de página (blog/page_cache.py), com as
+  mesmas dependências das listagens (``list:index``, ``list:tag:3``...)
+  mais as de cada post do feed (o post, a categoria e o autor). Ele só é
+  gerado de novo quando um post do escopo do feed muda (ou entra/sai
+  dele) ou um nome exibido nos itens é alterado;
+- a resposta leva ETag (hash do XML) e Last-Modified (post mais recente),
+  e responde 304 quando o leitor já tem a versão atual.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from site_setup.cache import get_site_setup
+
+from .conditional import serve_cached
+from .models import Category, Post, Tag
+from .page_cache import dep
+
+User = get_user_model()
+
+# Posts mais recentes em cada feed
+FEED_ITEMS = 20
+
+
+def _site_title():
+    setup = get_site_setup()
+    return setup.title if setup else 'Blog'
+
+
+def _site_description():
+    setup = get_site_setup()
+    return setup.description if setup else ''
+
+
+class CachedFeed(Feed):
+    """
+    Feed de posts publicados com o XML em cache e GET condicional.
+
+    As subclasses definem ``get_object``, ``title``, ``link``,
+    ``filter_items(queryset, obj)`` e ``get_cache_dependencies(obj)``.
+    """
+
+    def __call__(self, request, *args, **kwargs):
+        def build():
+            try:
+                obj = self.get_object(request, *args, **kwargs)
+            except ObjectDoesNotExist:
+                raise Http404('Feed object does not exist.')
+            feedgen = self.get_feed(obj, request)
+            response = HttpResponse(content_type=feedgen.content_type)
+            feedgen.write(response, 'utf-8')
+            deps = self.get_cache_dependencies(obj)
+            for item in feedgen.items:
+                deps.extend(self.get_item_dependencies(item))
+            return (response, deps,
+                    feedgen.latest_post_date().timestamp())
+
+        # O XML só depende dos posts (lastBuildDate/updated vêm do mais
+        # recente), então o ETag não muda quando o feed é regerado igual.
+        return serve_cached(request, build)
+
+    def get_object(self, request, *args, **kwargs):
+        return None
+
+    def filter_items(self, queryset, obj):
+        return queryset
+
+    def get_cache_dependencies(self, obj):
+        return []
+
+    def get_item_dependencies(self, item):
+        """
+        Dependências de um item do feed: o post e, como no
+        ``PostDetailView``, a categoria e o autor (os nomes vão no XML).
+        Renomear uma tag invalida os posts dela.
+        """
+        deps = [dep('post', item['post_pk'])]
+        if item['category_pk']:
+            deps.append(dep('category', item['category_pk']))
+        if item['author_pk']:
+            deps.append(dep('author', item['author_pk']))
+        return deps
+
+    def description(self, obj):
+        return _site_description()
+
+    def subtitle(self, obj):
+        # Atom usa subtitle onde o RSS usa description
+        return _site_description()
+
+    def items(self, obj):
+        qs = Post.objects.get_published().select_related(
+            'created_by', 'category').prefetch_related('tags').defer(
+            'content', 'content_html', 'content_text')
+        return self.filter_items(qs, obj)[:FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.excerpt
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_author_name(self, item):
+        author = item.created_by
+        if author is None:
+            return None
+        return author.get_full_name() or author.username
+
+    def item_categories(self, item):
+        names = [item.category.name] if item.category else []
+        return names + [tag.name for tag in item.tags.all()]
+
+    def item_extra_kwargs(self, item):
+        # Guardado no item do feedgenerator (não vai para o XML): usado
+        # para montar as dependências do cache
+        return {
+            'post_pk': item.pk,
+            'category_pk': item.category_id,
+            'author_pk': item.created_by_id,
+        }
+
+
+class LatestPostsFeed(CachedFeed):
+    def title(self, obj):
+        return _site_title()
+
+    def link(self, obj):
+        return reverse('blog:index')
+
+    def get_cache_dependencies(self, obj):
+        return [dep('list:index')]
+
+
+class CategoryPostsFeed(CachedFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Category, slug=slug)
+
+    def title(self, obj):
+        return f'{_site_title()}: Categoria "{obj.name}"'
+
+    def link(self, obj):
+        return reverse('blog:category', args=(obj.slug,))
+
+    def filter_items(self, queryset, obj):
+        return queryset.filter(category=obj)
+
+    def get_cache_dependencies(self, obj):
+        return [dep('category', obj.pk), dep('list:category', obj.pk)]
+
+
+class TagPostsFeed(CachedFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Tag, slug=slug)
+
+    def title(self, obj):
+        return f'{_site_title()}: Tag "{obj.name}"'
+
+    def link(self, obj):
+        return reverse('blog:tag', args=(obj.slug,))
+
+    def filter_items(self, queryset, obj):
+        return queryset.filter(tags=obj)
+
+    def get_cache_dependencies(self, obj):
+        return [dep('tag', obj.pk), dep('list:tag', obj.pk)]
+
+
+class AuthorPostsFeed(CachedFeed):
+    def get_object(self, request, id):
+        return get_object_or_404(User, pk=id)
+
+    def title(self, obj):
+        name = obj.get_full_name() or obj.username
+        return f'{_site_title()}: Posts de "{name}"'
+
+    def link(self, obj):
+        return reverse('blog:created_by', args=(obj.pk,))
+
+    def filter_items(self, queryset, obj):
+        return queryset.filter(created_by=obj)
+
+    def get_cache_dependencies(self, obj):
+        return [dep('author', obj.pk), dep('list:author', obj.pk)]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+
+
+class CategoryPostsAtomFeed(CategoryPostsFeed):
+    feed_type = Atom1Feed
+
+
+class TagPostsAtomFeed(TagPostsFeed):
+    feed_type = Atom1Feed
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
@@ -1,7 +1,8 @@
 # djangoapp/blog/forms.py
 
 from django import forms
-from .models import Post, Tag, Category
+from .models import Post, Category
+from .tags import parse_tag_names, set_post_tag_names
 from django_summernote.widgets import SummernoteWidget
 
 
@@ -77,20 +78,21 @@ class PostForm(forms.ModelForm):
         if user:
             post.created_by = user
 
-        # Agora podemos salvar o post no banco, com o 'created_by' já definido
+        # Agora podemos salvar o post no banco, com o 'created_by' já definido.
+        # As tags só podem ser gravadas depois que o post existe no banco.
         if commit:
             post.save()
-
-        # A lógica das tags continua a mesma...
-        # No entanto, mas ela só deve rodar se o post foi salvo (commit=True)
-        if commit:
-            post.tags.clear()
-            tags_str = self.cleaned_data.get('tags_input', '')
-            if tags_str:
-                tag_names = [name.strip() for name in tags_str.split(',')]
-                for name in tag_names:
-                    if name:
-                        tag, created = Tag.objects.get_or_create(name=name)
-                        post.tags.add(tag)
+            self.save_tags(post)
+        else:
+            # Assim como o save_m2m do Django, as tags ficam para depois
+            self.save_m2m = lambda: self.save_tags(post)
 
         return post
+
+    def save_tags(self, post):
+        """
+        Aplica as tags digitadas em 'tags_input' ao post, com uma
+        quantidade fixa de queries (ver blog/tags.py).
+        """
+        set_post_tag_names(
+            post, parse_tag_names(self.cleaned_data.get('tags_input', '')))
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.attachments import DEFAULT_GRACE_PERIOD, unreferenced_attachments
+
+
+class Command(BaseCommand):
+    help = (
+        'Lista (ou apaga, com --delete) os anexos do editor que não são '
+        'usados no conteúdo de nenhum post ou página. Anexos enviados há '
+        'menos de --grace-days dias são mantidos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-days', type=float,
+            default=DEFAULT_GRACE_PERIOD.days,
+            help=f'Idade mínima, em dias (padrão: '
+                 f'{DEFAULT_GRACE_PERIOD.days}).')
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='Apaga os anexos órfãos (sem isso, só lista).')
+
+    def handle(self, *args, **options):
+        orphans = unreferenced_attachments(
+            timedelta(days=options['grace_days']))
+
+        for attachment in orphans:
+            self.stdout.write(
+                f'{attachment.uploaded:%Y-%m-%d}  {attachment.file.name}')
+            if options['delete']:
+                # Um por vez: o arquivo só some quando nenhum outro anexo
+                # ou capa o usa (jobs/files.py)
+                with transaction.atomic():
+                    attachment.delete()
+
+        action = 'apagados' if options['delete'] else 'encontrados'
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(orphans)} anexos sem uso {action}.'))
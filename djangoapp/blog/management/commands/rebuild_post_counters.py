@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula os contadores de posts publicados de categorias, tags '
+        'e autores (published_post_count).'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = rebuild_counters()
+
+        self.stdout.write(self.style.SUCCESS(
+            'Contadores recalculados: '
+            f'{updated["categories"]} categorias, '
+            f'{updated["tags"]} tags, '
+            f'{updated["authors"]} autores.'
+        ))
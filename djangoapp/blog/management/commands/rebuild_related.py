@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from blog.related import rebuild_all
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula os posts relacionados de todos os posts publicados. '
+        'As mudanças do dia a dia já são tratadas pela fila; rode depois '
+        'de migrar ou de mudar os pesos em blog/related.py.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Posts lidos por consulta (padrão: 200).')
+
+    def handle(self, *args, **options):
+        seen, changed = rebuild_all(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{changed} de {seen} listas de relacionados atualizadas.'))
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog import page_cache
+from blog.content import RENDERED_FIELDS, render_content
+from blog.models import Page, Post
+from blog.page_cache import dep
+
+
+def backfill(model, batch_size):
+    """
+    Processa o conteúdo de todos os objetos do model, em lotes por pk.
+
+    Só os objetos cujo resultado mudou são gravados (bulk_update, sem
+    passar pelo save e pelos signals), e as páginas deles saem do cache.
+
+    Returns:
+        tuple: (objetos lidos, objetos atualizados)
+    """
+    kind = model._meta.model_name
+    seen = updated = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            model.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'content', *RENDERED_FIELDS)[:batch_size])
+        if not batch:
+            return seen, updated
+
+        changed = []
+        for obj in batch:
+            rendered = render_content(obj.content)
+            values = {
+                'content_html': rendered['html'],
+                'content_text': rendered['text'],
+                'word_count': rendered['word_count'],
+                'toc': rendered['toc'],
+            }
+            if any(getattr(obj, field) != value
+                   for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(obj, field, value)
+                changed.append(obj)
+
+        with transaction.atomic():
+            model.objects.bulk_update(changed, RENDERED_FIELDS)
+            page_cache.invalidate(*[dep(kind, obj.pk) for obj in changed])
+
+        seen += len(batch)
+        updated += len(changed)
+        last_pk = batch[-1].pk
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera o conteúdo processado (content_html, content_text, '
+        'word_count, toc) dos posts e páginas já existentes. Novos saves '
+        'já fazem isso; rode depois de migrar ou de mudar blog/content.py.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Objetos lidos por consulta (padrão: 200).')
+
+    def handle(self, *args, **options):
+        for model in (Post, Page):
+            seen, updated = backfill(model, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: {updated} de {seen} '
+                f'atualizados.'))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_alter_postattachment_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-id'], name='post_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['category', '-id'], name='post_published_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['created_by', '-id'], name='post_published_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', False)), fields=['created_by', '-id'], name='post_drafts_author_idx'),
+        ),
+        # TagView: a tabela M2M automática não tem model próprio, então o
+        # índice (tag_id, post_id DESC) é criado direto em SQL.
+        migrations.RunSQL(
+            sql='CREATE INDEX post_tags_tag_post_idx '
+                'ON blog_post_tags (tag_id, post_id DESC);',
+            reverse_sql='DROP INDEX post_tags_tag_post_idx;',
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    """
+    Preenche os contadores com os valores atuais.
+    """
+    Post = apps.get_model('blog', 'Post')
+    Category = apps.get_model('blog', 'Category')
+    Tag = apps.get_model('blog', 'Tag')
+    AuthorStats = apps.get_model('blog', 'AuthorStats')
+    published = Post.objects.filter(is_published=True).order_by()
+
+    for row in published.values('category').annotate(total=Count('pk')):
+        Category.objects.filter(pk=row['category']).update(
+            published_post_count=row['total'])
+
+    for row in published.values('tags').annotate(total=Count('pk')):
+        Tag.objects.filter(pk=row['tags']).update(
+            published_post_count=row['total'])
+
+    AuthorStats.objects.bulk_create([
+        AuthorStats(author_id=row['created_by'],
+                    published_post_count=row['total'])
+        for row in published.filter(created_by__isnull=False)
+        .values('created_by').annotate(total=Count('pk'))
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0009_post_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='post_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('published_post_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Author Stats',
+                'verbose_name_plural': 'Author Stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='published_post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='published_post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
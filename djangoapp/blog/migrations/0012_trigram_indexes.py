@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:10
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+TRIGRAM_INDEXES = {
+    'post': django.contrib.postgres.indexes.GinIndex(
+        fields=['title'], name='post_title_trgm_idx',
+        opclasses=['gin_trgm_ops']),
+    'tag': django.contrib.postgres.indexes.GinIndex(
+        fields=['name'], name='tag_name_trgm_idx',
+        opclasses=['gin_trgm_ops']),
+    'category': django.contrib.postgres.indexes.GinIndex(
+        fields=['name'], name='category_name_trgm_idx',
+        opclasses=['gin_trgm_ops']),
+}
+
+
+def enable_trigram(apps, schema_editor):
+    # pg_trgm só existe no PostgreSQL; no SQLite fica só no estado
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in TRIGRAM_INDEXES.items():
+        schema_editor.add_index(apps.get_model('blog', model_name), index)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in TRIGRAM_INDEXES.items():
+        schema_editor.remove_index(apps.get_model('blog', model_name), index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_post_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(enable_trigram, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index)
+                for model_name, index in TRIGRAM_INDEXES.items()
+            ],
+            database_operations=[
+                migrations.RunPython(
+                    create_trigram_indexes, drop_trigram_indexes),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:47
+
+import utils.model_validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_post_cover_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='cover',
+            field=models.ImageField(blank=True, default='', upload_to='posts/%Y/%m/', validators=[utils.model_validators.validate_image_dimensions]),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:56
+
+import django_summernote.utils
+import utils.model_validators
+import utils.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_alter_post_cover'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='cover',
+            field=models.ImageField(blank=True, default='', storage=utils.storage.ContentAddressedStorage(), upload_to='posts/%Y/%m/', validators=[utils.model_validators.validate_image_dimensions]),
+        ),
+        migrations.AlterField(
+            model_name='postattachment',
+            name='file',
+            field=models.FileField(storage=utils.storage.ContentAddressedStorage(), upload_to=django_summernote.utils.uploaded_filepath),
+        ),
+    ]
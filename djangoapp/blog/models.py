@@ -6,14 +6,29 @@ incluindo Tags, Categorias, Páginas e Posts. Cada modelo possui
 funcionalidades específicas para gerenciamento de conteúdo e SEO.
 """
 
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils.text import slugify as django_slugify
 from unidecode import unidecode
 from utils.rands import random_slug
 from django.contrib.auth import get_user_model
-from utils.images import resize_image
+from utils.model_tracking import FieldTrackerMixin
 from django_summernote.models import AbstractAttachment
+from django_summernote.utils import get_attachment_upload_to
 from django.urls import reverse
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from .content import apply_rendered_content, reading_time
+from .search import update_search_vector
+from jobs.tasks import enqueue_renditions, enqueue_resize
+from utils.renditions import Picture, read_manifest
+from utils.storage import ContentAddressedStorage
+from utils.images import is_image_name
+from utils.model_validators import validate_image_dimensions
+
+# Campos que alimentam o search_vector do Post
+SEARCH_FIELDS = {'title', 'excerpt', 'content'}
 
 User = get_user_model()
 
@@ -28,6 +43,8 @@ class Tag(models.Model):
     Attributes:
         name (CharField): Nome da tag (máximo 100 caracteres)
         slug (SlugField): Versão URL-friendly do nome, gerada automaticamente
+        published_post_count (PositiveIntegerField): Quantidade de posts
+            publicados com a tag, mantida pelos signals de blog/signals.py
 
     Meta:
         verbose_name: Nome singular para exibição no admin
@@ -36,10 +53,17 @@ class Tag(models.Model):
     class Meta:
         verbose_name = 'Tag'
         verbose_name_plural = 'Tags'
+        indexes = [
+            # Sugestões da busca (PostgreSQL, pg_trgm)
+            GinIndex(fields=['name'], name='tag_name_trgm_idx',
+                     opclasses=['gin_trgm_ops']),
+        ]
 
     name = models.CharField(max_length=100)
     slug = models.SlugField(
         max_length=100, unique=True, blank=True)
+    published_post_count = models.PositiveIntegerField(
+        default=0, editable=False)
 
     def save(self, *args, **kwargs):
         """
@@ -107,6 +131,8 @@ class Category(models.Model):
     Attributes:
         name (CharField): Nome da categoria (máximo 100 caracteres)
         slug (SlugField): Versão URL-friendly do nome, único no sistema
+        published_post_count (PositiveIntegerField): Quantidade de posts
+            publicados na categoria, mantida pelos signals de blog/signals.py
 
     Meta:
         verbose_name: Nome singular para exibição no admin
@@ -115,10 +141,17 @@ class Category(models.Model):
     class Meta:
         verbose_name = 'Category'
         verbose_name_plural = 'Categories'
+        indexes = [
+            # Sugestões da busca (PostgreSQL, pg_trgm)
+            GinIndex(fields=['name'], name='category_name_trgm_idx',
+                     opclasses=['gin_trgm_ops']),
+        ]
 
     name = models.CharField(max_length=100)
     slug = models.SlugField(
         max_length=100, unique=True, blank=True)
+    published_post_count = models.PositiveIntegerField(
+        default=0, editable=False)
 
     # MÉTODO SAVE ADICIONADO PARA GERAR SLUG
     def save(self, *args, **kwargs):
@@ -157,6 +190,10 @@ class Page(models.Model):
         slug (SlugField): Versão URL-friendly do título, único no sistema
         is_published (BooleanField): Define se a página está publicada
         content (TextField): Conteúdo da página em texto
+        content_html, content_text, word_count, toc: Derivados do
+            conteúdo, gerados no save (como no Post)
+        updated_at (DateTimeField): Data/hora da última atualização
+            (automática), usada no Last-Modified/ETag da página
     """
     title = models.CharField(max_length=65)
     slug = models.SlugField(
@@ -166,6 +203,11 @@ class Page(models.Model):
         default=False, help_text=('Este campo precisa estar marcado para a página ser exibida no site.')
     )
     content = models.TextField()
+    content_html = models.TextField(blank=True, default='', editable=False)
+    content_text = models.TextField(blank=True, default='', editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    toc = models.JSONField(default=list, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         """
@@ -190,6 +232,11 @@ class Page(models.Model):
         if queryset.exists():
             self.slug = f'{original_slug}-{random_slug(k=4)}'
 
+        rendered_fields = apply_rendered_content(
+            self, kwargs.get('update_fields'))
+        if rendered_fields is not None:
+            kwargs['update_fields'] = rendered_fields
+
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -202,6 +249,31 @@ class Page(models.Model):
         return self.title
 
 
+class AuthorStats(models.Model):
+    """
+    Contadores desnormalizados por autor.
+
+    O User vem do django.contrib.auth, então os contadores do autor ficam
+    em uma tabela própria, ligada 1-para-1 com o usuário.
+
+    Attributes:
+        author (OneToOneField): Usuário dono dos contadores
+        published_post_count (PositiveIntegerField): Quantidade de posts
+            publicados pelo autor, mantida pelos signals de blog/signals.py
+    """
+    class Meta:
+        verbose_name = 'Author Stats'
+        verbose_name_plural = 'Author Stats'
+
+    author = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='post_stats')
+    published_post_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.author)
+
+
 class PostManager(models.Manager):
     """
     Manager customizado para o modelo Post.
@@ -210,6 +282,11 @@ class PostManager(models.Manager):
     filtros para posts publicados e métodos de conveniência.
     """
 
+    # Campos lidos pelo template _post-card.html (e o updated_at, usado no
+    # ETag/Last-Modified das listagens)
+    card_fields = ('id', 'slug', 'title', 'excerpt', 'cover', 'cover_renditions',
+                   'updated_at')
+
     def get_published(self):
         """
         Retorna todos os posts publicados ordenados por ID decrescente.
@@ -219,6 +296,36 @@ class PostManager(models.Manager):
         """
         return self.filter(is_published=True).order_by('-pk')
 
+    def get_published_cards(self):
+        """
+        Retorna os posts publicados carregando apenas as colunas usadas
+        pelo card das listagens (_post-card.html).
+
+        Evita trazer o 'content', que pode ser enorme em posts do Summernote.
+
+        Returns:
+            QuerySet: Posts publicados com os campos do card
+        """
+        return self.get_published().only(*self.card_fields)
+
+    def visible_to(self, user):
+        """
+        Posts que o usuário pode ver.
+
+        Visitantes só veem os publicados; um usuário logado também vê os
+        próprios rascunhos. O OR é sobre colunas da própria tabela, então
+        não gera linhas duplicadas e dispensa o ``.distinct()``.
+
+        Args:
+            user: O ``request.user`` (ou None)
+
+        Returns:
+            QuerySet: Posts visíveis para o usuário
+        """
+        if user is None or not user.is_authenticated:
+            return self.filter(is_published=True)
+        return self.filter(Q(is_published=True) | Q(created_by=user))
+
     def latest(self):  # type: ignore
         """
         Retorna os 5 posts mais recentes que estão publicados.
@@ -229,7 +336,7 @@ class PostManager(models.Manager):
         return self.get_published()[:5]
 
 
-class Post(models.Model):
+class Post(FieldTrackerMixin, models.Model):
     """
     Modelo principal para representar posts do blog.
 
@@ -243,7 +350,15 @@ class Post(models.Model):
         excerpt (CharField): Resumo/descrição do post (máximo 150 caracteres)
         is_published (BooleanField): Define se o post está publicado
         content (TextField): Conteúdo completo do post
-        cover (ImageField): Imagem de capa do post
+        content_html (TextField): Conteúdo já processado para exibição
+            (imagens com lazy loading, âncoras nos títulos), gerado no
+            save (blog/content.py)
+        content_text (TextField): Texto puro do conteúdo
+        word_count (PositiveIntegerField): Palavras do conteúdo
+        toc (JSONField): Sumário com os títulos do conteúdo
+        cover (ImageField): Imagem de capa do post (o original é mantido)
+        cover_renditions (JSONField): Manifesto das versões responsivas da
+            capa (utils/renditions.py), preenchido pelo worker
         cover_in_post_content (BooleanField): Se a capa deve aparecer no conteúdo
         created_at (DateTimeField): Data/hora de criação (automática)
         updated_at (DateTimeField): Data/hora da última atualização (automática)
@@ -251,14 +366,45 @@ class Post(models.Model):
         updated_by (ForeignKey): Usuário que fez a última atualização
         tags (ManyToManyField): Tags associadas ao post
         category (ForeignKey): Categoria do post
+        search_vector (SearchVectorField): tsvector da busca textual
+            (título > resumo > conteúdo), preenchido no save pelo PostgreSQL
+        tracked_fields: Campos cujo valor carregado do banco é guardado
+            (FieldTrackerMixin), para o save e os signals saberem o que
+            mudou sem recarregar o post
 
     Meta:
         verbose_name: Nome singular para exibição no admin
         verbose_name_plural: Nome plural para exibição no admin
+        indexes: Índices parciais para cada listagem (home, categoria,
+            autor e rascunhos), todos ordenados por id decrescente, e os
+            índices GIN da busca textual e das sugestões por trigrama
     """
     class Meta:
         verbose_name = 'Post'
         verbose_name_plural = 'Posts'
+        indexes = [
+            # IndexView / SearchView: get_published()
+            models.Index(
+                fields=['-id'], name='post_published_idx',
+                condition=Q(is_published=True)),
+            # CategoryView
+            models.Index(
+                fields=['category', '-id'], name='post_published_category_idx',
+                condition=Q(is_published=True)),
+            # CreatedByView
+            models.Index(
+                fields=['created_by', '-id'], name='post_published_author_idx',
+                condition=Q(is_published=True)),
+            # DraftsView
+            models.Index(
+                fields=['created_by', '-id'], name='post_drafts_author_idx',
+                condition=Q(is_published=False)),
+            # SearchView (PostgreSQL)
+            GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
+            # Sugestões da busca (PostgreSQL, pg_trgm)
+            GinIndex(fields=['title'], name='post_title_trgm_idx',
+                     opclasses=['gin_trgm_ops']),
+        ]
 
     objects = PostManager()
 
@@ -270,7 +416,18 @@ class Post(models.Model):
         default=False, help_text=('Este campo precisa estar marcado para a página ser exibida no site.')
     )
     content = models.TextField()
-    cover = models.ImageField(upload_to='posts/%Y/%m/', blank=True, default='')
+    # Derivados do content, gerados no save (blog/content.py)
+    content_html = models.TextField(blank=True, default='', editable=False)
+    content_text = models.TextField(blank=True, default='', editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    toc = models.JSONField(default=list, blank=True, editable=False)
+    # Mesmo arquivo enviado de novo reaproveita o que já está gravado
+    # (utils/storage.py)
+    cover = models.ImageField(
+        upload_to='posts/%Y/%m/', blank=True, default='',
+        storage=ContentAddressedStorage(),
+        validators=[validate_image_dimensions])
+    cover_renditions = models.JSONField(default=dict, blank=True, editable=False)
     cover_in_post_content = models.BooleanField(
         default=False, help_text=('Se marcado, a imagem de capa será exibida no conteúdo do post')
     )
@@ -284,6 +441,9 @@ class Post(models.Model):
     tags = models.ManyToManyField(Tag, blank=True)
     category = models.ForeignKey(
         Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='posts')
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    tracked_fields = ('cover', 'is_published', 'category', 'created_by')
 
     def save(self, *args, **kwargs):
         """
@@ -291,22 +451,33 @@ class Post(models.Model):
 
         Este método implementa duas funcionalidades principais:
         1. Geração automática de slug único a partir do título
-        2. Redimensionamento automático da imagem de capa quando alterada
+        2. Geração das versões responsivas (renditions) da capa quando
+           alterada, em segundo plano (jobs/tasks.py)
 
         O processo é executado na seguinte ordem:
         1. Gera o slug se não existir
         2. Verifica unicidade do slug e adiciona sufixo se necessário
-        3. Guarda referência da imagem antiga (se existir)
-        4. Salva o objeto no banco de dados
-        5. Redimensiona a nova imagem se ela foi alterada
+        3. Verifica (pelo FieldTrackerMixin, sem query) se a capa mudou
+        4. Processa o conteúdo (content_html, content_text, word_count, toc)
+        5. Salva o objeto no banco de dados
+        6. Enfileira as renditions se a imagem foi alterada
+
+        Com ``update_fields``, só os campos informados são considerados:
+        um save parcial não gera slug nem redimensiona a capa se eles não
+        estiverem na lista.
 
         Args:
             *args: Argumentos posicionais passados para o método save original
             **kwargs: Argumentos nomeados passados para o método save original
         """
+        update_fields = kwargs.get('update_fields')
+
+        def saving(field):
+            return update_fields is None or field in update_fields
+
         # --- Bloco de Geração de Slug ---
         # (Executado ANTES do super().save())
-        if not self.slug:
+        if not self.slug and saving('slug'):
             # Gera o slug a partir do 'title' e garante unicidade
             self.slug = django_slugify(unidecode(self.title))
             original_slug = self.slug
@@ -318,30 +489,68 @@ class Post(models.Model):
 
         # --- Bloco de Redimensionamento de Imagem ---
 
-        # 1. Guarda o estado da imagem atual ANTES de salvar o objeto
-        # Se o post já existe, pegamos a instância antiga do banco.
-        if self.pk:
-            old_instance = self.__class__.objects.get(pk=self.pk)
-            old_cover = old_instance.cover
-        else:
-            # Se é um post novo, não há imagem antiga.
-            old_cover = None
+        # 1. Verifica ANTES de salvar se a capa mudou. O valor que veio do
+        # banco já está guardado no objeto, então não é preciso recarregar
+        # o post (com todo o 'content') só para comparar o nome da imagem.
+        cover_has_changed = saving('cover') and self.has_changed('cover')
+        if cover_has_changed:
+            # As renditions da capa antiga não servem mais; os templates
+            # usam a original até as novas ficarem prontas.
+            self.cover_renditions = {}
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'cover_renditions'}
+
+        # --- Bloco do Conteúdo Processado ---
+        # HTML de exibição, texto puro, palavras e sumário são gerados aqui,
+        # uma vez, e não a cada visualização (blog/content.py)
+        rendered_fields = apply_rendered_content(
+            self, kwargs.get('update_fields'))
+        if rendered_fields is not None:
+            kwargs['update_fields'] = rendered_fields
 
         # 2. SALVA O OBJETO NO BANCO (com o novo slug e a nova imagem não redimensionada)
         # Este passo é CRUCIAL e deve acontecer apenas UMA VEZ.
-        super().save(*args, **kwargs)
+        # A transação inclui os signals que ajustam os contadores de
+        # posts publicados (blog/signals.py).
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # Mantém o tsvector da busca em dia (só no PostgreSQL)
+            if update_fields is None or set(update_fields) & SEARCH_FIELDS:
+                update_search_vector(
+                    self.__class__.objects.filter(pk=self.pk))
+
+            # 3. Enfileira a geração das renditions DEPOIS de salvar,
+            # quando a imagem é nova. O worker (manage.py run_jobs) faz o
+            # trabalho pesado fora da requisição.
+            if cover_has_changed and self.cover:
+                # Imagem que já estava no storage (mesmo conteúdo de outra
+                # capa): as renditions dela servem para este post também
+                manifest = read_manifest(self.cover.name)
+                if manifest:
+                    self.cover_renditions = manifest
+                    self.__class__.objects.filter(pk=self.pk).update(
+                        cover_renditions=manifest)
+                else:
+                    enqueue_renditions(self, 'cover')
+
+    @property
+    def reading_time(self):
+        """
+        Minutos de leitura estimados a partir do ``word_count``.
+        """
+        return reading_time(self.word_count)
 
-        # 3. Verifica se a imagem precisa ser redimensionada DEPOIS de salvar
-        # Se o post tiver uma imagem de capa...
-        if self.cover:
-            # E se a imagem mudou (ou se é um post novo com imagem)
-            cover_has_changed = not old_cover or old_cover.name != self.cover.name
+    @property
+    def cover_picture(self):
+        """
+        Dados do ``<picture>`` da capa (srcset WebP e de reserva).
 
-            if cover_has_changed:
-                print(
-                    f'--- Redimensionando a imagem de capa: {self.cover.name} ---')
-                # Chama a função para redimensionar, com um tamanho apropriado para posts.
-                resize_image(self.cover, new_width=800)
+        Returns:
+            Picture: Usa as renditions se já estiverem prontas, senão a
+            imagem original
+        """
+        return Picture(self.cover, self.cover_renditions)
 
     def get_absolute_url(self):
         """
@@ -376,7 +585,39 @@ class Post(models.Model):
         return self.title
 
 
-class PostAttachment(AbstractAttachment):
+class RelatedPost(models.Model):
+    """
+    Posts relacionados pré-calculados (blog/related.py).
+
+    Cada post publicado guarda só os ``RELATED_LIMIT`` vizinhos de maior
+    pontuação; a página do post lê a lista com uma consulta pelo índice
+    único (post, related).
+
+    Attributes:
+        post (ForeignKey): Post cuja página exibe a lista
+        related (ForeignKey): Post relacionado
+        score (FloatField): Pontuação (tags em comum pesadas pelo IDF,
+            mais um bônus se a categoria é a mesma)
+    """
+    class Meta:
+        verbose_name = 'Related Post'
+        verbose_name_plural = 'Related Posts'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'related'], name='related_post_unique'),
+        ]
+
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='related_from')
+    score = models.FloatField()
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id}'
+
+
+class PostAttachment(FieldTrackerMixin, AbstractAttachment):
     """
     Modelo personalizado para anexos do django-summernote.
 
@@ -396,3 +637,32 @@ class PostAttachment(AbstractAttachment):
     class Meta(AbstractAttachment.Meta):
         verbose_name = 'Post Attachment'
         verbose_name_plural = 'Post Attachments'
+
+    # Anexo repetido reaproveita o arquivo já gravado (utils/storage.py)
+    file = models.FileField(
+        upload_to=get_attachment_upload_to(),
+        storage=ContentAddressedStorage(),
+    )
+
+    # Arquivo anterior, para a contagem de referências (jobs/files.py)
+    tracked_fields = ('file',)
+
+    def save(self, *args, **kwargs):
+        """
+        Salva o anexo e, se for uma imagem nova, enfileira a redução para
+        ``ATTACHMENT_MAX_WIDTH`` (o editor aceita fotos de até 30MB).
+        """
+        update_fields = kwargs.get('update_fields')
+        file_has_changed = (
+            (update_fields is None or 'file' in update_fields)
+            and bool(self.file) and self.has_changed('file')
+        )
+
+        super().save(*args, **kwargs)
+
+        # Mesmo caminho das capas e do favicon: o worker reduz a imagem
+        # (decodificação reduzida, sem metadados) e troca o arquivo de
+        # forma atômica. PDFs e outros arquivos ficam como vieram.
+        if file_has_changed and is_image_name(self.file.name):
+            enqueue_resize(
+                self, 'file', width=settings.ATTACHMENT_MAX_WIDTH)
@@ -0,0 +1,283 @@
+"""
+Cache de página inteira para visitantes anônimos.
+
+As páginas públicas do blog (home, categoria, tag, autor, post e página)
+são iguais para todo visitante não logado, então guardamos a resposta já
+renderizada no cache do Django, com chave formada pelo caminho, pela
+querystring e pela versão do SiteSetup.
+
+Cada resposta guardada lista as "dependências" que usou (ex.: ``post:12``,
+``list:category:3``). Cada dependência tem um carimbo com o horário da
+última alteração; uma resposta só é servida se foi gerada depois de todos
+os carimbos das suas dependências. Assim, editar um post só invalida as
+páginas que o exibem ou listam, e não o cache inteiro.
+
+Quando uma página quente (ex.: a home) sai do cache, só uma requisição a
+gera de novo (trava da camada de cache, utils/cache.py); as outras
+esperam a resposta guardada em vez de renderizarem todas ao mesmo tempo.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from site_setup.cache import get_version as get_site_setup_version
+from utils.cache import TieredCache
+
+PAGE_PREFIX = 'page_cache:page:'
+DEP_PREFIX = 'page_cache:dep:'
+
+# Cabeçalhos que nunca devem ser reaproveitados entre visitantes
+_SKIPPED_HEADERS = {'set-cookie', 'vary'}
+
+# Só as travas e a espera; as respostas ficam no cache do Django
+_single_flight = TieredCache(local_maxsize=0)
+
+
+def dep(kind, pk=None):
+    """
+    Monta o nome de uma dependência, ex.: ``dep('post', 12) -> 'post:12'``.
+    """
+    return kind if pk is None else f'{kind}:{pk}'
+
+
+def _dep_key(name):
+    return DEP_PREFIX + name
+
+
+def is_cacheable(request):
+    """
+    Só GET/HEAD de visitantes anônimos entram no cache.
+    """
+    if not settings.BLOG_PAGE_CACHE:
+        return False
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    user = getattr(request, 'user', None)
+    return not (user and user.is_authenticated)
+
+
+def make_key(request, *extra):
+    """
+    Chave da página: caminho + querystring + versão do SiteSetup (e as
+    partes extras, se houver).
+    """
+    raw = '|'.join((
+        request.path,
+        request.META.get('QUERY_STRING', ''),
+        str(get_site_setup_version()),
+        *extra,
+    ))
+    return PAGE_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _dep_versions(names, missing_version=None):
+    """
+    Retorna o carimbo de cada dependência.
+
+    Dependências sem carimbo (nunca alteradas ou removidas do cache)
+    recebem o horário atual (ou ``missing_version``), o que invalida
+    respostas antigas que dependiam delas.
+    """
+    keys = [_dep_key(name) for name in names]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        if missing_version is None:
+            missing_version = time.time_ns()
+        for key in missing:
+            cache.add(key, missing_version, timeout=None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def get_versions(names, missing_version=None):
+    """
+    Carimbos (time_ns) das dependências, por nome.
+
+    Usado pelo ETag/Last-Modified (blog/conditional.py): qualquer
+    ``invalidate`` de uma dependência muda o carimbo dela.
+
+    Args:
+        names: Nomes das dependências
+        missing_version: Carimbo dado às dependências que ainda não têm
+            um. Deve ser anterior ao início da requisição, para não
+            invalidar a resposta que ela mesma vai guardar no cache.
+
+    Returns:
+        dict: nome -> carimbo
+    """
+    names = list(names)
+    versions = _dep_versions(names, missing_version)
+    return {name: versions.get(_dep_key(name)) for name in names}
+
+
+def get_response(key):
+    """
+    Busca a resposta guardada e confere se ela continua válida.
+
+    Returns:
+        HttpResponse | None: A resposta pronta ou None se não houver
+        entrada válida
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return None
+
+    versions = _dep_versions(entry['deps'])
+    if any(
+        versions.get(_dep_key(name), entry['created']) >= entry['created']
+        for name in entry['deps']
+    ):
+        return None
+
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for header, value in entry['headers'].items():
+        response.headers[header] = value
+    return response
+
+
+def store_response(key, response, deps, created):
+    """
+    Guarda uma resposta já renderizada junto com suas dependências.
+
+    Args:
+        key: Chave gerada por ``make_key``
+        response: Resposta renderizada
+        deps: Nomes das dependências usadas para gerar a página
+        created: Horário (time_ns) do início da requisição. Usar o início
+            garante que alterações feitas durante a renderização invalidem
+            a entrada.
+    """
+    if response.status_code != 200 or response.cookies:
+        return
+
+    # Dependências ainda sem carimbo ganham um anterior ao início da
+    # requisição, para a entrada já valer na próxima visita.
+    for name in deps:
+        cache.add(_dep_key(name), created - 1, timeout=None)
+
+    headers = {
+        header: value for header, value in response.headers.items()
+        if header.lower() not in _SKIPPED_HEADERS
+    }
+    cache.set(key, {
+        'content': response.content,
+        'status': response.status_code,
+        'headers': headers,
+        'deps': sorted(deps),
+        'created': created,
+    }, timeout=settings.BLOG_PAGE_CACHE_TIMEOUT)
+
+
+def lookup(request, *extra):
+    """
+    Chave da página e a resposta guardada nela, se ainda válida.
+
+    Sem resposta, quem chamou fica com a trava da chave (o token) e deve
+    gerar a página e chamar ``render_and_store`` (ou ``release``, se
+    falhar). Se outra requisição já tem a trava, espera a resposta dela
+    (até ``CACHE_LAYER_WAIT_TIMEOUT``) e só então gera também, sem trava.
+
+    Returns:
+        tuple: (chave, HttpResponse ou None, token da trava ou None)
+    """
+    key = make_key(request, *extra)
+    cached = get_response(key)
+    if cached is not None:
+        return key, cached, None
+
+    token = _single_flight.acquire(key)
+    if token:
+        # Quem tinha a trava pode ter guardado a página entre a leitura e
+        # o acquire
+        cached = get_response(key)
+        if cached is not None:
+            release(key, token)
+            return key, cached, None
+        return key, None, token
+    return key, _single_flight.wait_for(lambda: get_response(key)), None
+
+
+def release(key, token):
+    """
+    Libera a trava da chave pega pelo ``lookup`` (só se o token for o
+    dela; sem token, não faz nada).
+    """
+    _single_flight.release(key, token)
+
+
+def render_and_store(response, key, token, get_dependencies, created):
+    """
+    Renderiza a resposta, guarda no cache e libera a trava do ``lookup``,
+    também quando o template falha (senão quem espera pela chave ficaria
+    preso até o ``CACHE_LAYER_LOCK_TIMEOUT``).
+
+    Args:
+        response: Resposta da view (TemplateResponse ainda não renderizado)
+        key: Chave gerada por ``make_key``
+        token: Token da trava (ou None, se esta requisição não a tem)
+        get_dependencies: Função ``contexto -> dependências`` (o
+            ``get_cache_dependencies`` da view)
+        created: Horário (time_ns) do início da requisição
+    """
+    try:
+        # Ex.: 304 ou redirecionamento, que não vão para o cache
+        if hasattr(response, 'render'):
+            response.render()
+            store_response(
+                key, response, get_dependencies(response.context_data),
+                created)
+    finally:
+        release(key, token)
+    return response
+
+
+def _bump_now(names):
+    now = time.time_ns()
+    cache.set_many({_dep_key(name): now for name in names}, timeout=None)
+
+
+def invalidate(*names):
+    """
+    Invalida todas as páginas que dependem de alguma das dependências.
+
+    Roda depois do commit para que nenhuma requisição regrave no cache os
+    dados antigos com um carimbo novo.
+    """
+    names = {name for name in names if name}
+    if names:
+        transaction.on_commit(lambda: _bump_now(names))
+
+
+class AnonymousPageCacheMixin:
+    """
+    Mixin para views baseadas em template que entrega a página do cache
+    para visitantes anônimos.
+
+    As views precisam implementar ``get_cache_dependencies(context)``,
+    informando do que a página depende (a partir do contexto do
+    template).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key, cached, token = lookup(request)
+        if cached is not None:
+            return cached
+
+        created = time.time_ns()
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        except Exception:
+            # Ex.: 404; quem espera pela chave não precisa esperar mais
+            release(key, token)
+            raise
+        return render_and_store(
+            response, key, token, self.get_cache_dependencies, created)
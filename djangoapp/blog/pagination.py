@@ -0,0 +1,222 @@
+"""
+Paginação das listagens de posts.
+
+``CountedPaginator`` é o Paginator do Django aceitando um total já
+conhecido. ``KeysetPaginator`` é a paginação por cursor (keyset): em vez
+de ``OFFSET n`` + ``COUNT(*)``, cada página é buscada a partir do ``pk``
+do último (ou primeiro) post exibido. O custo de qualquer página é o
+mesmo da primeira e nenhuma contagem é feita.
+
+Os dois têm versões assíncronas da busca (``apage``, ``aget_page``),
+usadas pelas views de blog/async_views.py.
+"""
+
+import base64
+import binascii
+
+from django.core.paginator import Paginator
+from django.http import Http404
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
+
+AFTER_PARAM = 'after'
+BEFORE_PARAM = 'before'
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator que aceita o total de objetos já conhecido.
+
+    As listagens de categoria, tag e autor passam o contador
+    desnormalizado (``published_post_count``), evitando o ``COUNT(*)``
+    com JOIN que o Paginator faria. Sem ``count``, conta normalmente.
+    """
+
+    def __init__(self, *args, count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._known_count = count
+
+    @cached_property
+    def count(self):
+        if self._known_count is not None:
+            return self._known_count
+        return super().count
+
+    async def acount(self):
+        """
+        Total de objetos, contado com o ORM assíncrono se preciso.
+        """
+        if self._known_count is None and 'count' not in self.__dict__:
+            self.__dict__['count'] = await self.object_list.acount()
+        return self.count
+
+    async def apage(self, number):
+        """
+        Versão assíncrona do ``page()``.
+
+        Depois dela, ``count``, ``num_pages`` e a página não fazem mais
+        consultas.
+
+        Raises:
+            InvalidPage: se o número não é uma página válida
+        """
+        await self.acount()
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        rows = [obj async for obj in self.object_list[bottom:top]]
+        return self._get_page(rows, number, self)
+
+
+def encode_cursor(pk):
+    """
+    Codifica um pk em um cursor opaco para ser usado na URL.
+    """
+    raw = str(pk).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodifica um cursor gerado por ``encode_cursor``.
+
+    Raises:
+        Http404: se o cursor não for válido
+    """
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        return int(base64.urlsafe_b64decode(cursor + padding).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise Http404('Cursor de paginação inválido.')
+
+
+class KeysetPage:
+    """
+    Uma página de resultados da paginação por cursor.
+
+    Imita a interface do ``Page`` do Django que os templates usam
+    (iteração, ``has_next``, ``has_previous``, ``has_other_pages``),
+    mas sem número total de páginas.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, has_next, has_previous, params=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        # Demais parâmetros da URL (ex.: 'q' da busca) que devem ser mantidos
+        self.params = params or {}
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<KeysetPage: {len(self)} objetos>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[-1].pk)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[0].pk)
+
+    def _query_string(self, param, cursor):
+        params = dict(self.params)
+        params[param] = cursor
+        return '?' + urlencode(params)
+
+    @property
+    def next_query_string(self):
+        cursor = self.next_cursor
+        return self._query_string(AFTER_PARAM, cursor) if cursor else ''
+
+    @property
+    def previous_query_string(self):
+        cursor = self.previous_cursor
+        return self._query_string(BEFORE_PARAM, cursor) if cursor else ''
+
+
+class KeysetPaginator:
+    """
+    Pagina um queryset ordenado por ``-pk`` usando cursores.
+
+    Busca ``per_page + 1`` linhas para descobrir se existe uma próxima
+    página, sem precisar de ``COUNT(*)``.
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def get_page(self, after=None, before=None, params=None):
+        """
+        Retorna a página que vem depois de ``after`` ou antes de ``before``.
+
+        Args:
+            after: Cursor do último post da página anterior (avança)
+            before: Cursor do primeiro post da página seguinte (volta)
+            params: Outros parâmetros da querystring que devem ser mantidos
+                nos links de navegação
+
+        Returns:
+            KeysetPage: A página com os objetos e os cursores de navegação
+        """
+        params, qs, backwards = self._prepare(after, before, params)
+        return self._build_page(list(qs), after, backwards, params)
+
+    async def aget_page(self, after=None, before=None, params=None):
+        """
+        Versão assíncrona do ``get_page()``.
+        """
+        params, qs, backwards = self._prepare(after, before, params)
+        rows = [obj async for obj in qs]
+        return self._build_page(rows, after, backwards, params)
+
+    def _prepare(self, after, before, params):
+        params = {
+            key: value for key, value in (params or {}).items()
+            if key not in (AFTER_PARAM, BEFORE_PARAM, 'page')
+        }
+        limit = self.per_page + 1
+
+        if before:
+            # Voltando: busca em ordem crescente e inverte o resultado
+            pk = decode_cursor(before)
+            qs = self.object_list.filter(pk__gt=pk).order_by('pk')[:limit]
+            return params, qs, True
+
+        qs = self.object_list.order_by('-pk')
+        if after:
+            qs = qs.filter(pk__lt=decode_cursor(after))
+        return params, qs[:limit], False
+
+    def _build_page(self, rows, after, backwards, params):
+        if backwards:
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return KeysetPage(rows, True, has_previous, params)
+
+        has_next = len(rows) > self.per_page
+        return KeysetPage(rows[:self.per_page], has_next, bool(after), params)
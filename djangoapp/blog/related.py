@@ -0,0 +1,188 @@
+"""
+Posts relacionados, pré-calculados fora da requisição.
+
+Para cada post publicado guardamos em ``RelatedPost`` os
+``RELATED_LIMIT`` posts mais parecidos. A pontuação de um candidato é:
+
+- a soma do IDF de cada tag em comum, ``log(1 + publicados / posts da
+  tag)``: uma tag rara em comum vale mais do que uma tag que quase todo
+  post tem;
+- mais ``CATEGORY_WEIGHT`` se a categoria é a mesma.
+
+Só posts com alguma tag em comum são candidatos. Tags usadas por mais de
+``MAX_TAG_POSTS`` posts não pesam quase nada e fariam cada cálculo ler
+milhares de linhas, então são ignoradas (como stop words).
+
+A atualização é incremental (blog/tasks.py): quando um post muda de tags,
+é publicado/despublicado, muda de categoria ou é excluído, recalculamos
+só a vizinhança dele, ou seja, o próprio post e os que têm alguma das
+tags envolvidas. ``manage.py rebuild_related`` refaz tudo (por exemplo,
+depois de mudar os pesos).
+"""
+
+import heapq
+import math
+from collections import defaultdict
+
+from django.db import transaction
+
+from . import page_cache
+from .models import Post, RelatedPost, Tag
+from .page_cache import dep
+
+PostTags = Post.tags.through
+
+# Posts relacionados guardados (e exibidos) por post
+RELATED_LIMIT = 4
+
+# Bônus para a mesma categoria (menor que o peso de uma tag em comum)
+CATEGORY_WEIGHT = 0.5
+
+# Tags com mais posts publicados que isso não entram na pontuação
+MAX_TAG_POSTS = 1000
+
+
+def count_published():
+    return Post.objects.get_published().count()
+
+
+def tag_weights(tag_ids, published_count):
+    """
+    IDF de cada tag, a partir do contador desnormalizado de posts.
+
+    Returns:
+        dict: id da tag -> peso (tags acima de MAX_TAG_POSTS ficam de fora)
+    """
+    counts = Tag.objects.filter(
+        pk__in=tag_ids, published_post_count__lte=MAX_TAG_POSTS,
+    ).values_list('pk', 'published_post_count')
+    return {
+        pk: math.log(1 + published_count / max(count, 1))
+        for pk, count in counts
+    }
+
+
+def compute_related(post, published_count):
+    """
+    Calcula os posts mais parecidos com o post.
+
+    Args:
+        post: Post (basta ``pk``, ``is_published`` e ``category_id``)
+        published_count: Total de posts publicados (``count_published``)
+
+    Returns:
+        list: Até RELATED_LIMIT tuplas (pontuação, id do post), da maior
+        pontuação para a menor; no empate, o post mais novo primeiro
+    """
+    if not post.is_published:
+        return []
+    tag_ids = list(PostTags.objects.filter(
+        post_id=post.pk).values_list('tag_id', flat=True))
+    weights = tag_weights(tag_ids, published_count)
+    if not weights:
+        return []
+
+    scores = defaultdict(float)
+    categories = {}
+    rows = PostTags.objects.filter(
+        tag_id__in=weights, post__is_published=True,
+    ).exclude(post_id=post.pk).values_list(
+        'post_id', 'tag_id', 'post__category_id')
+    for pk, tag_id, category_id in rows:
+        scores[pk] += weights[tag_id]
+        categories[pk] = category_id
+
+    if post.category_id:
+        for pk, category_id in categories.items():
+            if category_id == post.category_id:
+                scores[pk] += CATEGORY_WEIGHT
+
+    return heapq.nlargest(
+        RELATED_LIMIT, ((round(score, 6), pk) for pk, score in scores.items()))
+
+
+def store_related(post_id, ranked):
+    """
+    Grava a lista do post, se ela mudou.
+
+    Returns:
+        bool: Se a lista foi regravada
+    """
+    current = list(
+        RelatedPost.objects.filter(post_id=post_id)
+        .order_by('-score', '-related_id').values_list('score', 'related_id'))
+    if current == list(ranked):
+        return False
+
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id=post_id).delete()
+        RelatedPost.objects.bulk_create(
+            RelatedPost(post_id=post_id, related_id=pk, score=score)
+            for score, pk in ranked)
+    return True
+
+
+def neighbourhood(post_ids=(), tag_ids=()):
+    """
+    Posts cuja lista pode ter mudado: os informados e os publicados que
+    têm alguma das tags.
+
+    Tags acima de ``MAX_TAG_POSTS`` não pesam (``tag_weights``), então
+    não mudam a lista de ninguém e seus posts ficam de fora. O ``+ 1``
+    cobre a tag que acabou de cruzar o limite (ganhou ou perdeu o peso).
+    """
+    affected = set(post_ids)
+    if tag_ids:
+        tag_ids = Tag.objects.filter(
+            pk__in=tag_ids, published_post_count__lte=MAX_TAG_POSTS + 1,
+        ).values_list('pk', flat=True)
+        affected.update(PostTags.objects.filter(
+            tag_id__in=tag_ids, post__is_published=True,
+        ).values_list('post_id', flat=True))
+    return affected
+
+
+def refresh(post_ids, published_count=None):
+    """
+    Recalcula a lista dos posts e tira do cache as páginas que mudaram.
+
+    Returns:
+        int: Quantidade de listas regravadas
+    """
+    if published_count is None:
+        published_count = count_published()
+    posts = Post.objects.filter(pk__in=list(post_ids)).only(
+        'pk', 'is_published', 'category_id')
+
+    changed = [
+        post.pk for post in posts
+        if store_related(post.pk, compute_related(post, published_count))
+    ]
+    page_cache.invalidate(*[dep('post', pk) for pk in changed])
+    return len(changed)
+
+
+def rebuild_all(batch_size=200):
+    """
+    Recalcula a lista de todos os posts publicados, em lotes por pk.
+
+    Returns:
+        tuple: (posts lidos, listas regravadas)
+    """
+    stale = list(RelatedPost.objects.filter(
+        post__is_published=False).values_list('post_id', flat=True))
+    RelatedPost.objects.filter(post_id__in=stale).delete()
+    page_cache.invalidate(*[dep('post', pk) for pk in set(stale)])
+
+    published_count = count_published()
+    seen = changed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            Post.objects.get_published().filter(pk__gt=last_pk)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return seen, changed
+        changed += refresh(batch, published_count)
+        seen += len(batch)
+        last_pk = batch[-1]
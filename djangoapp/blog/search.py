@@ -0,0 +1,64 @@
+"""
+Busca de posts.
+
+No PostgreSQL a busca usa a coluna ``Post.search_vector`` (tsvector com
+índice GIN), com pesos título > resumo > conteúdo e a configuração
+``portuguese``, e os resultados vêm ordenados por relevância. Em outros
+bancos (ex.: SQLite nos testes) cai no ``icontains`` de antes.
+"""
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F, Q
+
+SEARCH_CONFIG = 'portuguese'
+
+
+def full_text_available():
+    """
+    A busca textual completa só existe no PostgreSQL.
+    """
+    return connection.vendor == 'postgresql'
+
+
+def post_search_vector():
+    """
+    Expressão que monta o tsvector de um post.
+    """
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector('excerpt', weight='B', config=SEARCH_CONFIG) +
+        SearchVector('content', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(queryset):
+    """
+    Recalcula o ``search_vector`` dos posts do queryset (só no PostgreSQL).
+    """
+    if full_text_available():
+        queryset.update(search_vector=post_search_vector())
+
+
+def search_posts(queryset, value):
+    """
+    Filtra o queryset pelos posts que casam com ``value``.
+
+    Returns:
+        tuple: (queryset, ranqueado). Quando ranqueado é True o queryset
+        está ordenado por relevância e não deve ser reordenado por pk.
+    """
+    if full_text_available():
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type='websearch')
+        queryset = queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-pk')
+        return queryset, True
+
+    return queryset.filter(
+        Q(title__icontains=value) |
+        Q(excerpt__icontains=value) |
+        Q(content__icontains=value)
+    ), False
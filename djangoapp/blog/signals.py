@@ -0,0 +1,471 @@
+"""
+Signals do blog.
+
+Mantém em dia, sempre que um Post é publicado, despublicado, muda de
+categoria/autor, tem as tags alteradas ou é excluído:
+
+- os contadores desnormalizados (blog/counters.py);
+- o cache de páginas dos visitantes anônimos (blog/page_cache.py);
+- o cache das sugestões da busca (blog/suggestions.py);
+- os posts relacionados (blog/related.py), recalculados pela fila;
+- os shards do sitemap (blog/sitemaps.py) com os objetos alterados.
+
+Também liga a contagem de referências dos arquivos da capa e dos anexos
+(jobs/files.py), que podem ser compartilhados entre objetos.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from jobs.files import count_references
+
+from . import counters, page_cache, sitemaps, suggestions
+from .models import Category, Page, Post, PostAttachment, RelatedPost, Tag
+from .page_cache import dep
+from .tasks import enqueue_related_refresh
+
+User = get_user_model()
+PostTags = Post.tags.through
+
+_EMPTY_STATE = {
+    'is_published': False, 'category_id': None, 'created_by_id': None,
+}
+
+
+def _counted_state(post):
+    """
+    Parte do estado do post que influencia os contadores e as listagens.
+    """
+    return {
+        'is_published': post.is_published,
+        'category_id': post.category_id,
+        'created_by_id': post.created_by_id,
+    }
+
+
+def _listing_deps(state):
+    """
+    Dependências das listagens em que um post com esse estado aparece.
+    """
+    if not state['is_published']:
+        return []
+    deps = [dep('list:index')]
+    if state['category_id']:
+        deps.append(dep('list:category', state['category_id']))
+    if state['created_by_id']:
+        deps.append(dep('list:author', state['created_by_id']))
+    return deps
+
+
+def _move(bump, field, old, new):
+    """
+    Tira o post do contador antigo e coloca no novo, se algo mudou.
+    """
+    old_id = old[field] if old['is_published'] else None
+    new_id = new[field] if new['is_published'] else None
+    if old_id == new_id:
+        return
+    bump([old_id], -1)
+    bump([new_id], +1)
+
+
+# ===================================================================
+# POST: SAVE
+# ===================================================================
+
+_COUNTED_FIELDS = {
+    'is_published': 'is_published',
+    'category': 'category_id',
+    'created_by': 'created_by_id',
+}
+_MISSING = object()
+
+
+def _previous_counted_state(instance):
+    """
+    Estado do post no banco antes do save.
+
+    Usa os valores guardados pelo FieldTrackerMixin quando o post foi
+    carregado ou salvo pela última vez; só consulta o banco se o post foi
+    montado à mão (ex.: ``Post(pk=1, ...)``) ou teve algum desses campos
+    adiado com ``only``/``defer``.
+    """
+    state = {
+        key: instance.previous_value(field, _MISSING)
+        for field, key in _COUNTED_FIELDS.items()
+    }
+    if _MISSING not in state.values():
+        return state
+    return Post.objects.filter(pk=instance.pk).values(
+        *_COUNTED_FIELDS.values()).first()
+
+
+@receiver(pre_save, sender=Post)
+def remember_counted_state(sender, instance, raw=False, update_fields=None,
+                           **kwargs):
+    instance._counted_state = None
+    instance._saved_counted_state = None
+    if raw or instance.pk is None:
+        return
+
+    if update_fields is not None:
+        saved = set(update_fields) & set(_COUNTED_FIELDS)
+        if not saved:
+            # Save parcial que não mexe em nada que é contado
+            instance._counted_state = _counted_state(instance)
+            instance._saved_counted_state = instance._counted_state
+            return
+
+    old = _previous_counted_state(instance)
+    instance._counted_state = old
+    if update_fields is not None and old is not None:
+        # Só o que está em update_fields chega ao banco
+        new = dict(old)
+        for field in saved:
+            key = _COUNTED_FIELDS[field]
+            new[key] = getattr(instance, key)
+        instance._saved_counted_state = new
+
+
+def _states(instance):
+    """
+    (estado antes, estado depois) do save que acabou de acontecer.
+    """
+    old = getattr(instance, '_counted_state', None) or _EMPTY_STATE
+    new = (getattr(instance, '_saved_counted_state', None) or
+           _counted_state(instance))
+    return old, new
+
+
+@receiver(post_save, sender=Post)
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    old, new = _states(instance)
+    if old == new:
+        return
+
+    _move(counters.bump_categories, 'category_id', old, new)
+    _move(counters.bump_authors, 'created_by_id', old, new)
+
+    # As tags só mudam de contador quando o post é (des)publicado; a troca
+    # de tags em si é tratada no m2m_changed abaixo.
+    if not created and old['is_published'] != new['is_published']:
+        tag_ids = list(instance.tags.values_list('pk', flat=True))
+        counters.bump_tags(tag_ids, +1 if new['is_published'] else -1)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_pages_on_save(sender, instance, created, raw=False,
+                                  **kwargs):
+    if raw:
+        return
+
+    # A página do post, as listagens onde ele já aparece e as páginas
+    # que o exibem entre os relacionados dependem dele
+    deps = [dep('post', instance.pk)]
+    if not created:
+        deps += _related_pages(instance)
+
+    # Se ele entrou, saiu ou mudou de listagem, as listagens afetadas
+    # mudam de conteúdo (e de paginação) como um todo.
+    old, new = _states(instance)
+    if old != new:
+        deps += _listing_deps(old) + _listing_deps(new)
+        if not created and old['is_published'] != new['is_published']:
+            deps += [
+                dep('list:tag', pk)
+                for pk in instance.tags.values_list('pk', flat=True)
+            ]
+
+    page_cache.invalidate(*deps)
+
+
+# ===================================================================
+# POST: TAGS
+# ===================================================================
+
+@receiver(m2m_changed, sender=PostTags)
+def update_tags_on_change(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    if not reverse:
+        _post_tags_changed(instance, action, pk_set)
+    else:
+        _tag_posts_changed(instance, action, pk_set)
+
+
+def _post_tags_changed(post, action, pk_set):
+    """
+    ``post.tags.add/remove/clear``: pk_set são ids de Tag.
+    """
+    if action == 'pre_remove':
+        post._removed_tag_ids = list(
+            post.tags.filter(pk__in=pk_set).values_list('pk', flat=True))
+    elif action == 'pre_clear':
+        post._removed_tag_ids = list(post.tags.values_list('pk', flat=True))
+
+    if action == 'post_add':
+        tag_ids = list(pk_set)
+        delta = +1
+    elif action in ('post_remove', 'post_clear'):
+        tag_ids = post._removed_tag_ids
+        delta = -1
+    else:
+        return
+
+    deps = [dep('post', post.pk)]
+    if post.is_published:
+        counters.bump_tags(tag_ids, delta)
+        deps += [dep('list:tag', pk) for pk in tag_ids]
+        enqueue_related_refresh([post.pk], tag_ids)
+    page_cache.invalidate(*deps)
+
+
+def _tag_posts_changed(tag, action, pk_set):
+    """
+    ``tag.post_set.add/remove/clear``: pk_set são ids de Post.
+    """
+    links = PostTags.objects.filter(tag=tag)
+    if action == 'pre_remove':
+        tag._removed_posts = list(links.filter(post_id__in=pk_set).values_list(
+            'post_id', 'post__is_published'))
+    elif action == 'pre_clear':
+        tag._removed_posts = list(
+            links.values_list('post_id', 'post__is_published'))
+
+    if action == 'post_add':
+        posts = list(Post.objects.filter(pk__in=pk_set).values_list(
+            'pk', 'is_published'))
+        delta = +1
+    elif action in ('post_remove', 'post_clear'):
+        posts = tag._removed_posts
+        delta = -1
+    else:
+        return
+
+    published = [pk for pk, is_published in posts if is_published]
+    counters.bump_tags([tag.pk], delta * len(published))
+    if published:
+        enqueue_related_refresh(published, [tag.pk])
+    page_cache.invalidate(
+        dep('list:tag', tag.pk), *[dep('post', pk) for pk, _ in posts])
+
+
+# ===================================================================
+# POST: DELETE
+# ===================================================================
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_tags(sender, instance, **kwargs):
+    # As linhas da tabela M2M somem junto com o post, então guardamos
+    # as tags antes da exclusão.
+    instance._deleted_tag_ids = []
+    if instance.is_published:
+        instance._deleted_tag_ids = list(
+            instance.tags.values_list('pk', flat=True))
+    # As linhas de RelatedPost também somem (CASCADE)
+    instance._related_pages = _related_pages(instance)
+
+
+@receiver(post_delete, sender=Post)
+def update_counters_on_delete(sender, instance, **kwargs):
+    if not instance.is_published:
+        return
+    counters.bump_categories([instance.category_id], -1)
+    counters.bump_authors([instance.created_by_id], -1)
+    counters.bump_tags(getattr(instance, '_deleted_tag_ids', []), -1)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages_on_delete(sender, instance, **kwargs):
+    page_cache.invalidate(
+        dep('post', instance.pk),
+        *_listing_deps(_counted_state(instance)),
+        *[dep('list:tag', pk)
+          for pk in getattr(instance, '_deleted_tag_ids', [])],
+        *getattr(instance, '_related_pages', []),
+    )
+
+
+def _related_pages(post):
+    """
+    Páginas de posts que exibem o post entre os relacionados.
+    """
+    return [
+        dep('post', pk) for pk in RelatedPost.objects.filter(
+            related=post).values_list('post_id', flat=True)
+    ]
+
+
+# ===================================================================
+# POSTS RELACIONADOS
+# ===================================================================
+
+@receiver(post_save, sender=Post)
+def refresh_related_on_save(sender, instance, created, raw=False, **kwargs):
+    # Publicar, despublicar ou mudar de categoria muda a pontuação do
+    # post nas listas dos vizinhos. A troca de tags vem pelo m2m_changed
+    # (um post recém-criado ainda não tem tags).
+    if raw or created:
+        return
+    old, new = _states(instance)
+    if old['is_published'] == new['is_published'] and (
+            not new['is_published'] or
+            old['category_id'] == new['category_id']):
+        return
+    enqueue_related_refresh(
+        [instance.pk], instance.tags.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def refresh_related_on_delete(sender, instance, **kwargs):
+    enqueue_related_refresh(
+        tag_ids=getattr(instance, '_deleted_tag_ids', []))
+
+
+@receiver(pre_delete, sender=Tag)
+def refresh_related_on_tag_delete(sender, instance, **kwargs):
+    # Depois da exclusão não há mais como achar os posts pela tag
+    enqueue_related_refresh(PostTags.objects.filter(
+        tag=instance, post__is_published=True,
+    ).values_list('post_id', flat=True))
+
+
+# ===================================================================
+# DEMAIS MODELS EXIBIDOS NAS PÁGINAS
+# ===================================================================
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def invalidate_page(sender, instance, **kwargs):
+    page_cache.invalidate(dep('page', instance.pk))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    page_cache.invalidate(dep('category', instance.pk))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tag(sender, instance, created=False, **kwargs):
+    # A página de cada post mostra o nome das suas tags. Invalidar os
+    # posts (e não só a tag) deixa a página do post depender apenas do
+    # próprio post, da categoria e do autor, que o ETag calcula sem
+    # consultar as tags. No delete as ligações ainda existem (pre_delete).
+    deps = [dep('tag', instance.pk)]
+    if not created:
+        deps += [
+            dep('post', pk) for pk in PostTags.objects.filter(
+                tag=instance).values_list('post_id', flat=True)
+        ]
+    page_cache.invalidate(*deps)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, update_fields=None, **kwargs):
+    # O login só atualiza o last_login, que não aparece em nenhuma página
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    page_cache.invalidate(dep('author', instance.pk))
+
+
+# ===================================================================
+# SITEMAP
+# ===================================================================
+
+def _sitemap_post_changed(post, states, tag_ids):
+    """
+    Shards do post e das listagens (categoria, autor, tags) cujo lastmod
+    ou conteúdo pode ter mudado com o post.
+    """
+    states = [state for state in states if state['is_published']]
+    if not states:
+        return
+    sitemaps.invalidate('posts', post.pk)
+    sitemaps.invalidate(
+        'categories', *[state['category_id'] for state in states])
+    sitemaps.invalidate(
+        'authors', *[state['created_by_id'] for state in states])
+    sitemaps.invalidate('tags', *tag_ids)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_sitemap_on_save(sender, instance, created, raw=False,
+                               **kwargs):
+    if raw:
+        return
+    old, new = _states(instance)
+    if not (old['is_published'] or new['is_published']):
+        return
+    # Post recém-criado ainda não tem tags
+    tag_ids = [] if created else instance.tags.values_list('pk', flat=True)
+    _sitemap_post_changed(instance, (old, new), tag_ids)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_sitemap_on_delete(sender, instance, **kwargs):
+    _sitemap_post_changed(
+        instance, [_counted_state(instance)],
+        getattr(instance, '_deleted_tag_ids', []))
+
+
+@receiver(m2m_changed, sender=PostTags)
+def invalidate_sitemap_on_tags(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # tag.post_set.add/remove/clear
+        sitemaps.invalidate('tags', instance.pk)
+    elif instance.is_published:
+        tag_ids = pk_set or getattr(instance, '_removed_tag_ids', [])
+        sitemaps.invalidate('tags', *tag_ids)
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def invalidate_sitemap_page(sender, instance, **kwargs):
+    sitemaps.invalidate('pages', instance.pk)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_sitemap_category(sender, instance, **kwargs):
+    sitemaps.invalidate('categories', instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_sitemap_tag(sender, instance, **kwargs):
+    sitemaps.invalidate('tags', instance.pk)
+
+
+# ===================================================================
+# SUGESTÕES DA BUSCA
+# ===================================================================
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=PostTags)
+def clear_suggestions(sender, raw=False, **kwargs):
+    # Tags e categorias só são sugeridas enquanto têm posts publicados,
+    # então a troca de tags de um post também afeta as sugestões.
+    if not raw:
+        suggestions.clear_cache()
+
+
+# ===================================================================
+# ARQUIVOS COMPARTILHADOS
+# ===================================================================
+
+count_references(Post, 'cover')
+count_references(PostAttachment, 'file')
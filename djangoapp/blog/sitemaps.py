@@ -0,0 +1,230 @@
+"""
+Sitemap do blog: um índice (``/sitemap.xml``) e arquivos divididos por
+tipo e faixa de id (``/sitemap-posts-0.xml``, ``/sitemap-tags-2.xml``...).
+
+Cada arquivo ("shard") cobre os ids de ``n * SHARD_SIZE`` até
+``(n + 1) * SHARD_SIZE - 1``. Como um objeto nunca muda de id, ele fica
+sempre no mesmo shard: quando ele muda, só aquele arquivo é gerado de
+novo (e o índice, que mostra o lastmod de cada shard).
+
+- Os arquivos ficam no cache de página (blog/conditional.py,
+  ``serve_cached``), com a dependência ``sitemap:<tipo>:<n>``; os signals
+  chamam ``invalidate`` com os ids que mudaram.
+- Cada shard é gerado lendo o banco com ``.iterator()`` e escrevendo o
+  XML aos poucos, sem montar a lista inteira na memória.
+- O ``lastmod`` vem do ``updated_at``: do próprio post/página ou, para
+  categorias, tags e autores, do post publicado mais recente deles. Só
+  entram categorias, tags e autores com algum post publicado.
+"""
+
+from django.db.models import F, Max
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from . import page_cache
+from .conditional import serve_cached
+from .models import Page, Post
+from .page_cache import dep
+
+PostTags = Post.tags.through
+
+# URLs por arquivo (o limite do protocolo é 50.000)
+SHARD_SIZE = 5000
+
+# Linhas lidas por consulta ao gerar um shard
+ITERATOR_CHUNK_SIZE = 1000
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+class Section:
+    """
+    Um tipo de URL do sitemap.
+
+    Subclasses definem ``stamps()``: queryset de posts/páginas publicados
+    com ``key`` (id do objeto da URL) e ``stamp`` (o updated_at que conta
+    para o lastmod); e ``entries(shard)``: ``(caminho, lastmod)`` dos
+    objetos do shard, em ordem de id.
+    """
+    name = None
+
+    def shards(self):
+        """
+        Shards com algum objeto e o lastmod de cada um.
+
+        Returns:
+            list: (número do shard, lastmod), em ordem
+        """
+        return list(
+            self.stamps().annotate(shard=F('key') / SHARD_SIZE)
+            .values('shard').annotate(lastmod=Max('stamp'))
+            .values_list('shard', 'lastmod').order_by('shard'))
+
+
+class PostSection(Section):
+    name = 'posts'
+
+    def stamps(self):
+        return Post.objects.get_published().annotate(
+            key=F('pk'), stamp=F('updated_at'))
+
+    def entries(self, shard):
+        start = shard * SHARD_SIZE
+        rows = (
+            Post.objects.get_published()
+            .filter(pk__gte=start, pk__lt=start + SHARD_SIZE)
+            .order_by('pk').values_list('slug', 'updated_at')
+            .iterator(chunk_size=ITERATOR_CHUNK_SIZE))
+        for slug, lastmod in rows:
+            yield reverse('blog:post', args=(slug,)), lastmod
+
+
+class PageSection(Section):
+    name = 'pages'
+
+    def stamps(self):
+        return Page.objects.filter(is_published=True).annotate(
+            key=F('pk'), stamp=F('updated_at'))
+
+    def entries(self, shard):
+        start = shard * SHARD_SIZE
+        rows = (
+            Page.objects.filter(
+                is_published=True, pk__gte=start,
+                pk__lt=start + SHARD_SIZE)
+            .order_by('pk').values_list('slug', 'updated_at')
+            .iterator(chunk_size=ITERATOR_CHUNK_SIZE))
+        for slug, lastmod in rows:
+            yield reverse('blog:page', args=(slug,)), lastmod
+
+
+class _ListingSection(Section):
+    """
+    Categorias, tags e autores: a URL é a listagem dos posts do objeto.
+
+    O ``stamps()`` também anota ``url_arg``, o argumento da URL.
+    """
+    url_name = None
+
+    def entries(self, shard):
+        start = shard * SHARD_SIZE
+        rows = (
+            self.stamps().filter(key__gte=start, key__lt=start + SHARD_SIZE)
+            .values('key', 'url_arg').annotate(lastmod=Max('stamp'))
+            .values_list('url_arg', 'lastmod').order_by('key')
+            .iterator(chunk_size=ITERATOR_CHUNK_SIZE))
+        for url_arg, lastmod in rows:
+            yield reverse(self.url_name, args=(url_arg,)), lastmod
+
+
+class CategorySection(_ListingSection):
+    name = 'categories'
+    url_name = 'blog:category'
+
+    def stamps(self):
+        return Post.objects.get_published().filter(
+            category__isnull=False,
+        ).annotate(key=F('category_id'), url_arg=F('category__slug'),
+                   stamp=F('updated_at'))
+
+
+class TagSection(_ListingSection):
+    name = 'tags'
+    url_name = 'blog:tag'
+
+    def stamps(self):
+        return PostTags.objects.filter(post__is_published=True).annotate(
+            key=F('tag_id'), url_arg=F('tag__slug'),
+            stamp=F('post__updated_at'))
+
+
+class AuthorSection(_ListingSection):
+    name = 'authors'
+    url_name = 'blog:created_by'
+
+    def stamps(self):
+        return Post.objects.get_published().filter(
+            created_by__isnull=False,
+        ).annotate(key=F('created_by_id'), url_arg=F('created_by_id'),
+                   stamp=F('updated_at'))
+
+
+SECTIONS = {
+    section.name: section
+    for section in (PostSection(), PageSection(), CategorySection(),
+                    TagSection(), AuthorSection())
+}
+
+
+def shard_dep(section, pk):
+    """
+    Dependência do shard que contém o objeto ``pk`` da seção.
+    """
+    return dep(f'sitemap:{section}', pk // SHARD_SIZE)
+
+
+def invalidate(section, *pks):
+    """
+    Gera de novo os shards com esses ids (e o índice) depois do commit.
+    """
+    pks = {pk for pk in pks if pk}
+    if pks:
+        page_cache.invalidate(
+            dep('sitemap'), *[shard_dep(section, pk) for pk in pks])
+
+
+def _lastmod(value):
+    return value.isoformat(timespec='seconds')
+
+
+def _xml_response():
+    response = HttpResponse(content_type='application/xml; charset=utf-8')
+    handler = SimplerXMLGenerator(response, 'utf-8')
+    handler.startDocument()
+    return response, handler
+
+
+def sitemap_index(request):
+    def build():
+        response, handler = _xml_response()
+        handler.startElement('sitemapindex', {'xmlns': SITEMAP_NS})
+        newest = None
+        for name, section in SECTIONS.items():
+            for shard, lastmod in section.shards():
+                handler.startElement('sitemap', {})
+                handler.addQuickElement('loc', request.build_absolute_uri(
+                    reverse('blog:sitemap_shard', args=(name, shard))))
+                handler.addQuickElement('lastmod', _lastmod(lastmod))
+                handler.endElement('sitemap')
+                newest = max(newest or lastmod, lastmod)
+        handler.endElement('sitemapindex')
+        return (response, [dep('sitemap')],
+                newest.timestamp() if newest else None)
+
+    return serve_cached(request, build)
+
+
+def sitemap_shard(request, section, shard):
+    if section not in SECTIONS:
+        raise Http404('Seção do sitemap não existe.')
+
+    def build():
+        response, handler = _xml_response()
+        handler.startElement('urlset', {'xmlns': SITEMAP_NS})
+        newest = None
+        for path, lastmod in SECTIONS[section].entries(shard):
+            handler.startElement('url', {})
+            handler.addQuickElement('loc', request.build_absolute_uri(path))
+            handler.addQuickElement('lastmod', _lastmod(lastmod))
+            handler.endElement('url')
+            newest = max(newest or lastmod, lastmod)
+        if newest is None:
+            # Shard além do último (ou que ficou vazio): o índice não o
+            # lista, e um <urlset> vazio não deve ir para o cache
+            raise Http404('Shard do sitemap não existe.')
+        handler.endElement('urlset')
+        return (response, [dep(f'sitemap:{section}', shard)],
+                newest.timestamp() if newest else None)
+
+    return serve_cached(request, build)
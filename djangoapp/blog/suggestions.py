@@ -0,0 +1,138 @@
+"""
+Sugestões da busca enquanto o usuário digita.
+
+Retorna os títulos de posts, tags e categorias que combinam com um
+prefixo ou com um trecho digitado errado. No PostgreSQL usa ``pg_trgm``
+(índices GIN com ``gin_trgm_ops`` em ``Post.title``, ``Tag.name`` e
+``Category.name``), filtrando e ordenando pela similaridade do trecho
+com alguma palavra do texto (``%>``, que o índice atende). Em outros
+bancos cai no ``icontains``.
+
+Como o endpoint é chamado a cada tecla, os resultados ficam na camada de
+cache (``utils/cache.py``): os prefixos mais usados no LRU do processo, e
+os demais no cache compartilhado, calculados uma vez para todos os
+workers. Os signals do blog invalidam o namespace das sugestões quando
+posts, tags ou categorias mudam, em todos os workers.
+"""
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.urls import reverse
+
+from utils.cache import TieredCache
+
+from .models import Category, Post, Tag
+
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_MAX_LENGTH = 100
+SUGGEST_DEFAULT_LIMIT = 5
+SUGGEST_MAX_LIMIT = 10
+
+SUGGEST_NAMESPACE = 'suggestions'
+# Segundos de vida de um resultado (as mudanças invalidam antes)
+SUGGEST_CACHE_TIMEOUT = 10 * 60
+
+_cache = TieredCache(local_maxsize=512)
+
+
+def normalize_term(term):
+    """
+    Normaliza o termo digitado para servir de chave do cache.
+    """
+    return ' '.join((term or '').split()).lower()[:SUGGEST_MAX_LENGTH]
+
+
+def _trigram_available():
+    return connection.vendor == 'postgresql'
+
+
+def _match(queryset, field, term):
+    """
+    Filtra e ordena o queryset pelos registros cujo ``field`` combina com
+    ``term``, do mais parecido para o menos parecido.
+    """
+    if _trigram_available():
+        # Só o operador de trigramas: um icontains (UPPER(col) LIKE ...)
+        # no mesmo filtro não usa o índice e obriga uma varredura
+        # completa da tabela a cada tecla.
+        return queryset.filter(
+            **{f'{field}__trigram_word_similar': term}
+        ).annotate(
+            similarity=TrigramWordSimilarity(term, field)
+        ).order_by('-similarity', field)
+
+    # Sem pg_trgm: quem começa com o termo vem antes
+    return queryset.filter(**{f'{field}__icontains': term}).order_by(field)
+
+
+def _querysets(term, limit):
+    """
+    Consultas de posts, tags e categorias para o termo (já normalizado).
+    """
+    return {
+        'posts': _match(
+            Post.objects.get_published(), 'title', term
+        ).values_list('title', 'slug')[:limit],
+        'tags': _match(
+            Tag.objects.filter(published_post_count__gt=0), 'name', term
+        ).values_list('name', 'slug')[:limit],
+        'categories': _match(
+            Category.objects.filter(published_post_count__gt=0), 'name', term
+        ).values_list('name', 'slug')[:limit],
+    }
+
+
+def _find(term, limit):
+    querysets = _querysets(term, limit)
+
+    def ranked(rows):
+        # No fallback, prefixos ganham dos demais trechos
+        rows = list(rows)
+        if not _trigram_available():
+            rows.sort(key=lambda row: not row[0].lower().startswith(term))
+        return rows
+
+    return {
+        'posts': [
+            {'title': title, 'url': reverse('blog:post', args=[slug])}
+            for title, slug in ranked(querysets['posts'])
+        ],
+        'tags': [
+            {'name': name, 'url': reverse('blog:tag', args=[slug])}
+            for name, slug in ranked(querysets['tags'])
+        ],
+        'categories': [
+            {'name': name, 'url': reverse('blog:category', args=[slug])}
+            for name, slug in ranked(querysets['categories'])
+        ],
+    }
+
+
+def suggest(term, limit=SUGGEST_DEFAULT_LIMIT):
+    """
+    Sugestões de posts, tags e categorias para o termo digitado.
+
+    Args:
+        term: Texto digitado na busca
+        limit: Máximo de itens por tipo (limitado a ``SUGGEST_MAX_LIMIT``)
+
+    Returns:
+        dict: ``{'posts': [...], 'tags': [...], 'categories': [...]}``, ou
+        listas vazias se o termo for curto demais
+    """
+    term = normalize_term(term)
+    limit = max(1, min(int(limit), SUGGEST_MAX_LIMIT))
+    if len(term) < SUGGEST_MIN_LENGTH:
+        return {'posts': [], 'tags': [], 'categories': []}
+
+    return _cache.get_or_compute(
+        f'{limit}:{term}', lambda: _find(term, limit),
+        timeout=SUGGEST_CACHE_TIMEOUT, namespace=SUGGEST_NAMESPACE)
+
+
+def clear_cache():
+    """
+    Invalida as sugestões de todos os workers depois do commit da
+    transação atual.
+    """
+    _cache.invalidate(SUGGEST_NAMESPACE)
@@ -0,0 +1,136 @@
+"""
+Atribuição de tags aos posts em quantidade fixa de queries.
+
+Usado pelo ``PostForm`` (criação e edição de posts pelo site) e pelo
+``PostAdmin``. Em vez de um ``get_or_create`` + ``add`` por tag, as tags
+existentes são buscadas de uma vez, as que faltam são criadas com um
+único ``bulk_create`` (com slugs únicos já calculados) e a relação do
+post é ajustada com um ``add`` e um ``remove``.
+"""
+
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils.text import slugify as django_slugify
+from unidecode import unidecode
+
+from utils.rands import random_slug
+
+from .models import Tag
+
+SLUG_MAX_LENGTH = Tag._meta.get_field('slug').max_length
+NAME_MAX_LENGTH = Tag._meta.get_field('name').max_length
+
+
+def parse_tag_names(raw):
+    """
+    Separa os nomes digitados (separados por vírgula), normaliza os
+    espaços e remove repetidos, sem diferenciar maiúsculas de minúsculas.
+
+    Returns:
+        list: Nomes na ordem em que foram digitados
+    """
+    names = {}
+    for name in (raw or '').split(','):
+        name = ' '.join(name.split())[:NAME_MAX_LENGTH]
+        if name:
+            names.setdefault(name.lower(), name)
+    return list(names.values())
+
+
+def _base_slug(name):
+    slug = django_slugify(unidecode(name)) or random_slug(k=8)
+    # Deixa espaço para o sufixo aleatório
+    return slug[:SLUG_MAX_LENGTH - 5].strip('-')
+
+
+def _unique_slugs(names):
+    """
+    Calcula um slug único para cada nome novo, com a mesma regra do
+    ``Tag.save`` (slug do nome, ou slug + sufixo aleatório se já existir).
+
+    Normalmente custa uma query; só repete se um sufixo aleatório colidir.
+    """
+    slugs = {name: _base_slug(name) for name in names}
+    pending = list(names)
+    while pending:
+        taken = set(Tag.objects.filter(
+            slug__in=[slugs[name] for name in pending]
+        ).values_list('slug', flat=True))
+
+        used = set(slugs[name] for name in names if name not in pending)
+        retry = []
+        for name in pending:
+            if slugs[name] in taken or slugs[name] in used:
+                slugs[name] = f'{_base_slug(name)}-{random_slug(k=4)}'
+                retry.append(name)
+            else:
+                used.add(slugs[name])
+        pending = retry
+    return slugs
+
+
+def get_or_create_tags(names):
+    """
+    Busca as tags pelo nome (sem diferenciar maiúsculas de minúsculas) e
+    cria de uma vez as que não existem.
+
+    Returns:
+        list: Tags na mesma ordem de ``names``
+    """
+    if not names:
+        return []
+
+    keys = [name.lower() for name in names]
+    existing = {}
+    # Se houver tags repetidas no banco, fica a mais antiga
+    for tag in Tag.objects.annotate(
+        lower_name=Lower('name')
+    ).filter(lower_name__in=keys).order_by('-pk'):
+        existing[tag.lower_name] = tag
+
+    missing = [name for name in names if name.lower() not in existing]
+    if missing:
+        slugs = _unique_slugs(missing)
+        created = Tag.objects.bulk_create(
+            [Tag(name=name, slug=slugs[name]) for name in missing])
+        for tag in created:
+            existing[tag.name.lower()] = tag
+
+    return [existing[key] for key in keys]
+
+
+def set_post_tags(post, tags):
+    """
+    Faz com que as tags do post sejam exatamente ``tags``.
+
+    A relação é ajustada com um único ``remove`` e um único ``add`` da
+    diferença, então os signals de m2m_changed (contadores e cache de
+    páginas) rodam uma vez por operação, e não uma vez por tag.
+
+    Args:
+        post: Post já salvo
+        tags: Tags (ou pks de tags) que o post deve ter
+    """
+    wanted = {getattr(tag, 'pk', tag) for tag in tags}
+    with transaction.atomic():
+        current = set(post.tags.values_list('pk', flat=True))
+        if current - wanted:
+            post.tags.remove(*(current - wanted))
+        if wanted - current:
+            post.tags.add(*(wanted - current))
+
+
+def set_post_tag_names(post, names):
+    """
+    Atalho para o formulário do site: cria as tags que faltam e aplica.
+
+    A quantidade de queries não depende da quantidade de tags: busca das
+    tags, checagem dos slugs, um bulk_create, as tags atuais do post e o
+    ``add``/``remove`` da diferença.
+
+    Args:
+        post: Post já salvo
+        names: Nomes das tags, ex.: o retorno de ``parse_tag_names``
+    """
+    with transaction.atomic():
+        set_post_tags(post, get_or_create_tags(names))
@@ -0,0 +1,30 @@
+"""
+Tarefas do blog na fila (jobs/queue.py).
+
+Os signals só enfileiram (``enqueue_related_refresh``); o recálculo dos
+posts relacionados (blog/related.py) roda no worker, fora do save.
+"""
+
+from jobs.queue import enqueue, task
+
+from . import related
+
+RELATED_TASK = 'blog.related'
+
+
+def enqueue_related_refresh(post_ids=(), tag_ids=()):
+    """
+    Enfileira o recálculo dos posts relacionados dos posts informados e
+    dos que têm alguma das tags.
+    """
+    post_ids = sorted({pk for pk in post_ids if pk})
+    tag_ids = sorted({pk for pk in tag_ids if pk})
+    if not post_ids and not tag_ids:
+        return None
+    return enqueue(
+        RELATED_TASK, payload={'post_ids': post_ids, 'tag_ids': tag_ids})
+
+
+@task(RELATED_TASK)
+def refresh_related(post_ids, tag_ids):
+    related.refresh(related.neighbourhood(post_ids, tag_ids))
@@ -1,3 +1,1664 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+from unittest import skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.template import TemplateDoesNotExist
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils import timezone
+from PIL import Image
+
+from blog import page_cache, related, suggestions, urls as blog_urls, views
+from project import urls as project_urls
+from blog.forms import PostForm
+from blog.attachments import unreferenced_attachments
+from blog.content import render_content
+from blog.models import (AuthorStats, Category, Page, Post, PostAttachment,
+                         RelatedPost, Tag)
+from blog.pagination import decode_cursor, encode_cursor
+from blog.tags import parse_tag_names, set_post_tag_names
+from site_setup.cache import get_site_setup
+from jobs import queue
+from site_setup.models import SiteSetup
+from utils.cache import TieredCache
+
+User = get_user_model()
+
+
+class BlogTestCase(TestCase):
+    """
+    Base para os testes do blog: limpa o cache e oferece atalhos para
+    criar posts.
+    """
+
+    def setUp(self):
+        cache.clear()
+        SiteSetup.objects.create(title='Blog', description='Descrição')
+        self.user = User.objects.create_user('autor', password='senha-123')
+        self.category = Category.objects.create(name='Django')
+
+    def make_post(self, title='Post', **kwargs):
+        kwargs.setdefault('is_published', True)
+        kwargs.setdefault('created_by', self.user)
+        kwargs.setdefault('category', self.category)
+        return Post.objects.create(
+            title=title, excerpt='Resumo', content='<p>Conteúdo</p>', **kwargs)
+
+
+class KeysetPaginationTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.posts = [self.make_post(f'Post {i}') for i in range(20)]
+        # O valor do settings é lido no import: o patch restaura o original
+        patcher = mock.patch.object(
+            views.PostListViewBase, 'keyset_pagination', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(1234)), 1234)
+
+    def test_pages_follow_cursors_without_count(self):
+        url = reverse('blog:index')
+        with CaptureQueriesContext(connection) as ctx:
+            first = self.client.get(url).context['page_obj']
+        self.assertFalse(
+            any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries))
+        self.assertEqual(
+            [p.pk for p in first], [p.pk for p in self.posts[::-1][:9]])
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+
+        second = self.client.get(
+            url + first.next_query_string).context['page_obj']
+        self.assertEqual(
+            [p.pk for p in second], [p.pk for p in self.posts[::-1][9:18]])
+
+        back = self.client.get(
+            url + second.previous_query_string).context['page_obj']
+        self.assertEqual([p.pk for p in back], [p.pk for p in first])
+        self.assertFalse(back.has_previous())
+
+    def test_keyset_links_keep_search_query(self):
+        response = self.client.get(reverse('blog:search'), {'q': 'Post'})
+        page = response.context['page_obj']
+        self.assertIn('q=Post', page.next_query_string)
+        self.assertContains(response, 'after=')
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse('blog:index'), {'after': '!!'})
+        self.assertEqual(response.status_code, 404)
+
+
+class OffsetPaginationTests(BlogTestCase):
+    def test_page_obj_is_the_django_page(self):
+        for i in range(10):
+            self.make_post(f'Post {i}')
+        response = self.client.get(reverse('blog:index'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 10)
+        self.assertContains(response, '?page=2')
+
+
+class ListingIndexUsageTests(BlogTestCase):
+    """
+    Garante via EXPLAIN que nenhuma listagem faz varredura completa de
+    blog_post ou blog_post_tags.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.tag = Tag.objects.create(name='Python')
+        for i in range(30):
+            post = self.make_post(f'Post {i}', is_published=i % 3 != 0)
+            post.tags.add(self.tag)
+
+    def get_queryset(self, view_class, user=None, **kwargs):
+        request = RequestFactory().get('/')
+        request.user = user or self.user
+        view = view_class()
+        view.setup(request, **kwargs)
+        view.load_listing_object()
+        return view.get_queryset()
+
+    def listing_querysets(self):
+        # listagem -> (queryset, índice que o plano deve usar)
+        return {
+            'index': (self.get_queryset(views.IndexView),
+                      'post_published_idx'),
+            'category': (self.get_queryset(
+                views.CategoryView, slug=self.category.slug),
+                'post_published_category_idx'),
+            'tag': (self.get_queryset(views.TagView, slug=self.tag.slug),
+                    'post_tags_tag_post_idx'),
+            'created_by': (self.get_queryset(
+                views.CreatedByView, id=self.user.pk),
+                'post_published_author_idx'),
+            'drafts': (self.get_queryset(views.DraftsView),
+                       'post_drafts_author_idx'),
+        }
+
+    def assertUsesIndex(self, name, queryset, index):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Com poucas linhas o Postgres prefere Seq Scan; desligamos
+                # para verificar se existe um índice utilizável.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset[:9].explain()
+        # Sem Seq Scan qualquer índice (até o da pk) passaria: o plano
+        # precisa citar o índice criado para a listagem.
+        self.assertIn(index, plan, f'{name}:\n{plan}')
+        if connection.vendor == 'postgresql':
+            self.assertNotIn('Seq Scan', plan, f'{name}:\n{plan}')
+        else:
+            for line in plan.splitlines():
+                if 'SCAN' in line and 'USING' not in line:
+                    self.fail(f'{name} sem índice:\n{plan}')
+
+    def test_every_listing_uses_an_index(self):
+        for name, (queryset, index) in self.listing_querysets().items():
+            with self.subTest(view=name):
+                self.assertUsesIndex(name, queryset, index)
+
+
+class ListingProjectionTests(BlogTestCase):
+    """
+    As listagens nunca devem trazer a coluna 'content' do banco.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.tag = Tag.objects.create(name='Python')
+        for i in range(3):
+            self.make_post(f'Post {i}').tags.add(self.tag)
+        self.make_post('Rascunho', is_published=False)
+
+    def selected_columns(self, sql):
+        sql = sql.upper()
+        return sql[sql.index('SELECT'):sql.index(' FROM ')]
+
+    def test_listing_pages_never_select_content(self):
+        self.client.force_login(self.user)
+        urls = [
+            reverse('blog:index'),
+            reverse('blog:category', args=(self.category.slug,)),
+            reverse('blog:tag', args=(self.tag.slug,)),
+            reverse('blog:created_by', args=(self.user.pk,)),
+            reverse('blog:search') + '?q=Post',
+            reverse('blog:post_drafts'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                for query in ctx.captured_queries:
+                    if 'BLOG_POST' not in query['sql'].upper():
+                        continue
+                    self.assertNotIn(
+                        '"CONTENT"', self.selected_columns(query['sql']))
+
+
+class PublishedCounterTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.python = Tag.objects.create(name='Python')
+        self.web = Tag.objects.create(name='Web')
+        self.other = Category.objects.create(name='Outra')
+
+    def assertCounts(self, category, python, web, author):
+        self.category.refresh_from_db()
+        self.python.refresh_from_db()
+        self.web.refresh_from_db()
+        self.assertEqual(self.category.published_post_count, category)
+        self.assertEqual(self.python.published_post_count, python)
+        self.assertEqual(self.web.published_post_count, web)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).published_post_count,
+            author)
+
+    def test_counters_follow_post_lifecycle(self):
+        post = self.make_post()
+        post.tags.add(self.python, self.web)
+        draft = self.make_post('Rascunho', is_published=False)
+        draft.tags.add(self.python)
+        self.assertCounts(category=1, python=1, web=1, author=1)
+
+        post.tags.remove(self.web)
+        self.assertCounts(category=1, python=1, web=0, author=1)
+
+        draft.is_published = True
+        draft.save()
+        self.assertCounts(category=2, python=2, web=0, author=2)
+
+        draft.category = self.other
+        draft.save()
+        self.assertCounts(category=1, python=2, web=0, author=2)
+
+        post.is_published = False
+        post.save()
+        self.assertCounts(category=0, python=1, web=0, author=1)
+
+        self.web.post_set.add(draft)
+        self.assertCounts(category=0, python=1, web=1, author=1)
+
+        draft.delete()
+        self.assertCounts(category=0, python=0, web=0, author=0)
+
+    def test_tag_listing_uses_counter_instead_of_count(self):
+        for i in range(12):
+            self.make_post(f'Post {i}').tags.add(self.python)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(
+                reverse('blog:tag', args=(self.python.slug,)))
+        self.assertEqual(response.context['paginator'].count, 12)
+        self.assertFalse(
+            any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries))
+
+    def test_rebuild_command_fixes_drift(self):
+        self.make_post().tags.add(self.python)
+        Tag.objects.update(published_post_count=99)
+        Category.objects.update(published_post_count=99)
+        AuthorStats.objects.all().delete()
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertCounts(category=1, python=1, web=0, author=1)
+
+
+class AnonymousPageCacheTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tag = Tag.objects.create(name='Python')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = self.make_post('Primeiro')
+            self.post.tags.add(self.tag)
+            self.other = self.make_post('Segundo')
+            self.page = Page.objects.create(
+                title='Sobre', content='Sobre nós', is_published=True)
+        self.urls = [
+            reverse('blog:index'),
+            reverse('blog:category', args=(self.category.slug,)),
+            reverse('blog:tag', args=(self.tag.slug,)),
+            reverse('blog:created_by', args=(self.user.pk,)),
+            reverse('blog:post', args=(self.post.slug,)),
+            reverse('blog:page', args=(self.page.slug,)),
+        ]
+
+    def assertCached(self, url):
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertNotCached(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        self.assertTrue(ctx.captured_queries, f'{url} veio do cache')
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                second = self.assertCached(url)
+                self.assertEqual(first.content, second.content)
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get(reverse('blog:index'))
+        self.assertNotCached(reverse('blog:index') + '?page=1')
+
+    def test_logged_in_users_bypass_the_cache(self):
+        self.client.get(self.urls[0])
+        self.client.force_login(self.user)
+        self.assertNotCached(self.urls[0])
+
+    def test_editing_a_post_only_evicts_pages_that_show_it(self):
+        other_url = reverse('blog:post', args=(self.other.slug,))
+        for url in self.urls + [other_url]:
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Título novo'
+            self.post.save()
+
+        # Páginas que listam ou exibem o post
+        for url in self.urls[:5]:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Título novo')
+        # Páginas que não dependem dele continuam no cache
+        self.assertCached(other_url)
+        self.assertCached(self.urls[5])
+
+    def test_tag_change_evicts_tag_listing(self):
+        tag_url = reverse('blog:tag', args=(self.tag.slug,))
+        self.client.get(tag_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.tags.add(self.tag)
+        self.assertContains(self.client.get(tag_url), 'Segundo')
+
+    def test_site_setup_change_evicts_everything(self):
+        self.client.get(self.urls[5])
+        with self.captureOnCommitCallbacks(execute=True):
+            setup = SiteSetup.objects.get()
+            setup.title = 'Outro blog'
+            setup.save()
+        self.assertContains(self.client.get(self.urls[5]), 'Outro blog')
+
+    def test_miss_waits_for_the_request_already_rendering(self):
+        get_site_setup()
+        url = self.urls[0]
+        key = page_cache.make_key(RequestFactory().get(url))
+        token = page_cache._single_flight.acquire(key)
+        self.assertTrue(token)
+
+        # Outro worker, que pegou a trava antes, termina a página
+        def other_worker():
+            time.sleep(0.1)
+            page_cache.store_response(
+                key, HttpResponse('Pronta'), [], time.time_ns())
+            page_cache.release(key, token)
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        thread.join()
+        self.assertContains(response, 'Pronta')
+
+    @override_settings(CACHE_LAYER_WAIT_TIMEOUT=0.1)
+    def test_abandoned_lock_only_delays_the_page(self):
+        key = page_cache.make_key(RequestFactory().get(self.urls[0]))
+        token = page_cache._single_flight.acquire(key)
+        self.assertContains(self.client.get(self.urls[0]), 'Primeiro')
+        # Quem desistiu de esperar não libera a trava de quem a tem
+        self.assertIsNone(page_cache._single_flight.acquire(key))
+        page_cache.release(key, token)
+
+    def test_errors_release_the_lock(self):
+        url = reverse('blog:category', args=('nao-existe',))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        key = page_cache.make_key(RequestFactory().get(url))
+        token = page_cache._single_flight.acquire(key)
+        self.assertTrue(token)
+        page_cache.release(key, token)
+
+    def test_template_errors_release_the_lock(self):
+        url = self.urls[0]
+        with mock.patch.object(
+                views.IndexView, 'template_name', 'nao-existe.html'):
+            with self.assertRaises(TemplateDoesNotExist):
+                self.client.get(url)
+        key = page_cache.make_key(RequestFactory().get(url))
+        token = page_cache._single_flight.acquire(key)
+        self.assertTrue(token)
+        page_cache.release(key, token)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}})
+class AnonymousPageCacheLocMemTests(AnonymousPageCacheTests):
+    pass
+
+
+class ConditionalGetTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tag = Tag.objects.create(name='Python')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = self.make_post('Primeiro')
+            self.post.tags.add(self.tag)
+            self.page = Page.objects.create(
+                title='Sobre', content='Sobre nós', is_published=True)
+        self.post_url = reverse('blog:post', args=(self.post.slug,))
+        self.urls = [
+            reverse('blog:index'),
+            reverse('blog:category', args=(self.category.slug,)),
+            reverse('blog:tag', args=(self.tag.slug,)),
+            reverse('blog:created_by', args=(self.user.pk,)),
+            reverse('blog:search') + '?q=Primeiro',
+            self.post_url,
+            reverse('blog:page', args=(self.page.slug,)),
+        ]
+
+    def test_repeated_request_gets_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertTrue(first['ETag'].startswith('W/"'))
+                self.assertIn('Last-Modified', first)
+                self.assertIn('no-cache', first['Cache-Control'])
+
+                second = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(second.status_code, 304)
+                self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_if_modified_since(self):
+        first = self.client.get(self.post_url)
+        second = self.client.get(
+            self.post_url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(second.status_code, 304)
+
+    @override_settings(BLOG_PAGE_CACHE=False)
+    def test_not_modified_skips_template_work(self):
+        get_site_setup()
+        etag = self.client.get(self.post_url)['ETag']
+        # Só o SELECT do post: nada de tags nem template
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(BLOG_PAGE_CACHE=False)
+    def test_not_modified_listing_skips_the_page_query(self):
+        get_site_setup()
+        for url in self.urls[:5]:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                # Categoria/tag/autor da listagem + pk e updated_at da
+                # página; sem as colunas do card nem o COUNT(*)
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertLessEqual(len(ctx.captured_queries), 2)
+                for query in ctx.captured_queries:
+                    self.assertNotIn('COUNT(', query['sql'].upper())
+                    columns = query['sql'].split(' FROM ')[0]
+                    self.assertNotIn('"excerpt"', columns)
+
+    @override_settings(BLOG_PAGE_CACHE=False)
+    @mock.patch.object(views.PostListViewBase, 'keyset_pagination', True)
+    def test_not_modified_keyset_listing_skips_the_page_query(self):
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_editing_a_post_changes_the_etag(self):
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Título novo'
+            self.post.save()
+
+        for url in self.urls[:6]:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+        page_url = self.urls[6]
+        response = self.client.get(
+            page_url, HTTP_IF_NONE_MATCH=etags[page_url])
+        self.assertEqual(response.status_code, 304)
+
+    def test_renaming_a_tag_changes_the_post_etag(self):
+        etag = self.client.get(self.post_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'Django ORM'
+            self.tag.save()
+        response = self.client.get(self.post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Django ORM')
+
+    def test_editing_a_page_changes_its_etag(self):
+        url = self.urls[6]
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.content = '<p>Novo texto</p>'
+            self.page.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Novo texto')
+
+    def test_logged_in_users_get_no_validators(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.post_url)
+        self.assertNotIn('ETag', response)
+
+
+class AsyncViewsTests(BlogTestCase):
+    """
+    As views de leitura assíncronas (blog/async_views.py), pela cadeia de
+    middleware em modo assíncrono.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with self.settings(BLOG_ASYNC_VIEWS=True):
+            self.reload_urls()
+        self.addCleanup(self.reload_urls)
+
+        self.tag = Tag.objects.create(name='Python')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = self.make_post('Primeiro')
+            self.post.tags.add(self.tag)
+            self.page = Page.objects.create(
+                title='Sobre', content='Sobre nós', is_published=True)
+        self.urls = [
+            reverse('blog:index'),
+            reverse('blog:category', args=(self.category.slug,)),
+            reverse('blog:tag', args=(self.tag.slug,)),
+            reverse('blog:created_by', args=(self.user.pk,)),
+            reverse('blog:search') + '?q=Primeiro',
+            reverse('blog:post', args=(self.post.slug,)),
+            reverse('blog:page', args=(self.page.slug,)),
+        ]
+
+    def reload_urls(self):
+        # O include() do project.urls guarda os padrões já resolvidos
+        importlib.reload(blog_urls)
+        importlib.reload(project_urls)
+        clear_url_caches()
+
+    def get(self, url, **extra):
+        return async_to_sync(self.async_client.get)(url, **extra)
+
+    def test_read_views_are_async(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertTrue(
+                    iscoroutinefunction(resolve(url.split('?')[0]).func))
+                response = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['site_setup'].title, 'Blog')
+        self.assertContains(self.get(self.urls[0]), 'Primeiro')
+
+    def test_same_object_as_sync_views(self):
+        url = reverse('blog:post', args=(self.post.slug,))
+        response = self.get(url)
+        cache.clear()
+        self.reload_urls()
+        self.assertFalse(iscoroutinefunction(resolve(url).func))
+        self.assertEqual(
+            self.client.get(url).context['post'], response.context['post'])
+
+    def test_not_modified_and_page_cache(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.get(url)
+                second = self.get(url, headers={'if-none-match': first['ETag']})
+                self.assertEqual(second.status_code, 304)
+        # Já no cache de página: nada de banco
+        with self.assertNumQueries(0):
+            response = self.get(self.urls[0])
+        self.assertEqual(response.status_code, 200)
+
+    def test_offset_pagination(self):
+        for i in range(9):
+            self.make_post(f'Post {i}')
+        response = self.get(self.urls[0] + '?page=2')
+        self.assertEqual(response.context['page_obj'].paginator.count, 10)
+        self.assertEqual([p.pk for p in response.context['page_obj']],
+                         [self.post.pk])
+        self.assertEqual(self.get(self.urls[0] + '?page=last').status_code,
+                         200)
+        self.assertEqual(self.get(self.urls[0] + '?page=9').status_code, 404)
+
+    def test_keyset_pagination(self):
+        views.PostListViewBase.keyset_pagination = True
+        self.addCleanup(setattr, views.PostListViewBase,
+                        'keyset_pagination', False)
+        posts = [self.make_post(f'Post {i}') for i in range(9)]
+        first = self.get(self.urls[0]).context['page_obj']
+        self.assertEqual([p.pk for p in first], [p.pk for p in posts[::-1]])
+        second = self.get(self.urls[0] + first.next_query_string)
+        self.assertEqual([p.pk for p in second.context['page_obj']],
+                         [self.post.pk])
+
+    def test_missing_objects_and_drafts_are_404(self):
+        draft = self.make_post('Rascunho', is_published=False)
+        for url in (reverse('blog:post', args=(draft.slug,)),
+                    reverse('blog:category', args=('nao-existe',)),
+                    reverse('blog:created_by', args=(999,))):
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url).status_code, 404)
+
+        # O autor logado vê o próprio rascunho (request.auser)
+        self.async_client.force_login(self.user)
+        self.assertEqual(
+            self.get(reverse('blog:post', args=(draft.slug,))).status_code,
+            200)
+
+    def test_only_get_and_head(self):
+        response = async_to_sync(self.async_client.post)(self.urls[0])
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(
+            async_to_sync(self.async_client.head)(self.urls[0]).status_code,
+            200)
+
+
+class FeedTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tag = Tag.objects.create(name='Python')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = self.make_post('Primeiro')
+            self.post.tags.add(self.tag)
+            self.make_post('Rascunho', is_published=False)
+        self.urls = [
+            reverse('blog:feed_rss'),
+            reverse('blog:feed_atom'),
+            reverse('blog:category_feed_rss', args=(self.category.slug,)),
+            reverse('blog:category_feed_atom', args=(self.category.slug,)),
+            reverse('blog:tag_feed_rss', args=(self.tag.slug,)),
+            reverse('blog:tag_feed_atom', args=(self.tag.slug,)),
+            reverse('blog:created_by_feed_rss', args=(self.user.pk,)),
+            reverse('blog:created_by_feed_atom', args=(self.user.pk,)),
+        ]
+
+    def test_feeds_list_published_posts(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('xml', response['Content-Type'])
+                self.assertContains(response, 'Primeiro')
+                self.assertContains(response, self.post.get_absolute_url())
+                self.assertNotContains(response, 'Rascunho')
+
+    def test_unknown_scope_is_404(self):
+        url = reverse('blog:tag_feed_rss', args=('nao-existe',))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_feed_is_served_from_cache(self):
+        url = self.urls[0]
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+
+    def test_conditional_requests_get_not_modified(self):
+        url = self.urls[0]
+        first = self.client.get(url)
+        # Do cache e regerado do zero
+        for _ in range(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(response.status_code, 304)
+            cache.clear()
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_post_change_regenerates_only_feeds_that_show_it(self):
+        other_category = Category.objects.create(name='Outra')
+        other_url = reverse('blog:category_feed_rss',
+                            args=(other_category.slug,))
+        for url in self.urls + [other_url]:
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Título novo'
+            self.post.save()
+
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Título novo')
+        with self.assertNumQueries(0):
+            self.client.get(other_url)
+
+    def test_category_and_author_renames_regenerate_the_feeds(self):
+        # Cada item mostra a categoria e o autor do post
+        for url in self.urls:
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Categoria nova'
+            self.category.save()
+            self.user.first_name = 'Autora'
+            self.user.last_name = 'Renomeada'
+            self.user.save()
+
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Categoria nova')
+                self.assertContains(response, 'Autora Renomeada')
+
+    def test_publishing_regenerates_the_feed(self):
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_post('Segundo')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Segundo')
+
+
+class SitemapTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tag = Tag.objects.create(name='Python')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = self.make_post('Primeiro')
+            self.post.tags.add(self.tag)
+            self.draft = self.make_post('Rascunho', is_published=False)
+            self.page = Page.objects.create(
+                title='Sobre', content='Sobre nós', is_published=True)
+        # Categoria sem posts publicados fica de fora
+        self.empty = Category.objects.create(name='Vazia')
+
+    def shard_url(self, section, shard=0):
+        return reverse('blog:sitemap_shard', args=(section, shard))
+
+    def test_index_lists_one_shard_per_section(self):
+        response = self.client.get(reverse('blog:sitemap'))
+        self.assertEqual(response.status_code, 200)
+        for section in ('posts', 'pages', 'categories', 'tags', 'authors'):
+            self.assertContains(response, self.shard_url(section))
+
+    def test_shards_list_published_urls_with_lastmod(self):
+        expected = {
+            'posts': self.post.get_absolute_url(),
+            'pages': reverse('blog:page', args=(self.page.slug,)),
+            'categories': reverse('blog:category',
+                                  args=(self.category.slug,)),
+            'tags': reverse('blog:tag', args=(self.tag.slug,)),
+            'authors': reverse('blog:created_by', args=(self.user.pk,)),
+        }
+        for section, path in expected.items():
+            with self.subTest(section=section):
+                response = self.client.get(self.shard_url(section))
+                self.assertContains(response, f'http://testserver{path}')
+                self.assertContains(response, '<lastmod>')
+        posts = self.client.get(self.shard_url('posts'))
+        self.assertNotContains(posts, self.draft.slug)
+        categories = self.client.get(self.shard_url('categories'))
+        self.assertNotContains(categories, self.empty.slug)
+
+    def test_shards_are_split_by_id(self):
+        with mock.patch('blog.sitemaps.SHARD_SIZE', 1), \
+                self.captureOnCommitCallbacks(execute=True):
+            second = self.make_post('Segundo')
+            response = self.client.get(self.shard_url('posts', second.pk))
+            self.assertContains(response, second.get_absolute_url())
+            self.assertNotContains(response, self.post.get_absolute_url())
+
+    def test_only_the_changed_shard_is_rebuilt(self):
+        with mock.patch('blog.sitemaps.SHARD_SIZE', 1):
+            other = self.make_post('Outro', category=None)
+            urls = [self.shard_url('posts', self.post.pk),
+                    self.shard_url('posts', other.pk)]
+            for url in urls:
+                self.client.get(url)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.post.slug = 'slug-novo'
+                self.post.save()
+
+            self.assertContains(self.client.get(urls[0]), 'slug-novo')
+            with self.assertNumQueries(0):
+                self.client.get(urls[1])
+
+    def test_conditional_request(self):
+        url = self.shard_url('posts')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_section_is_404(self):
+        response = self.client.get(self.shard_url('nada'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_shard_past_the_end_is_404(self):
+        url = self.shard_url('posts', 999)
+        for _ in range(2):
+            # Nem a segunda vem de um <urlset> vazio guardado no cache
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_shard_left_empty_is_404(self):
+        url = self.shard_url('pages')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.is_published = False
+            self.page.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ApiTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tag = Tag.objects.create(name='Python')
+        self.posts = [self.make_post(f'Post {n}') for n in range(5)]
+        self.posts[0].tags.add(self.tag)
+        self.draft = self.make_post('Rascunho', is_published=False)
+        self.page = Page.objects.create(
+            title='Sobre', content='<p>Sobre nós</p>', is_published=True)
+
+    def get_json(self, url, status=200, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def test_post_list_is_cursor_paginated(self):
+        url = reverse('blog:api_posts')
+        first = self.get_json(url, limit=3)
+        self.assertEqual([post['title'] for post in first['results']],
+                         ['Post 4', 'Post 3', 'Post 2'])
+        second = self.get_json(first['next'])
+        self.assertEqual([post['title'] for post in second['results']],
+                         ['Post 1', 'Post 0'])
+        self.assertIsNone(second['next'])
+
+    def test_drafts_follow_the_post_page_rules(self):
+        url = reverse('blog:api_post', args=(self.draft.slug,))
+        self.get_json(url, status=404)
+        titles = [post['title']
+                  for post in self.get_json(reverse('blog:api_posts'),
+                                            limit=50)['results']]
+        self.assertNotIn('Rascunho', titles)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.get_json(url)['title'], 'Rascunho')
+
+    def test_field_selection_only_reads_those_columns(self):
+        url = reverse('blog:api_posts')
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.get_json(url, fields='id,title')
+        self.assertEqual(set(data['results'][0]), {'id', 'title'})
+        sql = ctx.captured_queries[-1]['sql']
+        self.assertNotIn('excerpt', sql)
+        self.assertNotIn('blog_category', sql)
+
+        self.get_json(url, status=400, fields='id,senha')
+
+    def test_detail_includes_content_and_tags(self):
+        data = self.get_json(
+            reverse('blog:api_post', args=(self.posts[0].slug,)))
+        self.assertEqual(data['tags'], [{'slug': 'python', 'name': 'Python'}])
+        self.assertEqual(data['category']['slug'], self.category.slug)
+        self.assertIn('Conteúdo', data['content_html'])
+
+    def test_scoped_post_lists(self):
+        urls = {
+            reverse('blog:api_category_posts', args=(self.category.slug,)): 5,
+            reverse('blog:api_tag_posts', args=(self.tag.slug,)): 1,
+            reverse('blog:api_author_posts', args=(self.user.pk,)): 5,
+        }
+        for url, count in urls.items():
+            with self.subTest(url=url):
+                data = self.get_json(url, limit=50)
+                self.assertEqual(len(data['results']), count)
+        self.get_json(reverse('blog:api_tag_posts', args=('nada',)),
+                      status=404)
+
+    def test_export_streams_every_visible_post(self):
+        response = self.client.get(reverse('blog:api_posts_export'),
+                                   {'fields': 'id,title'})
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([post['id'] for post in data],
+                         [post.pk for post in self.posts])
+
+    def test_export_streams_asynchronously_under_asgi(self):
+        async def export():
+            response = await self.async_client.get(
+                reverse('blog:api_posts_export'), {'fields': 'id,tags'})
+            # Um iterador síncrono seria lido inteiro com list()
+            self.assertTrue(response.is_async)
+            return b''.join([
+                chunk async for chunk in response.streaming_content])
+
+        data = json.loads(async_to_sync(export)())
+        self.assertEqual([post['id'] for post in data],
+                         [post.pk for post in self.posts])
+        self.assertEqual(data[0]['tags'], [{'slug': 'python', 'name': 'Python'}])
+
+    def test_pages_and_categories(self):
+        pages = self.get_json(reverse('blog:api_pages'))['results']
+        self.assertEqual([page['slug'] for page in pages], [self.page.slug])
+        page = self.get_json(reverse('blog:api_page', args=(self.page.slug,)))
+        self.assertIn('Sobre nós', page['content_html'])
+
+        categories = self.get_json(reverse('blog:api_categories'))['results']
+        self.assertEqual(categories[0]['post_count'], 5)
+
+    def test_api_is_read_only(self):
+        response = self.client.post(reverse('blog:api_posts'))
+        self.assertEqual(response.status_code, 405)
+        self.assertIn('error', response.json())
+
+
+class SearchTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.in_title = self.make_post('Programação em Python')
+        self.in_content = Post.objects.create(
+            title='Outro assunto', excerpt='Resumo', is_published=True,
+            content='<p>Um texto sobre programação funcional</p>')
+        self.make_post('Nada a ver')
+
+    def search(self, value):
+        response = self.client.get(reverse('blog:search'), {'q': value})
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_search_matches_title_excerpt_and_content(self):
+        self.assertCountEqual(
+            self.search('programação'), [self.in_title.pk, self.in_content.pk])
+
+    def test_empty_search_returns_nothing(self):
+        self.assertEqual(self.search('  '), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Busca textual do Postgres')
+    def test_title_matches_rank_above_content_matches(self):
+        # O post do conteúdo é mais novo, mas o título pesa mais
+        self.assertEqual(
+            self.search('programação'), [self.in_title.pk, self.in_content.pk])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Busca textual do Postgres')
+    def test_search_vector_is_updated_on_save(self):
+        self.in_title.title = 'Culinária'
+        self.in_title.save()
+        self.assertEqual(self.search('python'), [])
+        self.assertEqual(self.search('culinária'), [self.in_title.pk])
+
+
+class DetailQueryBudgetTests(BlogTestCase):
+    # Post: 1 SELECT com autor e categoria + 1 para as tags + 1 para os
+    # posts relacionados.
+    POST_BUDGET = 3
+    PAGE_BUDGET = 1
+
+    def setUp(self):
+        super().setUp()
+        self.post = self.make_post('Com tags')
+        self.post.tags.add(Tag.objects.create(name='Python'),
+                           Tag.objects.create(name='ORM'))
+        # O SiteSetup vem do cache nas requisições normais
+        get_site_setup()
+
+    def test_anonymous_post_page_query_budget(self):
+        with self.assertNumQueries(self.POST_BUDGET):
+            response = self.client.get(self.post.get_absolute_url())
+        self.assertContains(response, 'Python')
+        self.assertContains(response, 'ORM')
+        self.assertContains(response, self.category.name)
+
+    def test_post_without_tags_stays_in_budget(self):
+        post = self.make_post('Sem tags')
+        with self.assertNumQueries(self.POST_BUDGET):
+            response = self.client.get(post.get_absolute_url())
+        self.assertNotContains(response, 'post-tags')
+
+    def test_page_query_budget(self):
+        page = Page.objects.create(
+            title='Sobre', content='<p>Sobre</p>', is_published=True)
+        with self.assertNumQueries(self.PAGE_BUDGET):
+            response = self.client.get(reverse('blog:page', args=[page.slug]))
+        self.assertContains(response, 'Sobre')
+
+    def test_author_sees_own_draft(self):
+        draft = self.make_post('Rascunho', is_published=False)
+        url = reverse('blog:post', args=[draft.slug])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class RelatedPostsTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_category = Category.objects.create(name='Python')
+        self.python = Tag.objects.create(name='Python')
+        self.orm = Tag.objects.create(name='ORM')
+        self.post = self.make_post('Base')
+        self.post.tags.add(self.python, self.orm)
+        self.twin = self.make_post('Gêmeo')
+        self.twin.tags.add(self.python, self.orm)
+        self.same_category = self.make_post('Mesma categoria')
+        self.same_category.tags.add(self.python)
+        self.other = self.make_post('Outra categoria',
+                                    category=self.other_category)
+        self.other.tags.add(self.python)
+        self.draft = self.make_post('Rascunho', is_published=False)
+        self.draft.tags.add(self.python, self.orm)
+        self.unrelated = self.make_post('Sem relação')
+        queue.run_pending()
+
+    def related_ids(self, post):
+        return list(RelatedPost.objects.filter(post=post).order_by(
+            '-score', '-related_id').values_list('related_id', flat=True))
+
+    def test_ranked_by_shared_tags_and_category(self):
+        self.assertEqual(self.related_ids(self.post), [
+            self.twin.pk, self.same_category.pk, self.other.pk])
+        self.assertEqual(self.related_ids(self.unrelated), [])
+        self.assertEqual(self.related_ids(self.draft), [])
+
+    def test_tag_change_updates_the_neighbourhood(self):
+        self.unrelated.tags.add(self.orm)
+        queue.run_pending()
+        self.assertIn(self.unrelated.pk, self.related_ids(self.post))
+        self.assertIn(self.post.pk, self.related_ids(self.unrelated))
+
+        self.twin.tags.remove(self.orm, self.python)
+        queue.run_pending()
+        self.assertNotIn(self.twin.pk, self.related_ids(self.post))
+
+    def test_popular_tags_do_not_expand_the_neighbourhood(self):
+        tag_ids = [self.python.pk]
+        with mock.patch.object(related, 'MAX_TAG_POSTS', 2):
+            # Python está em 4 posts publicados: sem peso, sem vizinhos
+            self.assertEqual(related.neighbourhood([self.post.pk], tag_ids),
+                             {self.post.pk})
+        self.assertEqual(
+            related.neighbourhood([self.post.pk], tag_ids),
+            {self.post.pk, self.twin.pk, self.same_category.pk,
+             self.other.pk})
+
+    def test_unpublishing_removes_the_post_from_its_neighbours(self):
+        self.twin.is_published = False
+        self.twin.save()
+        queue.run_pending()
+        self.assertNotIn(self.twin.pk, self.related_ids(self.post))
+        self.assertEqual(self.related_ids(self.twin), [])
+
+    def test_post_page_lists_related_posts(self):
+        response = self.client.get(self.post.get_absolute_url())
+        self.assertContains(response, 'Posts relacionados')
+        self.assertContains(response, self.twin.get_absolute_url())
+        self.assertNotContains(response, self.unrelated.get_absolute_url())
+
+    def test_renaming_a_related_post_evicts_pages_that_show_it(self):
+        self.client.get(self.post.get_absolute_url())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.twin.title = 'Gêmeo renomeado'
+            self.twin.save()
+        self.assertContains(
+            self.client.get(self.post.get_absolute_url()), 'Gêmeo renomeado')
+
+    def test_rebuild_command(self):
+        RelatedPost.objects.all().delete()
+        call_command('rebuild_related', stdout=StringIO())
+        self.assertEqual(self.related_ids(self.post), [
+            self.twin.pk, self.same_category.pk, self.other.pk])
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}})
+class TieredCacheTests(TestCase):
+    """
+    A camada de cache (utils/cache.py) sobre o LocMem; a subclasse roda
+    os mesmos testes sobre o FileBased.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.layer = TieredCache(local_ttl=60, wait_timeout=1, beta=0)
+        self.calls = 0
+
+    def compute(self, value='valor'):
+        def compute():
+            self.calls += 1
+            return value
+        return compute
+
+    def test_computes_once(self):
+        for _ in range(3):
+            self.assertEqual(
+                self.layer.get_or_compute('chave', self.compute()), 'valor')
+        self.assertEqual(self.calls, 1)
+
+    def test_none_is_cached(self):
+        for _ in range(2):
+            self.assertIsNone(
+                self.layer.get_or_compute('chave', self.compute(None)))
+        self.assertEqual(self.calls, 1)
+
+    def test_shared_tier_serves_other_workers(self):
+        self.layer.get_or_compute('chave', self.compute())
+        other_worker = TieredCache(beta=0)
+        self.assertEqual(
+            other_worker.get_or_compute('chave', self.compute('outro')),
+            'valor')
+        self.assertEqual(self.calls, 1)
+
+    def test_local_tier_skips_the_shared_cache(self):
+        full_key = self.layer.make_key('chave')
+        self.layer.get_or_compute('chave', self.compute())
+        cache.delete(full_key)
+        self.layer.get_or_compute('chave', self.compute())
+        self.assertEqual(self.calls, 1)
+
+        self.layer.clear_local()
+        self.layer.get_or_compute('chave', self.compute())
+        self.assertEqual(self.calls, 2)
+
+    def test_namespace_invalidation_reaches_every_worker(self):
+        other_worker = TieredCache(local_ttl=0.2, beta=0)
+        for layer in (self.layer, other_worker):
+            layer.get_or_compute('a', self.compute('antigo'), namespace='ns')
+        self.layer.get_or_compute('b', self.compute('outro'), namespace='x')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.layer.invalidate('ns')
+
+        # O outro worker vê a versão nova quando o LRU dele expira
+        time.sleep(0.25)
+        self.assertEqual(other_worker.get_or_compute(
+            'a', self.compute('novo'), namespace='ns'), 'novo')
+        self.assertEqual(self.layer.get_or_compute(
+            'a', self.compute('novo'), namespace='ns'), 'novo')
+        self.assertEqual(self.layer.get_or_compute(
+            'b', self.compute('novo'), namespace='x'), 'outro')
+
+    def test_hot_namespaced_key_skips_the_shared_cache(self):
+        self.layer.get_or_compute('a', self.compute(), namespace='ns')
+        shared = caches['default']
+        with mock.patch.object(shared, 'get', wraps=shared.get) as get:
+            for _ in range(3):
+                self.assertEqual(self.layer.get_or_compute(
+                    'a', self.compute(), namespace='ns'), 'valor')
+        self.assertEqual(get.call_count, 0)
+        self.assertEqual(self.calls, 1)
+
+    def test_invalidation_waits_for_commit(self):
+        self.layer.get_or_compute('a', self.compute(), namespace='ns')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.layer.invalidate('ns')
+            self.layer.get_or_compute('a', self.compute(), namespace='ns')
+        self.assertEqual((len(callbacks), self.calls), (1, 1))
+
+    def test_concurrent_misses_compute_once(self):
+        def slow():
+            self.calls += 1
+            time.sleep(0.2)
+            return 'valor'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                TieredCache(beta=0).get_or_compute('quente', slow)))
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['valor'] * 6)
+        self.assertEqual(self.calls, 1)
+
+    def expiring_soon(self, layer, key):
+        """
+        Troca a entrada por uma de cálculo caro (10s) que expira em 1s.
+        """
+        full_key = layer.make_key(key)
+        value = cache.get(full_key)[0]
+        cache.set(full_key, (value, 10, time.time() + 1))
+        layer.clear_local()
+        return full_key
+
+    @mock.patch('utils.cache.random.random', return_value=0.5)
+    def test_early_recomputation_near_expiry(self, _):
+        eager = TieredCache(beta=1)
+        eager.get_or_compute('chave', self.compute(), timeout=60)
+        self.expiring_soon(eager, 'chave')
+        self.assertEqual(eager.get_or_compute('chave', self.compute('novo')),
+                         'novo')
+        self.assertEqual(self.calls, 2)
+        # Longe da expiração, não
+        eager.clear_local()
+        self.assertEqual(eager.get_or_compute('chave', self.compute()),
+                         'novo')
+        self.assertEqual(self.calls, 2)
+
+    @mock.patch('utils.cache.random.random', return_value=0.5)
+    def test_held_lock_serves_current_value(self, _):
+        eager = TieredCache(beta=1)
+        eager.get_or_compute('chave', self.compute(), timeout=60)
+        full_key = self.expiring_soon(eager, 'chave')
+        self.assertTrue(eager.acquire(full_key))
+        # Recalcularia antes da hora, mas outro worker já está nisso
+        self.assertEqual(eager.get_or_compute('chave', self.compute('novo')),
+                         'valor')
+        self.assertEqual(self.calls, 1)
+
+    def test_gives_up_waiting_on_an_abandoned_lock(self):
+        layer = TieredCache(wait_timeout=0.1, beta=0)
+        layer.acquire(layer.make_key('chave'))
+        self.assertEqual(layer.get_or_compute('chave', self.compute()),
+                         'valor')
+
+    def test_release_needs_the_lock_token(self):
+        token = self.layer.acquire('chave')
+        self.assertTrue(token)
+        self.assertIsNone(self.layer.acquire('chave'))
+        # Token de outro worker (ou nenhum): a trava continua
+        self.layer.release('chave', 'outro-token')
+        self.layer.release('chave', None)
+        self.assertIsNone(self.layer.acquire('chave'))
+
+        self.layer.release('chave', token)
+        self.assertTrue(self.layer.acquire('chave'))
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': str(Path(tempfile.gettempdir()) / 'tiered_cache_tests'),
+}})
+class TieredCacheFileBasedTests(TieredCacheTests):
+    def setUp(self):
+        super().setUp()
+        # As travas são arquivos que o cache.clear() não apaga
+        shutil.rmtree(Path(caches['default']._dir) / 'locks',
+                      ignore_errors=True)
+
+    def test_expired_lock_is_taken_over(self):
+        layer = TieredCache(lock_timeout=30)
+        self.assertTrue(layer.acquire('chave'))
+        self.assertIsNone(layer.acquire('chave'))
+        # O worker que tinha a trava morreu há mais de lock_timeout
+        past = time.time() - 60
+        os.utime(layer._lock_path('chave'), (past, past))
+        self.assertTrue(layer.acquire('chave'))
+        self.assertIsNone(layer.acquire('chave'))
+
+
+class SearchSuggestTests(BlogTestCase):
+    # Orçamento do endpoint, chamado a cada tecla: prefixo quente (já no
+    # LRU) não vai ao banco e responde em poucos milissegundos.
+    HOT_BUDGET_MS = 15
+
+    def setUp(self):
+        super().setUp()
+        suggestions._cache.clear_local()
+        self.tag = Tag.objects.create(name='Python')
+        self.python = self.make_post('Programação em Python')
+        self.python.tags.add(self.tag)
+        self.make_post('Rascunho sobre Python', is_published=False)
+        self.make_post('Receitas de bolo')
+        Tag.objects.create(name='Pythonista')  # Sem posts publicados
+
+    def suggest(self, term, **params):
+        response = self.client.get(
+            reverse('blog:search_suggest'), {'q': term, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_suggests_published_posts_tags_and_categories(self):
+        data = self.suggest('pyt')
+        self.assertEqual(data['posts'], [{
+            'title': 'Programação em Python',
+            'url': self.python.get_absolute_url(),
+        }])
+        self.assertEqual([t['name'] for t in data['tags']], ['Python'])
+        self.assertEqual(self.suggest('djan')['categories'][0]['url'],
+                         reverse('blog:category', args=[self.category.slug]))
+
+    def test_short_term_returns_nothing_without_queries(self):
+        with self.assertNumQueries(0):
+            data = suggestions.suggest('p')
+        self.assertEqual(data, {'posts': [], 'tags': [], 'categories': []})
+
+    def test_limit_is_capped(self):
+        for i in range(15):
+            self.make_post(f'Python {i}')
+        data = self.suggest('python', limit=1000)
+        self.assertEqual(len(data['posts']), suggestions.SUGGEST_MAX_LIMIT)
+        self.assertEqual(len(self.suggest('python', limit='x')['posts']),
+                         suggestions.SUGGEST_DEFAULT_LIMIT)
+
+    def test_cache_is_cleared_when_posts_change(self):
+        self.suggest('bolo')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_post('Bolo de cenoura')
+        self.assertEqual(len(self.suggest('bolo')['posts']), 2)
+
+    @skipUnless(connection.vendor == 'postgresql', 'pg_trgm do Postgres')
+    def test_misspelled_fragment_matches(self):
+        self.assertEqual(
+            [p['title'] for p in self.suggest('pythn')['posts']],
+            ['Programação em Python'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'pg_trgm do Postgres')
+    def test_queries_use_the_trigram_indexes(self):
+        indexes = {
+            'posts': 'post_title_trgm_idx',
+            'tags': 'tag_name_trgm_idx',
+            'categories': 'category_name_trgm_idx',
+        }
+        with connection.cursor() as cursor:
+            # Com poucas linhas o Postgres prefere Seq Scan
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        querysets = suggestions._querysets('pyt', 5)
+        for name, index in indexes.items():
+            with self.subTest(kind=name):
+                plan = querysets[name].explain()
+                self.assertIn(index, plan, plan)
+                self.assertNotIn('Seq Scan', plan, plan)
+
+    def test_hot_prefix_latency_budget(self):
+        url = reverse('blog:search_suggest')
+        self.client.get(url, {'q': 'pyt'})
+
+        timings = []
+        with self.assertNumQueries(0):
+            for _ in range(20):
+                start = time.perf_counter()
+                self.client.get(url, {'q': '  PYT '})
+                timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        self.assertLess(timings[len(timings) // 2], self.HOT_BUDGET_MS)
+
+
+class PostTagAssignmentTests(BlogTestCase):
+    def tag_names(self, post):
+        return sorted(post.tags.values_list('name', flat=True))
+
+    def test_parse_normalises_and_dedupes(self):
+        self.assertEqual(
+            parse_tag_names(' Python ,python, Web   Dev,, ,PYTHON'),
+            ['Python', 'Web Dev'])
+
+    def test_query_count_does_not_grow_with_tags(self):
+        def queries_for(count):
+            post = self.make_post(f'Post com {count} tags')
+            names = [f'Tag {count} {i}' for i in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                set_post_tag_names(post, names)
+            self.assertEqual(post.tags.count(), count)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(3), queries_for(15))
+
+    def test_reuses_existing_tags_and_makes_unique_slugs(self):
+        python = Tag.objects.create(name='Python')
+        Tag.objects.create(name='C', slug='c')
+        post = self.make_post()
+        set_post_tag_names(post, ['python', 'C++', 'C#'])
+
+        self.assertIn(python, post.tags.all())
+        slugs = [t.slug for t in post.tags.exclude(pk=python.pk)]
+        self.assertEqual(len(set(slugs + ['c'])), 3)
+        self.assertTrue(all(slug.startswith('c-') for slug in slugs))
+
+    def test_update_applies_only_the_difference(self):
+        post = self.make_post()
+        set_post_tag_names(post, ['Python', 'Django'])
+        set_post_tag_names(post, ['Django', 'ORM'])
+        self.assertEqual(self.tag_names(post), ['Django', 'ORM'])
+        counts = dict(Tag.objects.values_list('name', 'published_post_count'))
+        self.assertEqual(counts, {'Python': 0, 'Django': 1, 'ORM': 1})
+
+    def test_form_save_with_commit_false_defers_tags(self):
+        form = PostForm(data={
+            'title': 'Pelo form', 'excerpt': 'Resumo', 'content': 'Texto',
+            'category': self.category.pk, 'is_published': True,
+            'tags_input': 'Python, Django',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save(commit=False)
+        post.created_by = self.user
+        post.save()
+        form.save_m2m()
+        self.assertEqual(self.tag_names(post), ['Django', 'Python'])
+
+    def test_create_view_saves_post_once(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('blog:post_create'), {
+                'title': 'Novo', 'excerpt': 'Resumo', 'content': 'Texto',
+                'category': self.category.pk, 'is_published': 'on',
+                'tags_input': 'Python, Django, Python',
+            })
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get(title='Novo')
+        self.assertEqual(post.created_by, self.user)
+        self.assertEqual(self.tag_names(post), ['Django', 'Python'])
+        inserts = [q for q in ctx.captured_queries
+                   if q['sql'].startswith('INSERT INTO "blog_post"')]
+        self.assertEqual(len(inserts), 1)
+        updates = [q for q in ctx.captured_queries
+                   if q['sql'].startswith('UPDATE "blog_post" ')
+                   and '"title"' in q['sql']]
+        self.assertEqual(updates, [])
+
+
+def make_image(name='capa.png', size=(10, 10)):
+    buffer = BytesIO()
+    Image.new('RGB', size).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+class FieldTrackingTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=Path(self.media_root))
+        media.enable()
+        self.addCleanup(media.disable)
+
+        resize = mock.patch('blog.models.enqueue_renditions')
+        self.resize = resize.start()
+        self.addCleanup(resize.stop)
+
+        self.post = self.make_post(cover=make_image())
+        self.resize.reset_mock()
+
+    def test_save_without_image_change_does_not_reload_or_queue(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.title = 'Outro título'
+        with CaptureQueriesContext(connection) as ctx:
+            post.save()
+        selects = [q['sql'] for q in ctx.captured_queries
+                   if q['sql'].startswith('SELECT') and '"blog_post"' in q['sql']]
+        self.assertEqual(selects, [])
+        self.resize.assert_not_called()
+
+    def test_new_cover_is_queued_once(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.cover = make_image('nova.png')
+        self.assertTrue(post.has_changed('cover'))
+        post.save()
+        self.resize.assert_called_once()
+        self.assertFalse(post.has_changed('cover'))
+        post.save()
+        self.resize.assert_called_once()
+
+    def test_partial_save_stays_partial(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.cover = make_image('nova.png')
+        post.title = 'Não salvo'
+        with CaptureQueriesContext(connection) as ctx:
+            post.save(update_fields=['excerpt'])
+        self.resize.assert_not_called()
+        updates = [q['sql'] for q in ctx.captured_queries
+                   if q['sql'].startswith('UPDATE "blog_post"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"title"', updates[0])
+        self.assertNotIn('"cover"', updates[0])
+        self.assertTrue(post.has_changed('cover'))
+
+    def test_deferred_fields_are_not_treated_as_changed(self):
+        post = Post.objects.only('id', 'title').get(pk=self.post.pk)
+        self.assertFalse(post.has_changed('cover'))
+        post.save(update_fields=['title'])
+        self.resize.assert_not_called()
+
+    def test_counters_follow_tracked_state(self):
+        post = Post.objects.get(pk=self.post.pk)
+        other = Category.objects.create(name='Outra')
+        post.category = other
+        post.save()
+        post.is_published = False
+        post.save(update_fields=['is_published'])
+        self.category.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(
+            (self.category.published_post_count, other.published_post_count),
+            (0, 0))
+
+
+class CoverPictureTemplateTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.post = self.make_post('Com capa', cover='posts/capa.png',
+                                   cover_in_post_content=True)
+        Post.objects.filter(pk=self.post.pk).update(cover_renditions={
+            'source': 'posts/capa.png', 'width': 1200, 'height': 675,
+            'renditions': [
+                {'width': width, 'height': 0,
+                 'webp': f'renditions/posts/capa/{width}.webp',
+                 'fallback': f'renditions/posts/capa/{width}.jpg'}
+                for width in (320, 800, 1200)
+            ],
+        })
+
+    def test_card_and_post_emit_srcset(self):
+        for url in (reverse('blog:index'), self.post.get_absolute_url()):
+            response = self.client.get(url)
+            self.assertContains(response, 'type="image/webp"')
+            self.assertContains(
+                response, '/media/renditions/posts/capa/320.webp 320w')
+            self.assertContains(
+                response, 'src="/media/renditions/posts/capa/800.jpg"')
+            self.assertContains(response, 'width="1200"')
+
+    def test_original_is_used_until_renditions_are_ready(self):
+        Post.objects.update(cover_renditions={})
+        response = self.client.get(reverse('blog:index'))
+        self.assertContains(response, 'src="/media/posts/capa.png"')
+        self.assertNotContains(response, 'srcset=')
+
+
+@override_settings(ATTACHMENT_MAX_WIDTH=400)
+class AttachmentTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=Path(media_root))
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def attach(self, size=(800, 400), days_ago=30):
+        attachment = PostAttachment.objects.create(
+            file=make_image(size=size))
+        PostAttachment.objects.filter(pk=attachment.pk).update(
+            uploaded=timezone.now() - timedelta(days=days_ago))
+        return attachment
+
+    def test_uploaded_images_are_resized_by_the_worker(self):
+        attachment = self.attach()
+        pdf = PostAttachment.objects.create(
+            file=SimpleUploadedFile('texto.pdf', b'%PDF-1.4'))
+        self.assertEqual(queue.run_pending(), (1, 0))
+        with Image.open(attachment.file.path) as img:
+            self.assertEqual(img.size, (400, 200))
+        self.assertEqual(Path(pdf.file.path).read_bytes(), b'%PDF-1.4')
+
+    def test_gc_finds_attachments_missing_from_every_content(self):
+        in_post = self.attach((10, 10))
+        in_page = self.attach((11, 11))
+        orphan = self.attach((12, 12))
+        recent = self.attach((13, 13), days_ago=1)
+        Post.objects.create(
+            title='Com anexo', excerpt='Resumo',
+            content=f'<p><img src="{in_post.file.url}" style="width: 50%;"></p>')
+        Page.objects.create(
+            title='Sobre',
+            content=f'<a href="https://blog.example.com{in_page.file.url}">x</a>')
+
+        self.assertEqual(unreferenced_attachments(), [orphan])
+
+        out = StringIO()
+        call_command('gc_attachments', stdout=out)
+        self.assertIn(orphan.file.name, out.getvalue())
+        self.assertTrue(PostAttachment.objects.filter(pk=orphan.pk).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('gc_attachments', '--delete', stdout=StringIO())
+        self.assertEqual(
+            set(PostAttachment.objects.all()), {in_post, in_page, recent})
+        self.assertFalse(Path(orphan.file.path).exists())
+
+
+class RenderedContentTests(BlogTestCase):
+    CONTENT = (
+        '<h2>Introdução &amp; ideia</h2><p>Um <b>texto</b> curto.</p>'
+        '<p><img src="/media/a.jpg" style="width: 50%;"></p>'
+        '<h3 id="meu-id">Detalhes</h3><script>var oculto = 1;</script>'
+        '<h2>Introdução &amp; ideia</h2><p>Fim<br>mesmo</p>'
+    )
+
+    def test_render_content(self):
+        rendered = render_content(self.CONTENT)
+        self.assertIn('<h2 id="introducao-ideia">', rendered['html'])
+        self.assertIn('<h2 id="introducao-ideia-2">', rendered['html'])
+        self.assertIn(
+            '<img src="/media/a.jpg" style="width: 50%;" loading="lazy" '
+            'decoding="async">', rendered['html'])
+        # O resto do HTML sai como entrou
+        self.assertIn('<p>Um <b>texto</b> curto.</p>', rendered['html'])
+        self.assertIn('<script>var oculto = 1;</script>', rendered['html'])
+        self.assertEqual(
+            rendered['text'],
+            'Introdução & ideia Um texto curto. Detalhes '
+            'Introdução & ideia Fim mesmo')
+        self.assertEqual(rendered['word_count'], 10)
+        self.assertEqual(rendered['toc'], [
+            {'level': 2, 'id': 'introducao-ideia',
+             'title': 'Introdução & ideia'},
+            {'level': 3, 'id': 'meu-id', 'title': 'Detalhes'},
+            {'level': 2, 'id': 'introducao-ideia-2',
+             'title': 'Introdução & ideia'},
+        ])
+
+    def test_save_stores_rendered_fields(self):
+        post = self.make_post()
+        post.content = self.CONTENT
+        post.save(update_fields=['content'])
+        post.refresh_from_db()
+        self.assertEqual(post.word_count, 10)
+        self.assertEqual(len(post.toc), 3)
+
+        # Save parcial sem o content não reprocessa
+        Post.objects.filter(pk=post.pk).update(word_count=0)
+        post.title = 'Outro'
+        post.save(update_fields=['title'])
+        post.refresh_from_db()
+        self.assertEqual(post.word_count, 0)
+
+        page = Page.objects.create(
+            title='Sobre', content=self.CONTENT, is_published=True)
+        self.assertIn('loading="lazy"', page.content_html)
+
+    def test_post_page_uses_rendered_fields(self):
+        post = Post.objects.create(
+            title='Longo', excerpt='Resumo', is_published=True,
+            created_by=self.user, content=self.CONTENT)
+        response = self.client.get(post.get_absolute_url())
+        self.assertContains(response, 'href="#introducao-ideia-2"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, '1 min de leitura')
+
+    def test_backfill_command(self):
+        post = Post.objects.create(
+            title='Antigo', excerpt='Resumo', content=self.CONTENT)
+        Post.objects.update(content_html='', content_text='', word_count=0,
+                            toc=[])
+        out = StringIO()
+        call_command('render_content', '--batch-size', '1', stdout=out)
+        self.assertIn('Posts: 1 de 1 atualizados', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.word_count, 10)
+
+        out = StringIO()
+        call_command('render_content', stdout=out)
+        self.assertIn('Posts: 0 de 1 atualizados', out.getvalue())
@@ -1,14 +1,21 @@
 # djangoapp/blog/urls.py
 
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, async_views, feeds, sitemaps, views
 
 app_name = 'blog'
 
+# Views de leitura: as assíncronas sob ASGI (blog/async_views.py), com os
+# mesmos nomes das síncronas
+read_views = async_views if settings.BLOG_ASYNC_VIEWS else views
+
 urlpatterns = [
-    path('', views.IndexView.as_view(), name='index'),
-    path('search/', views.SearchView.as_view(), name='search'),
+    path('', read_views.IndexView.as_view(), name='index'),
+    path('search/', read_views.SearchView.as_view(), name='search'),
+    path('search/suggest/', views.SearchSuggestView.as_view(),
+         name='search_suggest'),
 
     # A URL mais específica ('create') vem primeiro.
     path('post/create/', views.PostCreateView.as_view(), name='post_create'),
@@ -22,16 +29,55 @@ urlpatterns = [
          views.PostDeleteView.as_view(), name='post_delete'),
 
     # A URL mais genérica ('catch-all' para slugs) vem por último.
-    path('post/<slug:slug>/', views.PostDetailView.as_view(), name='post'),
+    path('post/<slug:slug>/', read_views.PostDetailView.as_view(), name='post'),
 
 
     # --- OUTRAS ROTAS ---
-    path('page/<slug:slug>/', views.PageDetailView.as_view(), name='page'),
-    path('category/<slug:slug>/', views.CategoryView.as_view(), name='category'),
-    path('tag/<slug:slug>/', views.TagView.as_view(), name='tag'),
-    path('created_by/<int:id>/', views.CreatedByView.as_view(), name='created_by'),
+    path('page/<slug:slug>/', read_views.PageDetailView.as_view(), name='page'),
+    path('category/<slug:slug>/', read_views.CategoryView.as_view(), name='category'),
+    path('tag/<slug:slug>/', read_views.TagView.as_view(), name='tag'),
+    path('created_by/<int:id>/', read_views.CreatedByView.as_view(), name='created_by'),
     path('my-posts/drafts/', views.DraftsView.as_view(), name='post_drafts'),
 
+    # --- FEEDS (RSS e Atom) ---
+    path('feed/rss/', feeds.LatestPostsFeed(), name='feed_rss'),
+    path('feed/atom/', feeds.LatestPostsAtomFeed(), name='feed_atom'),
+    path('category/<slug:slug>/feed/rss/', feeds.CategoryPostsFeed(),
+         name='category_feed_rss'),
+    path('category/<slug:slug>/feed/atom/', feeds.CategoryPostsAtomFeed(),
+         name='category_feed_atom'),
+    path('tag/<slug:slug>/feed/rss/', feeds.TagPostsFeed(),
+         name='tag_feed_rss'),
+    path('tag/<slug:slug>/feed/atom/', feeds.TagPostsAtomFeed(),
+         name='tag_feed_atom'),
+    path('created_by/<int:id>/feed/rss/', feeds.AuthorPostsFeed(),
+         name='created_by_feed_rss'),
+    path('created_by/<int:id>/feed/atom/', feeds.AuthorPostsAtomFeed(),
+         name='created_by_feed_atom'),
+
+    # --- API JSON (somente leitura) ---
+    path('api/posts/', api.PostListApi.as_view(), name='api_posts'),
+    path('api/posts/export/', api.PostExportApi.as_view(),
+         name='api_posts_export'),
+    path('api/posts/<slug:slug>/', api.PostDetailApi.as_view(),
+         name='api_post'),
+    path('api/categories/', api.CategoryListApi.as_view(),
+         name='api_categories'),
+    path('api/categories/<slug:category>/posts/', api.PostListApi.as_view(),
+         name='api_category_posts'),
+    path('api/tags/<slug:tag>/posts/', api.PostListApi.as_view(),
+         name='api_tag_posts'),
+    path('api/authors/<int:author>/posts/', api.PostListApi.as_view(),
+         name='api_author_posts'),
+    path('api/pages/', api.PageListApi.as_view(), name='api_pages'),
+    path('api/pages/<slug:slug>/', api.PageDetailApi.as_view(),
+         name='api_page'),
+
+    # --- SITEMAP (índice + arquivos por tipo e faixa de id) ---
+    path('sitemap.xml', sitemaps.sitemap_index, name='sitemap'),
+    path('sitemap-<str:section>-<int:shard>.xml', sitemaps.sitemap_shard,
+         name='sitemap_shard'),
+
     # --- ROTAS DE AUTENTICAÇÃO ---
     path('login/', auth_views.LoginView.as_view(
         template_name='blog/pages/login.html',
@@ -1,14 +1,25 @@
 # djangoapp/blog/views.py
 
 from .models import Page, Post, Category, Tag
+from .conditional import ConditionalGetMixin
 from .forms import PostForm
+from .page_cache import AnonymousPageCacheMixin, dep
+from .related import RELATED_LIMIT
+from .search import search_posts
+from .suggestions import SUGGEST_DEFAULT_LIMIT, suggest
+from .pagination import (AFTER_PARAM, BEFORE_PARAM, CountedPaginator,
+                         KeysetPaginator)
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views import View
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.auth import get_user_model, logout
-from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy, reverse
+from django.utils.http import urlencode
 
 User = get_user_model()
 
@@ -45,11 +56,10 @@ class PostCreateView(LoginRequiredMixin, CreateView):
     success_url = reverse_lazy('blog:index')
 
     def form_valid(self, form):
-        self.object = form.save(commit=False)  # Pega o objeto post configurado
-        self.object.created_by = self.request.user  # Vincula o usuário
-        self.object.save()  # Salva no banco
-        form.save_m2m()  # Salva as tags
-        return super().form_valid(form)
+        # O form vincula o usuário, salva o post uma única vez e aplica as
+        # tags (o super().form_valid() salvaria o post de novo).
+        self.object = form.save(user=self.request.user)
+        return redirect(self.get_success_url())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -112,21 +122,137 @@ class PostListViewBase(ListView):
     template_name = 'blog/pages/index.html'
     context_object_name = 'page_obj'
     paginate_by = 9
+    paginator_class = CountedPaginator
+    # Paginação por cursor (?after= / ?before=), sem OFFSET nem COUNT(*).
+    # Pode ser ligada por view ou para o site todo via settings.
+    keyset_pagination = settings.BLOG_KEYSET_PAGINATION
+
+    def get(self, request, *args, **kwargs):
+        self.load_listing_object()
+        response = self.get_early_response()
+        if response is not None:
+            return response
+        return super().get(request, *args, **kwargs)
+
+    def get_early_response(self):
+        """
+        Resposta antes da consulta da página (ex.: o 304 do
+        ConditionalGetMixin). None segue para a listagem.
+        """
+        return None
+
+    def get_validators_context(self):
+        """
+        A página pedida só com o pk e o updated_at de cada post: basta para
+        as dependências e o ``get_modified_objects``, sem as colunas do
+        card, o COUNT(*) e o template.
+
+        Returns:
+            dict | None: ``{'page_obj': [...]}``, ou None se a página só é
+            conhecida depois de contar os posts (ex.: ``?page=last``)
+        """
+        queryset = self.get_queryset().only('id', 'updated_at')
+        page_size = self.get_paginate_by(queryset)
+        if self.keyset_pagination:
+            try:
+                page = KeysetPaginator(queryset, page_size).get_page(
+                    after=self.request.GET.get(AFTER_PARAM),
+                    before=self.request.GET.get(BEFORE_PARAM),
+                )
+            except Http404:
+                return None
+            return {'page_obj': list(page)}
+
+        page = (self.kwargs.get(self.page_kwarg) or
+                self.request.GET.get(self.page_kwarg) or 1)
+        try:
+            number = int(page)
+        except ValueError:
+            return None
+        if number < 1 or self.get_paginate_orphans():
+            return None
+        start = (number - 1) * page_size
+        rows = list(queryset[start:start + page_size])
+        if not rows and number > 1:
+            # Página inexistente: o caminho normal responde o 404
+            return None
+        return {'page_obj': rows}
+
+    def load_listing_object(self):
+        """
+        Busca o objeto da listagem (categoria, tag, autor), se houver.
+
+        Fica fora do get_queryset(), que assim não faz consultas: as
+        views de blog/async_views.py buscam o objeto com o ORM assíncrono
+        e reaproveitam o mesmo queryset.
+        """
 
     def get_queryset(self):
-        return self.model.objects.get_published()
+        # Só as colunas do card; o 'content' nunca é carregado nas listagens
+        return self.model.objects.get_published_cards()
 
+    def get_published_count(self):
+        """
+        Total de posts da listagem vindo dos contadores desnormalizados.
+        None faz o paginator cair no COUNT(*) normal.
+        """
+        return None
+
+    def get_paginator(self, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True, **kwargs):
+        return super().get_paginator(
+            queryset, per_page, orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            count=self.get_published_count(), **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset_pagination:
+            paginator, page, _, is_paginated = super().paginate_queryset(
+                queryset, page_size)
+            # O context_object_name é 'page_obj', então devolvemos a própria
+            # página (e não só a lista) para os templates de paginação.
+            return paginator, page, page, is_paginated
+
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.get_page(
+            after=self.request.GET.get(AFTER_PARAM),
+            before=self.request.GET.get(BEFORE_PARAM),
+            params=self.request.GET,
+        )
+        return paginator, page, page, page.has_other_pages()
 
-class IndexView(PostListViewBase):
-    pass
+    def get_cache_dependencies(self, context):
+        # A página depende de cada post listado (título, resumo, capa)
+        page = context['page_obj'] or []
+        return [dep('post', post.pk) for post in page]
 
+    def get_modified_objects(self, context):
+        return context['page_obj'] or []
 
-class CategoryView(PostListViewBase):
-    def get_queryset(self):
-        qs = super().get_queryset()
+
+class IndexView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                PostListViewBase):
+    def get_cache_dependencies(self, context):
+        return super().get_cache_dependencies(context) + [dep('list:index')]
+
+
+class CategoryView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                   PostListViewBase):
+    def load_listing_object(self):
         self.category = get_object_or_404(
             Category, slug=self.kwargs.get('slug'))
-        return qs.filter(category=self.category)
+
+    def get_queryset(self):
+        return super().get_queryset().filter(category=self.category)
+
+    def get_published_count(self):
+        return self.category.published_post_count
+
+    def get_cache_dependencies(self, context):
+        return super().get_cache_dependencies(context) + [
+            dep('category', self.category.pk),
+            dep('list:category', self.category.pk),
+        ]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -135,11 +261,22 @@ class CategoryView(PostListViewBase):
         return context
 
 
-class TagView(PostListViewBase):
-    def get_queryset(self):
-        qs = super().get_queryset()
+class TagView(ConditionalGetMixin, AnonymousPageCacheMixin,
+              PostListViewBase):
+    def load_listing_object(self):
         self.tag = get_object_or_404(Tag, slug=self.kwargs.get('slug'))
-        return qs.filter(tags=self.tag)
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tags=self.tag)
+
+    def get_published_count(self):
+        return self.tag.published_post_count
+
+    def get_cache_dependencies(self, context):
+        return super().get_cache_dependencies(context) + [
+            dep('tag', self.tag.pk),
+            dep('list:tag', self.tag.pk),
+        ]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -148,11 +285,24 @@ class TagView(PostListViewBase):
         return context
 
 
-class CreatedByView(PostListViewBase):
+class CreatedByView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                    PostListViewBase):
+    def load_listing_object(self):
+        self.author = get_object_or_404(
+            User.objects.select_related('post_stats'), pk=self.kwargs.get('id'))
+
     def get_queryset(self):
-        qs = super().get_queryset()
-        self.author = get_object_or_404(User, pk=self.kwargs.get('id'))
-        return qs.filter(created_by=self.author)
+        return super().get_queryset().filter(created_by=self.author)
+
+    def get_published_count(self):
+        stats = getattr(self.author, 'post_stats', None)
+        return stats.published_post_count if stats else None
+
+    def get_cache_dependencies(self, context):
+        return super().get_cache_dependencies(context) + [
+            dep('author', self.author.pk),
+            dep('list:author', self.author.pk),
+        ]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -162,7 +312,7 @@ class CreatedByView(PostListViewBase):
         return context
 
 
-class SearchView(PostListViewBase):
+class SearchView(ConditionalGetMixin, PostListViewBase):
     def get_queryset(self):
         qs = super().get_queryset()
         self.search_value = self.request.GET.get('q', '').strip()
@@ -170,25 +320,53 @@ class SearchView(PostListViewBase):
         if not self.search_value:
             return qs.none()
 
-        return qs.filter(
-            Q(title__icontains=self.search_value) |
-            Q(excerpt__icontains=self.search_value) |
-            Q(content__icontains=self.search_value)
-        )
+        qs, ranked = search_posts(qs, self.search_value)
+        if ranked:
+            # Resultados ordenados por relevância não podem ser paginados
+            # por cursor em -pk.
+            self.keyset_pagination = False
+        return qs
+
+    def get_cache_dependencies(self, context):
+        # Os resultados são posts publicados: qualquer publicação ou
+        # despublicação pode mudar a busca
+        return super().get_cache_dependencies(context) + [dep('list:index')]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search_value'] = self.search_value
+        context['search_url'] = f'&{urlencode({"q": self.search_value})}'
         context['page_title'] = f'Busca: "{self.search_value}" - '
         context['page_main_title'] = f'Busca por "{self.search_value}"'
         return context
 
+
+class SearchSuggestView(View):
+    """
+    Sugestões da busca em JSON, chamadas a cada tecla pelo _search.html.
+
+    Parâmetros: ``q`` (termo digitado) e ``limit`` (itens por tipo).
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.GET.get('limit', SUGGEST_DEFAULT_LIMIT))
+        except ValueError:
+            limit = SUGGEST_DEFAULT_LIMIT
+
+        response = JsonResponse(suggest(request.GET.get('q', ''), limit))
+        # O navegador pode reaproveitar a resposta enquanto o usuário
+        # apaga e redigita o mesmo trecho.
+        patch_cache_control(response, public=True, max_age=60)
+        return response
+
 # ===================================================================
 # VIEWS DE DETALHE
 # ===================================================================
 
 
-class PageDetailView(DetailView):
+class PageDetailView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                     DetailView):
     model = Page
     template_name = 'blog/pages/page.html'
     context_object_name = 'page'
@@ -196,16 +374,24 @@ class PageDetailView(DetailView):
     slug_url_kwarg = 'slug'
 
     def get_queryset(self):
-        return super().get_queryset().filter(is_published=True)
+        return super().get_queryset().filter(is_published=True).defer(
+            'content', 'content_text')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        page = self.get_object()
-        context['page_title'] = f'{page.title} - '
+        # O get() já buscou o objeto; get_object() faria a query de novo
+        context['page_title'] = f'{self.object.title} - '
         return context
 
+    def get_cache_dependencies(self, context):
+        return [dep('page', self.object.pk)]
 
-class PostDetailView(DetailView):
+    def get_modified_objects(self, context):
+        return [self.object]
+
+
+class PostDetailView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                     DetailView):
     model = Post
     template_name = 'blog/pages/post.html'
     context_object_name = 'post'
@@ -213,28 +399,42 @@ class PostDetailView(DetailView):
     slug_url_kwarg = 'slug'
 
     def get_queryset(self):
-        # A query base agora busca todos os posts
-        qs = Post.objects.all()
-
-        # Se o usuário não estiver logado, ele só pode ver os posts publicados.
-        # Esta é a regra de segurança para visitantes.
-        if not self.request.user.is_authenticated:
-            return qs.filter(is_published=True)
-
-        # Se o usuário ESTÁ LOGADO, ele pode ver posts que:
-        # 1. Estejam publicados (Q(is_published=True)) OU
-        # 2. Tenham sido criados por ele mesmo (Q(created_by=self.request.user))
-        return qs.filter(
-            Q(is_published=True) | Q(created_by=self.request.user)
-            # .distinct() previne duplicatas caso um post seja do autor e também publicado
-        ).distinct()
+        # Autor e categoria vêm no mesmo SELECT; as tags só são buscadas
+        # pelo template (uma query), então um 304 sai com uma query só.
+        # O content cru não é exibido: o template usa o content_html,
+        # processado no save.
+        # Visitantes só veem os publicados; logados, também os próprios
+        # rascunhos (a mesma regra da API, blog/api.py).
+        return Post.objects.visible_to(self.request.user).select_related(
+            'created_by', 'category').defer('content', 'content_text')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        post = self.get_object()
-        context['page_title'] = f'{post.title} - '
+        # O get() já buscou o objeto; get_object() faria a query de novo
+        context['page_title'] = f'{self.object.title} - '
+        # Lista pré-calculada (blog/related.py): uma query pelo índice
+        # (post, related), feita só quando o template é renderizado
+        context['related_posts'] = Post.objects.get_published_cards().filter(
+            related_from__post=self.object,
+        ).order_by('-related_from__score', '-pk')[:RELATED_LIMIT]
         return context
 
+    def get_cache_dependencies(self, context):
+        # Os posts relacionados invalidam as páginas que os exibem
+        # (signals.py) e a troca da lista também (related.py).
+        # Renomear ou excluir uma tag invalida os posts dela (signals.py),
+        # então as tags não entram aqui e dispensam a consulta
+        post = self.object
+        deps = [dep('post', post.pk)]
+        if post.category_id:
+            deps.append(dep('category', post.category_id))
+        if post.created_by_id:
+            deps.append(dep('author', post.created_by_id))
+        return deps
+
+    def get_modified_objects(self, context):
+        return [self.object]
+
 
 # ===================================================================
 #   NOVA VIEW PARA RASCUNHOS
@@ -250,7 +450,7 @@ class DraftsView(LoginRequiredMixin, PostListViewBase):
         return Post.objects.filter(
             is_published=False,
             created_by=self.request.user
-        ).order_by('-pk')
+        ).only(*Post.objects.card_fields).order_by('-pk')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
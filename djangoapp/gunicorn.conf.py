@@ -0,0 +1,24 @@
+"""
+Configuração do gunicorn (o CMD do Dockerfile).
+
+``SERVER_MODE`` escolhe a pilha:
+
+- ``wsgi`` (padrão): workers síncronos com project.wsgi; cada worker
+  atende uma requisição por vez.
+- ``asgi``: workers do uvicorn com project.asgi e as views de leitura
+  assíncronas (blog/async_views.py); cada worker atende muitas conexões
+  ao mesmo tempo, inclusive de clientes lentos.
+
+O número de workers vem do ``WEB_CONCURRENCY`` (lido pelo próprio
+gunicorn).
+"""
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'project.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'project.wsgi:application'
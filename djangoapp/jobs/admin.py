@@ -0,0 +1,45 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from jobs.models import Job, ProcessedFile, StoredFile
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = 'id', 'task', 'status', 'attempts', 'run_after', 'updated_at',
+    list_display_links = 'task',
+    search_fields = 'key', 'task',
+    list_filter = 'status', 'task',
+    list_per_page = 50
+    ordering = '-id',
+    readonly_fields = (
+        'key', 'task', 'payload', 'attempts', 'locked_at', 'last_error',
+        'created_at', 'updated_at',
+    )
+    actions = ['requeue']
+
+    @admin.action(description='Recolocar na fila')
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.PENDING, attempts=0, locked_at=None,
+            run_after=timezone.now())
+        self.message_user(
+            request, f'{updated} tarefa(s) na fila.', messages.SUCCESS)
+
+
+@admin.register(ProcessedFile)
+class ProcessedFileAdmin(admin.ModelAdmin):
+    list_display = 'name', 'processed_at',
+    search_fields = 'name', 'content_hash',
+    list_per_page = 50
+    ordering = '-processed_at',
+    readonly_fields = 'name', 'content_hash', 'settings_hash', 'processed_at',
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = 'name', 'ref_count', 'created_at',
+    search_fields = 'name',
+    list_per_page = 50
+    ordering = '-created_at',
+    readonly_fields = 'name', 'ref_count', 'created_at',
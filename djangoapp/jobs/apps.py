@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+    verbose_name = 'Fila de tarefas'
+
+    def ready(self):
+        # Registra as tarefas declaradas nos módulos tasks.py dos apps
+        autodiscover_modules('tasks')
@@ -0,0 +1,108 @@
+"""
+Contagem de referências dos arquivos de mídia compartilhados.
+
+Com o storage endereçado pelo conteúdo (utils/storage.py) o mesmo arquivo
+pode ser usado por vários objetos, então ele não pode ser apagado junto
+com o primeiro deles. ``count_references(Model, 'campo')`` liga signals
+que mantêm um ``StoredFile`` por arquivo:
+
+- objeto criado, ou com o arquivo trocado: +1 no novo, -1 no antigo;
+- objeto excluído: -1.
+
+Quando a contagem chega a zero o arquivo, as suas renditions e o
+registro do reprocessamento são apagados, depois do commit (e só se
+nenhum outro objeto voltou a usar o arquivo nesse meio-tempo).
+
+Arquivos sem ``StoredFile`` (enviados antes da contagem, fora dos
+campos registrados) nunca são apagados por aqui.
+"""
+
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+
+from utils.renditions import rendition_dir
+
+from .models import ProcessedFile, StoredFile
+
+
+def retain_file(name):
+    """
+    Registra mais um uso do arquivo.
+    """
+    if not name:
+        return
+    stored, created = StoredFile.objects.get_or_create(
+        name=name, defaults={'ref_count': 1})
+    if not created:
+        StoredFile.objects.filter(pk=stored.pk).update(
+            ref_count=F('ref_count') + 1)
+
+
+def release_file(name, storage=default_storage):
+    """
+    Registra um uso a menos do arquivo; sem usos, ele é apagado depois
+    do commit.
+    """
+    if not name:
+        return
+    updated = StoredFile.objects.filter(
+        name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+    if updated:
+        transaction.on_commit(lambda: delete_if_unreferenced(name, storage))
+
+
+def delete_if_unreferenced(name, storage=default_storage):
+    """
+    Apaga o arquivo (e as renditions) se a contagem continua em zero.
+
+    Returns:
+        bool: Se o arquivo foi apagado
+    """
+    with transaction.atomic():
+        stored = StoredFile.objects.select_for_update().filter(
+            name=name, ref_count=0).first()
+        if stored is None:
+            return False
+        stored.delete()
+        ProcessedFile.objects.filter(name=name).delete()
+        storage.delete(name)
+    shutil.rmtree(Path(settings.MEDIA_ROOT) / rendition_dir(name),
+                  ignore_errors=True)
+    return True
+
+
+def count_references(model, field_name):
+    """
+    Liga a contagem de referências ao campo de arquivo do model.
+
+    O model precisa do ``FieldTrackerMixin`` com o campo em
+    ``tracked_fields``, para saber qual era o arquivo anterior.
+    """
+    storage = model._meta.get_field(field_name).storage
+    uid = f'{model._meta.label_lower}.{field_name}'
+
+    def on_save(sender, instance, created, update_fields=None, raw=False,
+                **kwargs):
+        if raw:
+            return
+        if update_fields is not None and field_name not in update_fields:
+            return
+        if not created and not instance.has_changed(field_name):
+            return
+        retain_file(getattr(instance, field_name).name)
+        if not created:
+            release_file(instance.previous_value(field_name), storage)
+
+    def on_delete(sender, instance, **kwargs):
+        release_file(getattr(instance, field_name).name, storage)
+
+    post_save.connect(on_save, sender=model, weak=False,
+                      dispatch_uid=f'retain-{uid}')
+    post_delete.connect(on_delete, sender=model, weak=False,
+                        dispatch_uid=f'release-{uid}')
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from jobs.media import reprocess_media
+
+# De quantos em quantos arquivos o progresso é mostrado
+PROGRESS_EVERY = 50
+
+
+class Command(BaseCommand):
+    help = (
+        'Reprocessa as imagens já enviadas (capas, favicon e anexos) com '
+        'as larguras e a qualidade atuais, em paralelo. Arquivos que não '
+        'mudaram desde o último processamento são pulados, então o '
+        'comando pode ser interrompido e rodado de novo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Processos em paralelo (padrão: número de CPUs).')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Reprocessa também os arquivos que não mudaram.')
+
+    def handle(self, *args, **options):
+        self.seen = 0
+        summary = reprocess_media(
+            workers=options['workers'], force=options['force'],
+            on_result=self.report)
+
+        counts = summary['counts']
+        seconds = max(summary['seconds'], 0.001)
+        megabytes = summary['bytes'] / (1024 * 1024)
+        self.stdout.write(self.style.SUCCESS(
+            f'{summary["files"]} arquivos em {seconds:.1f}s '
+            f'({summary["files"] / seconds:.1f} arquivos/s, '
+            f'{megabytes / seconds:.1f} MB/s): '
+            f'{counts["processed"]} processados, '
+            f'{counts["unchanged"]} sem mudança, '
+            f'{counts["skipped"]} ignorados, '
+            f'{counts["missing"]} ausentes, '
+            f'{counts["error"]} com erro.'
+        ))
+
+    def report(self, result):
+        self.seen += 1
+        if result['status'] in ('error', 'missing'):
+            self.stderr.write(
+                f'{result["status"].upper():<8}{result["name"]} '
+                f'{result.get("error", "")}'.rstrip())
+        if self.seen % PROGRESS_EVERY == 0:
+            self.stdout.write(f'... {self.seen} arquivos')
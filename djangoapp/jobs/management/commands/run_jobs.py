@@ -0,0 +1,53 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = (
+        'Worker da fila de tarefas em segundo plano (ex.: redimensionamento '
+        'de imagens). Roda até receber SIGINT/SIGTERM, ou só esvazia a '
+        'fila com --once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Executa as tarefas prontas e termina.')
+        parser.add_argument(
+            '--batch', type=int, default=10,
+            help='Tarefas reservadas por vez (padrão: 10).')
+        parser.add_argument(
+            '--sleep', type=float, default=settings.JOBS_POLL_INTERVAL,
+            help='Segundos de espera quando a fila está vazia.')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        if not options['once']:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        while not self.stopping:
+            jobs = queue.claim(options['batch'])
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            for job in jobs:
+                # Termina as tarefas já reservadas antes de sair
+                if queue.run(job):
+                    self.stdout.write(f'OK     {job.task} ({job.key})')
+                else:
+                    self.stderr.write(
+                        f'{job.status.upper():<7}{job.task} ({job.key}) '
+                        f'tentativa {job.attempts}/{job.max_attempts}')
+
+    def stop(self, signum, frame):
+        self.stdout.write('Encerrando o worker...')
+        self.stopping = True
@@ -0,0 +1,245 @@
+"""
+Reprocessamento em lote das imagens já enviadas (manage.py reprocess_media).
+
+Depois de mudar larguras ou qualidade, as imagens antigas só seriam
+processadas no próximo save. Aqui os arquivos dos campos de
+``MEDIA_FIELDS`` são reprocessados em paralelo, em um pool de processos
+(um por CPU):
+
+- Cada processo calcula o SHA-256 do arquivo; se ele e as configurações
+  forem os mesmos do último processamento (``ProcessedFile``), o arquivo
+  é pulado sem ser decodificado.
+- O resultado de cada arquivo é gravado assim que ele termina, então um
+  reprocessamento interrompido continua de onde parou.
+- Os processos do pool só mexem em arquivos; o banco fica com o
+  processo principal.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.apps import apps
+from django.conf import settings
+from PIL import UnidentifiedImageError  # type: ignore
+
+from site_setup.models import FAVICON_WIDTH
+from utils import renditions
+from utils.images import resize_image_file
+
+from .models import ProcessedFile
+
+# Campos de imagem e o que é feito com cada um: 'renditions' gera as
+# versões responsivas (a original fica intacta, o manifesto vai para o
+# campo '<field>_renditions'); 'resize' reduz o arquivo no lugar.
+MEDIA_FIELDS = (
+    {'model': 'blog.post', 'field': 'cover', 'action': 'renditions'},
+    {'model': 'site_setup.sitesetup', 'field': 'favicon',
+     'action': 'resize', 'width': FAVICON_WIDTH},
+    {'model': 'blog.postattachment', 'field': 'file',
+     'action': 'resize', 'width': settings.ATTACHMENT_MAX_WIDTH},
+)
+
+# Qualidade do JPEG no resize no lugar (a mesma do resize_image)
+RESIZE_QUALITY = 60
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_hash(path):
+    """
+    SHA-256 do arquivo, lido em blocos (não carrega o arquivo inteiro).
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_hash(spec):
+    """
+    Resumo das configurações que mudam o resultado do processamento.
+    """
+    if spec['action'] == 'renditions':
+        options = {
+            'widths': renditions.RENDITION_WIDTHS,
+            'webp_quality': renditions.WEBP_QUALITY,
+            'jpeg_quality': renditions.JPEG_QUALITY,
+        }
+    else:
+        options = {'width': spec['width'], 'quality': RESIZE_QUALITY}
+    options.update(action=spec['action'],
+                   max_pixels=getattr(settings, 'MAX_IMAGE_PIXELS', None))
+    encoded = json.dumps(options, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _init_worker():
+    # Com 'spawn' (macOS, Windows) o processo filho começa do zero
+    if not apps.ready:
+        django.setup()
+
+
+def process_file(item):
+    """
+    Processa um arquivo (roda nos processos do pool).
+
+    Args:
+        item: dict com 'name', 'spec', 'settings_hash' e 'previous' (o
+            content_hash do último processamento, ou None)
+
+    Returns:
+        dict: 'name', 'status' (processed, unchanged, missing, skipped
+        ou error), 'bytes' lidos e, quando processado, o novo
+        'content_hash' e o 'manifest' das renditions
+    """
+    name, spec = item['name'], item['spec']
+    path = Path(settings.MEDIA_ROOT) / name
+    result = {'name': name, 'bytes': 0}
+
+    try:
+        result['bytes'] = path.stat().st_size
+        digest = file_hash(path)
+        if digest == item['previous'] and (
+                spec['action'] != 'renditions'
+                or renditions.read_manifest(name)):
+            return {**result, 'status': 'unchanged'}
+
+        if spec['action'] == 'renditions':
+            result['manifest'] = renditions.generate_renditions(
+                name, widths=renditions.RENDITION_WIDTHS, force=True)
+            if result['manifest'] is None:
+                raise FileNotFoundError(name)
+        else:
+            if resize_image_file(path, spec['width'],
+                                 quality=RESIZE_QUALITY) is not None:
+                digest = file_hash(path)
+    except FileNotFoundError:
+        return {**result, 'status': 'missing'}
+    except UnidentifiedImageError:
+        # Anexos que não são imagens (PDF etc.)
+        return {**result, 'status': 'skipped'}
+    except Exception as error:
+        return {**result, 'status': 'error',
+                'error': f'{type(error).__name__}: {error}'}
+
+    return {**result, 'status': 'processed', 'content_hash': digest}
+
+
+def collect(specs=MEDIA_FIELDS):
+    """
+    Arquivos referenciados pelos models, sem repetir nomes.
+
+    Returns:
+        list: Itens para ``process_file``
+    """
+    done = {
+        name: (content_hash, stored_settings)
+        for name, content_hash, stored_settings
+        in ProcessedFile.objects.values_list(
+            'name', 'content_hash', 'settings_hash').iterator()
+    }
+    items = {}
+    for spec in specs:
+        Model = apps.get_model(spec['model'])
+        current_settings = settings_hash(spec)
+        names = (
+            Model._default_manager.exclude(**{spec['field']: ''})
+            .exclude(**{f'{spec["field"]}__isnull': True})
+            .values_list(spec['field'], flat=True)
+            .distinct().iterator()
+        )
+        for name in names:
+            if name in items:
+                continue
+            content_hash, stored_settings = done.get(name, (None, None))
+            items[name] = {
+                'name': name,
+                'spec': spec,
+                'settings_hash': current_settings,
+                # Configurações diferentes: processa de novo
+                'previous': (content_hash
+                             if stored_settings == current_settings
+                             else None),
+            }
+    return list(items.values())
+
+
+def _save_result(item, result):
+    ProcessedFile.objects.update_or_create(
+        name=item['name'],
+        defaults={'content_hash': result['content_hash'],
+                  'settings_hash': item['settings_hash']})
+
+    spec = item['spec']
+    if 'manifest' in result:
+        # save() (e não update()) para os signals invalidarem o cache
+        Model = apps.get_model(spec['model'])
+        field = spec['field']
+        owners = Model._default_manager.filter(
+            **{field: item['name']}).only('pk', field)
+        for instance in owners:
+            setattr(instance, f'{field}_renditions', result['manifest'])
+            instance.save(update_fields=[f'{field}_renditions'])
+
+
+def reprocess_media(workers=None, force=False, on_result=None,
+                    specs=MEDIA_FIELDS):
+    """
+    Reprocessa as imagens de ``specs`` em um pool de processos.
+
+    Args:
+        workers: Processos do pool (padrão: número de CPUs); com 1, roda
+            no próprio processo
+        force: Processa tudo, mesmo o que não mudou
+        on_result: Chamado com cada resultado de ``process_file``
+        specs: Campos a processar (padrão: ``MEDIA_FIELDS``)
+
+    Returns:
+        dict: 'counts' por status, 'files', 'bytes' e 'seconds'
+    """
+    start = time.monotonic()
+    items = collect(specs)
+    if force:
+        for item in items:
+            item['previous'] = None
+    by_name = {item['name']: item for item in items}
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(items) <= 1:
+        results = map(process_file, items)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker)
+        # Resultados na ordem de envio; o chunksize amortiza a troca de
+        # mensagens entre os processos quando há muitos arquivos pequenos
+        chunksize = max(1, min(16, len(items) // (workers * 4)))
+        results = pool.map(process_file, items, chunksize=chunksize)
+
+    counts = Counter()
+    total_bytes = 0
+    try:
+        for result in results:
+            if result['status'] == 'processed':
+                _save_result(by_name[result['name']], result)
+            counts[result['status']] += 1
+            total_bytes += result['bytes']
+            if on_result:
+                on_result(result)
+    finally:
+        if pool is not None:
+            # Interrompido (Ctrl+C): não começa os arquivos ainda na fila
+            pool.shutdown(cancel_futures=True)
+
+    return {
+        'counts': counts,
+        'files': len(items),
+        'bytes': total_bytes,
+        'seconds': time.monotonic() - start,
+    }
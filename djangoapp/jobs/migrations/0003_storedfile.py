@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:55
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_existing_references(apps, schema_editor):
+    # Arquivos já enviados passam a ter contagem: só assim eles podem ser
+    # apagados quando o último post/anexo deixar de usá-los
+    StoredFile = apps.get_model('jobs', 'StoredFile')
+    references = Counter()
+    for model, field in (('Post', 'cover'), ('PostAttachment', 'file')):
+        Model = apps.get_model('blog', model)
+        references.update(
+            Model.objects.exclude(**{field: ''})
+            .values_list(field, flat=True).iterator())
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=name, ref_count=count)
+         for name, count in references.items()],
+        batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_processedfile'),
+        ('blog', '0015_cover_content_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Arquivo armazenado',
+                'verbose_name_plural': 'Arquivos armazenados',
+            },
+        ),
+        migrations.RunPython(
+            count_existing_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,106 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Tarefa da fila de processamento em segundo plano (jobs/queue.py).
+
+    Attributes:
+        key (CharField): Chave idempotente; enfileirar de novo a mesma
+            chave não duplica o trabalho
+        task (CharField): Nome da tarefa registrada com ``@task``
+        payload (JSONField): Argumentos nomeados da tarefa
+        status (CharField): pending, running, done ou failed
+        attempts (PositiveSmallIntegerField): Execuções já iniciadas
+        max_attempts (PositiveSmallIntegerField): Limite de tentativas
+            antes de marcar a tarefa como failed
+        run_after (DateTimeField): A tarefa só roda a partir deste horário
+            (usado para esperar entre as tentativas)
+        locked_at (DateTimeField): Quando um worker pegou a tarefa
+        last_error (TextField): Traceback da última falha
+    """
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        indexes = [
+            # Busca das próximas tarefas pelo worker
+            models.Index(
+                fields=['run_after', 'id'], name='job_pending_idx',
+                condition=Q(status='pending')),
+        ]
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pendente'
+        RUNNING = 'running', 'Em execução'
+        DONE = 'done', 'Concluída'
+        FAILED = 'failed', 'Falhou'
+
+    key = models.CharField(max_length=255, unique=True)
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.task} ({self.get_status_display()})'
+
+
+class ProcessedFile(models.Model):
+    """
+    Último processamento de um arquivo de mídia (manage.py reprocess_media).
+
+    Se o conteúdo e as configurações continuam os mesmos, o arquivo é
+    pulado; como cada arquivo é registrado assim que termina, um
+    reprocessamento interrompido continua de onde parou.
+
+    Attributes:
+        name (CharField): Caminho relativo ao MEDIA_ROOT
+        content_hash (CharField): SHA-256 do arquivo depois de processado
+        settings_hash (CharField): Resumo das configurações usadas
+            (larguras, qualidade)
+        processed_at (DateTimeField): Quando foi processado
+    """
+    class Meta:
+        verbose_name = 'Arquivo processado'
+        verbose_name_plural = 'Arquivos processados'
+
+    name = models.CharField(max_length=255, unique=True)
+    content_hash = models.CharField(max_length=64)
+    settings_hash = models.CharField(max_length=64)
+    processed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class StoredFile(models.Model):
+    """
+    Contagem de referências de um arquivo de mídia compartilhável
+    (utils/storage.py: o mesmo arquivo pode servir a vários objetos).
+
+    Quando a contagem chega a zero, o arquivo e as suas renditions são
+    apagados (jobs/files.py, ``release_file``).
+
+    Attributes:
+        name (CharField): Caminho relativo ao MEDIA_ROOT
+        ref_count (PositiveIntegerField): Objetos que usam o arquivo
+    """
+    class Meta:
+        verbose_name = 'Arquivo armazenado'
+        verbose_name_plural = 'Arquivos armazenados'
+
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.ref_count})'
@@ -0,0 +1,170 @@
+"""
+Fila de tarefas em segundo plano guardada no próprio banco.
+
+Não precisa de Redis nem Celery: ``enqueue`` grava um ``Job`` (na mesma
+transação de quem enfileira, então um save desfeito não deixa tarefa
+órfã) e o comando ``manage.py run_jobs`` executa as tarefas pendentes.
+
+- As tarefas são funções registradas com ``@task('nome')`` em módulos
+  ``tasks.py`` dos apps (carregados no ``JobsConfig.ready``).
+- A ``key`` é idempotente: enfileirar de novo uma chave pendente, em
+  execução ou concluída não cria trabalho repetido.
+- Falhas são repetidas com espera exponencial até ``max_attempts``.
+- Tarefas presas em ``running`` (worker que morreu) voltam para a fila
+  depois de ``JOBS_LOCK_TIMEOUT`` segundos.
+- No PostgreSQL vários workers podem rodar juntos (``SKIP LOCKED``).
+"""
+
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+_tasks = {}
+
+
+def task(name):
+    """
+    Decorator que registra uma função como tarefa da fila.
+    """
+    def decorator(func):
+        _tasks[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _tasks[name]
+
+
+def enqueue(task_name, payload=None, key=None, delay=0, max_attempts=5,
+            force=False):
+    """
+    Coloca uma tarefa na fila.
+
+    Args:
+        task_name: Nome registrado com ``@task``
+        payload: Argumentos nomeados da tarefa (precisam ser JSON)
+        key: Chave idempotente; sem ela cada chamada cria uma tarefa nova
+        delay: Segundos até a tarefa poder rodar
+        max_attempts: Tentativas antes de desistir
+        force: Recoloca na fila mesmo se a chave já foi concluída
+
+    Returns:
+        Job: A tarefa criada ou a já existente com a mesma chave
+    """
+    key = key or f'{task_name}:{uuid.uuid4().hex}'
+    fields = {
+        'task': task_name,
+        'payload': payload or {},
+        'status': Job.Status.PENDING,
+        'attempts': 0,
+        'max_attempts': max_attempts,
+        'run_after': timezone.now() + timedelta(seconds=delay),
+        'locked_at': None,
+        'last_error': '',
+    }
+    job, created = Job.objects.get_or_create(key=key, defaults=fields)
+    if created:
+        return job
+
+    # Falhou de vez (ou foi pedido): recomeça do zero
+    requeue = job.status == Job.Status.FAILED or (
+        force and job.status == Job.Status.DONE)
+    if requeue:
+        for field, value in fields.items():
+            setattr(job, field, value)
+        job.save()
+    return job
+
+
+def claim(batch=1):
+    """
+    Reserva até ``batch`` tarefas prontas para rodar neste worker.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+
+    with transaction.atomic():
+        qs = Job.objects.filter(
+            Q(status=Job.Status.PENDING, run_after__lte=now) |
+            Q(status=Job.Status.RUNNING, locked_at__lt=stale)
+        ).order_by('run_after', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        jobs = list(qs[:batch])
+
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.Status.RUNNING, locked_at=now,
+            attempts=F('attempts') + 1)
+
+    for job in jobs:
+        job.status = Job.Status.RUNNING
+        job.locked_at = now
+        job.attempts += 1
+    return jobs
+
+
+def retry_delay(attempts):
+    """
+    Espera antes da próxima tentativa: base, 2x base, 4x base...
+    """
+    return settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def run(job):
+    """
+    Executa uma tarefa reservada por ``claim`` e grava o resultado.
+
+    Returns:
+        bool: True se a tarefa foi concluída
+    """
+    # Só atualiza se a reserva ainda for deste worker
+    mine = Job.objects.filter(pk=job.pk, locked_at=job.locked_at)
+    try:
+        get_task(job.task)(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts or job.task not in _tasks:
+            mine.update(status=Job.Status.FAILED, locked_at=None,
+                        last_error=error, updated_at=timezone.now())
+            job.status = Job.Status.FAILED
+        else:
+            run_after = timezone.now() + timedelta(
+                seconds=retry_delay(job.attempts))
+            mine.update(status=Job.Status.PENDING, locked_at=None,
+                        run_after=run_after, last_error=error,
+                        updated_at=timezone.now())
+            job.status = Job.Status.PENDING
+        job.last_error = error
+        return False
+
+    mine.update(status=Job.Status.DONE, locked_at=None, last_error='',
+                updated_at=timezone.now())
+    job.status = Job.Status.DONE
+    return True
+
+
+def run_pending(batch=10):
+    """
+    Executa as tarefas prontas até a fila esvaziar.
+
+    Returns:
+        tuple: (concluídas, com falha)
+    """
+    done = failed = 0
+    while True:
+        jobs = claim(batch)
+        if not jobs:
+            return done, failed
+        for job in jobs:
+            if run(job):
+                done += 1
+            else:
+                failed += 1
@@ -0,0 +1,93 @@
+"""
+Tarefas de processamento de imagens.
+
+Os models só enfileiram (``enqueue_resize``/``enqueue_renditions``); o
+trabalho pesado roda no worker (``manage.py run_jobs``). Até lá os
+templates continuam servindo o arquivo original: o redimensionamento só
+troca o arquivo quando a nova versão está pronta (ver
+``utils.images.resize_image``) e as renditions só aparecem no ``srcset``
+depois de gravadas no model.
+"""
+
+from django.apps import apps
+
+from utils.images import resize_image
+from utils.renditions import generate_renditions
+
+from .queue import enqueue, task
+
+RESIZE_TASK = 'images.resize'
+RENDITIONS_TASK = 'images.renditions'
+
+
+def _enqueue_image_task(task_name, instance, field_name, **payload):
+    """
+    Enfileira uma tarefa sobre a imagem atual do campo.
+
+    A chave inclui o nome do arquivo: salvar de novo com a mesma imagem
+    não gera outra tarefa, e uma imagem nova gera a sua.
+    """
+    name = getattr(instance, field_name).name
+    label = instance._meta.label_lower
+    return enqueue(
+        task_name,
+        payload={
+            'model': label,
+            'pk': instance.pk,
+            'field': field_name,
+            'name': name,
+            **payload,
+        },
+        key=f'{task_name}:{label}:{instance.pk}:{field_name}:{name}',
+    )
+
+
+def _load_image_owner(model, pk, field, name):
+    """
+    Busca o objeto dono da imagem, ou None se ele foi excluído ou se a
+    imagem foi trocada de novo (a tarefa da nova cuida dela).
+    """
+    Model = apps.get_model(model)
+    instance = Model._default_manager.filter(pk=pk).only('pk', field).first()
+    if instance is None or getattr(instance, field).name != name:
+        return None
+    return instance
+
+
+def enqueue_resize(instance, field_name, width):
+    """
+    Enfileira o redimensionamento (no lugar) da imagem do campo.
+    """
+    return _enqueue_image_task(
+        RESIZE_TASK, instance, field_name, width=width)
+
+
+def enqueue_renditions(instance, field_name):
+    """
+    Enfileira a geração das renditions da imagem do campo. O manifesto é
+    gravado no campo ``<field_name>_renditions`` do model.
+    """
+    return _enqueue_image_task(RENDITIONS_TASK, instance, field_name)
+
+
+@task(RESIZE_TASK)
+def resize(model, pk, field, name, width):
+    instance = _load_image_owner(model, pk, field, name)
+    if instance is not None:
+        resize_image(getattr(instance, field), new_width=width)
+
+
+@task(RENDITIONS_TASK)
+def renditions(model, pk, field, name, force=False):
+    instance = _load_image_owner(model, pk, field, name)
+    if instance is None:
+        return
+
+    manifest = generate_renditions(getattr(instance, field), force=force)
+    if manifest is None:
+        raise FileNotFoundError(name)
+
+    # save() (e não update()) para os signals invalidarem o cache das
+    # páginas que exibem a imagem.
+    setattr(instance, f'{field}_renditions', manifest)
+    instance.save(update_fields=[f'{field}_renditions'])
@@ -0,0 +1,395 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from blog.models import Post, PostAttachment
+from jobs import queue
+from jobs.media import reprocess_media
+from jobs.models import Job, ProcessedFile, StoredFile
+from site_setup.models import SiteSetup
+from utils.images import ImageTooLargeError, open_reduced, resize_image_file
+from utils.model_validators import validate_image_dimensions
+from utils import renditions
+from utils.renditions import generate_renditions, read_manifest, rendition_dir
+
+calls = []
+
+
+@queue.task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@queue.task('tests.explode')
+def explode():
+    raise RuntimeError('falhou')
+
+
+@override_settings(JOBS_RETRY_DELAY=30, JOBS_LOCK_TIMEOUT=600)
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_same_key_is_enqueued_once(self):
+        first = queue.enqueue('tests.record', {'value': 1}, key='k')
+        second = queue.enqueue('tests.record', {'value': 1}, key='k')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(queue.run_pending(), (1, 0))
+        self.assertEqual(calls, [1])
+
+        # Concluída: re-enfileirar a mesma chave não repete o trabalho
+        queue.enqueue('tests.record', {'value': 1}, key='k')
+        self.assertEqual(queue.run_pending(), (0, 0))
+        queue.enqueue('tests.record', {'value': 1}, key='k', force=True)
+        self.assertEqual(queue.run_pending(), (1, 0))
+
+    def test_failures_are_retried_with_backoff(self):
+        job = queue.enqueue('tests.explode', max_attempts=2)
+        self.assertEqual(queue.run_pending(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.PENDING)
+        self.assertIn('RuntimeError', job.last_error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=20))
+
+        # Ainda esperando a próxima tentativa
+        self.assertEqual(queue.run_pending(), (0, 0))
+
+        Job.objects.update(run_after=timezone.now())
+        queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 2))
+
+    def test_failed_key_can_be_enqueued_again(self):
+        queue.enqueue('tests.explode', key='x', max_attempts=1)
+        queue.run_pending()
+        job = queue.enqueue('tests.explode', key='x')
+        self.assertEqual((job.status, job.attempts), (Job.Status.PENDING, 0))
+
+    def test_stale_running_job_is_reclaimed(self):
+        job = queue.enqueue('tests.record', {'value': 2})
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.Status.RUNNING,
+            locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(queue.run_pending(), (1, 0))
+        self.assertEqual(calls, [2])
+
+    def test_worker_command_once(self):
+        queue.enqueue('tests.record', {'value': 3})
+        out = StringIO()
+        call_command('run_jobs', '--once', stdout=out)
+        self.assertIn('tests.record', out.getvalue())
+        self.assertEqual(calls, [3])
+
+
+def make_image(name, size):
+    buffer = BytesIO()
+    Image.new('RGB', size).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+class ImageJobTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=Path(media_root))
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = get_user_model().objects.create_user('autor')
+
+    def width(self, image):
+        with Image.open(image.path) as img:
+            return img.width
+
+    def test_post_save_only_enqueues_and_worker_builds_renditions(self):
+        post = Post.objects.create(
+            title='Capa', excerpt='Resumo', content='Texto',
+            created_by=self.user, cover=make_image('capa.png', (1600, 900)))
+
+        # Até o worker rodar, o template usa a original
+        job = Job.objects.get()
+        self.assertEqual(job.payload['name'], post.cover.name)
+        self.assertEqual(post.cover_picture.src, post.cover.url)
+        self.assertEqual(post.cover_picture.webp_srcset, '')
+
+        # Salvar de novo sem trocar a capa não cria outra tarefa
+        post.title = 'Outro'
+        post.save()
+        self.assertEqual(Job.objects.count(), 1)
+
+        self.assertEqual(queue.run_pending(), (1, 0))
+        post.refresh_from_db()
+        manifest = post.cover_renditions
+        self.assertEqual(
+            [r['width'] for r in manifest['renditions']], [320, 480, 800, 1200])
+        for rendition in manifest['renditions']:
+            path = Path(settings.MEDIA_ROOT) / rendition['webp']
+            with Image.open(path) as img:
+                self.assertEqual((img.format, img.width),
+                                 ('WEBP', rendition['width']))
+            self.assertTrue(
+                (Path(settings.MEDIA_ROOT) / rendition['fallback']).exists())
+
+        # A original é mantida
+        self.assertEqual(self.width(post.cover), 1600)
+        picture = post.cover_picture
+        self.assertIn('1200.webp 1200w', picture.webp_srcset)
+        self.assertTrue(picture.src.endswith('/800.jpg'))
+
+    def test_renditions_are_reused_until_the_source_changes(self):
+        post = Post.objects.create(
+            title='Capa', excerpt='Resumo', content='Texto',
+            cover=make_image('capa.png', (500, 300)))
+        queue.run_pending()
+        post.refresh_from_db()
+
+        # Sem upscale: a maior rendition é a própria largura da original
+        self.assertEqual(
+            [r['width'] for r in post.cover_renditions['renditions']],
+            [320, 480, 500])
+
+        webp = Path(settings.MEDIA_ROOT) / post.cover_renditions[
+            'renditions'][0]['webp']
+        mtime = webp.stat().st_mtime_ns
+        self.assertEqual(generate_renditions(post.cover), post.cover_renditions)
+        self.assertEqual(webp.stat().st_mtime_ns, mtime)
+
+        Image.new('RGB', (400, 300)).save(post.cover.path, 'PNG')
+        manifest = generate_renditions(post.cover)
+        self.assertEqual(
+            [r['width'] for r in manifest['renditions']], [320, 400])
+
+    def test_replaced_image_job_is_skipped(self):
+        post = Post.objects.create(
+            title='Capa', excerpt='Resumo', content='Texto',
+            cover=make_image('velha.png', (1600, 900)))
+        old_name = post.cover.name
+        post.cover = make_image('nova.png', (1200, 900))
+        post.save()
+
+        self.assertEqual(queue.run_pending(), (2, 0))
+        post.refresh_from_db()
+        self.assertEqual(post.cover_renditions['source'], post.cover.name)
+        self.assertIsNone(read_manifest(old_name))
+
+    def test_favicon_is_resized_by_worker(self):
+        setup = SiteSetup.objects.create(
+            title='Blog', description='Descrição',
+            favicon=make_image('favicon.png', (64, 64)))
+        self.assertEqual(self.width(setup.favicon), 64)
+        queue.run_pending()
+        self.assertEqual(self.width(setup.favicon), 32)
+
+
+class ReducedDecodeTests(TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def jpeg(self, size, **save_kwargs):
+        path = self.tmp / 'foto.jpg'
+        Image.new('RGB', size, 'red').save(path, 'JPEG', **save_kwargs)
+        return path
+
+    def test_jpeg_is_decoded_at_reduced_size(self):
+        path = self.jpeg((4000, 3000))
+        img, image_format = open_reduced(path, 320)
+        self.assertEqual(image_format, 'JPEG')
+        # Reduzida já na decodificação, mas nunca abaixo de 2x o destino
+        self.assertGreaterEqual(img.width, 640)
+        self.assertLess(img.width, 1280)
+
+    def test_rotated_jpeg_is_reduced_by_its_shown_width(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # girada 90 graus: 1000 de largura exibida
+        path = self.jpeg((6000, 1000), exif=exif.tobytes())
+        img, _ = open_reduced(path, 400)
+        # Nem abaixo de 2x o destino (o LANCZOS ampliaria) nem sem reduzir
+        self.assertEqual(img.width, 1000)
+        self.assertEqual(img.height, 6000)
+
+        img, _ = open_reduced(path, 100)
+        self.assertGreaterEqual(img.width, 200)
+        self.assertLess(img.width, 400)
+
+    def test_resize_strips_metadata_and_applies_orientation(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # girada 90 graus
+        exif[0x010F] = 'Câmera'
+        path = self.jpeg((1600, 900), exif=exif.tobytes())
+
+        resize_image_file(path, 320)
+        with Image.open(path) as img:
+            self.assertEqual(img.size, (320, 569))
+            self.assertNotIn('exif', img.info)
+
+    @override_settings(MAX_IMAGE_PIXELS=1000)
+    def test_images_over_the_pixel_limit_are_refused(self):
+        path = self.jpeg((100, 100))
+        with self.assertRaises(ImageTooLargeError):
+            resize_image_file(path, 32)
+        # No upload, antes mesmo de salvar o arquivo
+        post = Post(cover=make_image('grande.png', (100, 100)))
+        with self.assertRaises(ValidationError):
+            validate_image_dimensions(post.cover)
+        validate_image_dimensions(Post(cover=make_image('p.png', (20, 20))).cover)
+
+    def test_stored_images_are_not_reopened_on_validation(self):
+        # Ex.: editar no admin um post cuja capa já foi salva (e aqui nem
+        # existe mais no disco)
+        post = Post(cover='post/covers/sumiu.jpg')
+        self.assertFalse(post.cover.storage.exists(post.cover.name))
+        validate_image_dimensions(post.cover)
+
+
+@override_settings(ATTACHMENT_MAX_WIDTH=1600)
+class ReprocessMediaTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=Path(media_root))
+        media.enable()
+        self.addCleanup(media.disable)
+
+        # Imagens "antigas", enviadas sem passar pelo worker
+        self.post = Post.objects.create(
+            title='Capa', excerpt='Resumo', content='Texto',
+            cover=make_image('capa.png', (1600, 900)))
+        self.setup = SiteSetup.objects.create(
+            title='Blog', description='Descrição',
+            favicon=make_image('favicon.png', (64, 64)))
+        self.attachment = PostAttachment.objects.create(
+            name='foto', file=make_image('foto.png', (2400, 1200)))
+        PostAttachment.objects.create(
+            name='texto', file=SimpleUploadedFile('texto.pdf', b'%PDF-1.4'))
+        Job.objects.all().delete()
+
+    def width(self, image):
+        with Image.open(image.path) as img:
+            return img.width
+
+    def test_reprocesses_every_media_field(self):
+        summary = reprocess_media(workers=1)
+        self.assertEqual(summary['files'], 4)
+        self.assertEqual(summary['counts'],
+                         {'processed': 3, 'skipped': 1})
+
+        self.post.refresh_from_db()
+        self.assertEqual(
+            [r['width'] for r in self.post.cover_renditions['renditions']],
+            [320, 480, 800, 1200])
+        self.assertEqual(self.width(self.setup.favicon), 32)
+        self.assertEqual(self.width(self.attachment.file), 1600)
+        self.assertEqual(ProcessedFile.objects.count(), 3)
+
+    def test_unchanged_files_are_skipped_and_runs_resume(self):
+        reprocess_media(workers=1)
+        self.assertEqual(reprocess_media(workers=1)['counts'],
+                         {'unchanged': 3, 'skipped': 1})
+
+        # Como se a execução anterior tivesse parado antes do anexo
+        ProcessedFile.objects.filter(name=self.attachment.file.name).delete()
+        self.assertEqual(reprocess_media(workers=1)['counts'],
+                         {'processed': 1, 'unchanged': 2, 'skipped': 1})
+
+        # Conteúdo novo no mesmo arquivo
+        Image.new('RGB', (1000, 500)).save(self.post.cover.path, 'PNG')
+        self.assertEqual(reprocess_media(workers=1)['counts']['processed'], 1)
+
+    def test_changed_settings_reprocess_files(self):
+        reprocess_media(workers=1)
+        with mock.patch.object(renditions, 'RENDITION_WIDTHS', (400, 900)):
+            counts = reprocess_media(workers=1)['counts']
+        self.assertEqual(counts, {'processed': 1, 'unchanged': 2, 'skipped': 1})
+        self.post.refresh_from_db()
+        self.assertEqual(
+            [r['width'] for r in self.post.cover_renditions['renditions']],
+            [400, 900])
+
+    def test_command_uses_a_process_pool(self):
+        out = StringIO()
+        call_command('reprocess_media', '--workers', '2', stdout=out)
+        self.assertIn('4 arquivos', out.getvalue())
+        self.assertIn('3 processados', out.getvalue())
+        self.assertEqual(self.width(self.attachment.file), 1600)
+        self.assertEqual(ProcessedFile.objects.count(), 3)
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=Path(media_root))
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def create_post(self, image):
+        return Post.objects.create(
+            title='Capa', excerpt='Resumo', content='Texto', cover=image)
+
+    def test_same_upload_reuses_file_and_renditions(self):
+        first = self.create_post(make_image('foto.png', (1000, 600)))
+        queue.run_pending()
+        first.refresh_from_db()
+
+        # Mesmo conteúdo com outro nome: nada é gravado nem processado
+        second = self.create_post(make_image('copia.png', (1000, 600)))
+        self.assertEqual(second.cover.name, first.cover.name)
+        self.assertTrue(second.cover.name.startswith('posts/'))
+        self.assertEqual(second.cover_renditions, first.cover_renditions)
+        self.assertEqual(queue.run_pending(), (0, 0))
+        self.assertEqual(
+            len(list(Path(first.cover.path).parent.iterdir())), 1)
+        self.assertEqual(
+            StoredFile.objects.get(name=first.cover.name).ref_count, 2)
+
+        other = self.create_post(make_image('outra.png', (1000, 601)))
+        self.assertNotEqual(other.cover.name, first.cover.name)
+
+    def test_file_is_deleted_with_its_last_reference(self):
+        first = self.create_post(make_image('foto.png', (1000, 600)))
+        second = self.create_post(make_image('foto.png', (1000, 600)))
+        queue.run_pending()
+        path = Path(first.cover.path)
+        renditions_path = Path(settings.MEDIA_ROOT) / rendition_dir(
+            first.cover.name)
+        self.assertTrue(renditions_path.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(path.exists())
+
+        # Trocar a capa também solta a anterior
+        with self.captureOnCommitCallbacks(execute=True):
+            second.cover = make_image('nova.png', (800, 600))
+            second.save()
+        self.assertFalse(path.exists())
+        self.assertFalse(renditions_path.exists())
+        self.assertFalse(StoredFile.objects.filter(name=first.cover.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(Path(second.cover.path).exists())
+
+    def test_attachments_are_deduplicated(self):
+        first = PostAttachment.objects.create(
+            file=make_image('anexo.png', (300, 200)))
+        second = PostAttachment.objects.create(
+            file=make_image('anexo.png', (300, 200)))
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(first.file.name.startswith('django-summernote/'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(Path(second.file.path).exists())
@@ -28,15 +28,18 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Busca textual e trigramas (só no PostgreSQL)
     'blog',  # Aplicativo do blog
     'site_setup',
+    'jobs',  # Fila de tarefas em segundo plano (manage.py run_jobs)
     'django_summernote',  # Aplicativo para notas de rodapé
     'axes',  # Aplicativo para controle de acesso
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise que também roda sem thread sob ASGI (utils/middleware.py)
+    'utils.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,6 +88,34 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# O backend precisa ser compartilhado entre os workers do gunicorn para que
+# as invalidações (ex.: versão do SiteSetup) cheguem a todos eles.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/django_cache'),
+    }
+}
+
+# Camada de cache das views e models (utils/cache.py)
+# Itens e segundos de vida do LRU de cada processo, na frente do CACHES;
+# os outros processos veem um invalidate em até CACHE_LAYER_LOCAL_TTL
+CACHE_LAYER_LOCAL_MAXSIZE = int(os.getenv('CACHE_LAYER_LOCAL_MAXSIZE', 1024))
+CACHE_LAYER_LOCAL_TTL = float(os.getenv('CACHE_LAYER_LOCAL_TTL', 5))
+# Segundos até a trava de um cálculo abandonado expirar
+CACHE_LAYER_LOCK_TIMEOUT = int(os.getenv('CACHE_LAYER_LOCK_TIMEOUT', 30))
+# Segundos que uma requisição espera outra calcular a mesma chave
+CACHE_LAYER_WAIT_TIMEOUT = float(os.getenv('CACHE_LAYER_WAIT_TIMEOUT', 2))
+# Recálculo antecipado perto da expiração (0 desliga)
+CACHE_LAYER_BETA = float(os.getenv('CACHE_LAYER_BETA', 1))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -197,3 +228,36 @@ AXES_ENABLED = True
 AXES_FAILURE_LIMIT = 6
 AXES_COOLOFF_TIME = 1  # Tempo de bloqueio em horas
 AXES_RESET_ON_SUCCESS = True
+
+
+# BLOG
+
+# Liga a paginação por cursor (keyset) em todas as listagens de posts.
+BLOG_KEYSET_PAGINATION = os.getenv('BLOG_KEYSET_PAGINATION', '0') == '1'
+
+# Servidor: "wsgi" (gunicorn síncrono) ou "asgi" (gunicorn com workers do
+# uvicorn, ver gunicorn.conf.py). Sob ASGI as views de leitura do blog
+# são as assíncronas (blog/async_views.py); BLOG_ASYNC_VIEWS força uma ou
+# outra.
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+BLOG_ASYNC_VIEWS = os.getenv(
+    'BLOG_ASYNC_VIEWS', '1' if SERVER_MODE == 'asgi' else '0') == '1'
+
+# Cache de página inteira para visitantes anônimos (blog/page_cache.py)
+BLOG_PAGE_CACHE = os.getenv('BLOG_PAGE_CACHE', '1') == '1'
+BLOG_PAGE_CACHE_TIMEOUT = int(os.getenv('BLOG_PAGE_CACHE_TIMEOUT', 60 * 60))
+
+# Fila de tarefas em segundo plano (jobs/queue.py)
+# Segundos até uma tarefa em execução ser considerada abandonada
+JOBS_LOCK_TIMEOUT = int(os.getenv('JOBS_LOCK_TIMEOUT', 10 * 60))
+# Espera base entre tentativas (dobra a cada falha)
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', 30))
+# Espera do worker quando a fila está vazia
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', 2))
+
+# Maior imagem (largura x altura) aceita no upload e no processamento
+# (utils/images.py). Acima disso a decodificação usaria RAM demais.
+MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', 40_000_000))
+
+# Largura máxima das imagens inseridas no editor (PostAttachment)
+ATTACHMENT_MAX_WIDTH = int(os.getenv('ATTACHMENT_MAX_WIDTH', 1600))
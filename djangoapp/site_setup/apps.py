@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SiteSetupConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'site_setup'
+
+    def ready(self):
+        # Registra os receivers que invalidam o cache do SiteSetup
+        from . import signals  # noqa: F401
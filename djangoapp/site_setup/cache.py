@@ -0,0 +1,93 @@
+"""
+Cache do SiteSetup compartilhado entre middleware e context processor.
+
+O SiteSetup é uma linha única que quase nunca muda, então mantemos o objeto
+(com os ``menu_links`` já carregados) na memória do processo. Para que todos
+os workers do gunicorn enxerguem uma alteração, guardamos no cache do Django
+apenas um "carimbo" de versão: cada requisição compara esse carimbo com a
+versão local e só volta ao banco quando ele muda.
+
+``aget_site_setup`` é a versão para código assíncrono (middleware sob
+ASGI): a cópia em memória é devolvida sem sair do event loop.
+"""
+
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .models import SiteSetup
+
+VERSION_KEY = 'site_setup:version'
+
+_lock = threading.Lock()
+_local = {
+    'version': None,
+    'setup': None,
+}
+
+
+def _new_version():
+    return str(time.time_ns())
+
+
+def get_version():
+    """
+    Retorna o carimbo de versão atual do SiteSetup.
+
+    Se o carimbo ainda não existir no cache (primeira requisição ou cache
+    limpo), cria um novo. O ``add`` garante que, em caso de corrida entre
+    workers, todos acabem usando o mesmo valor.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _new_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_site_setup():
+    """
+    Retorna o SiteSetup (ou None) usando a cópia em memória sempre que
+    a versão compartilhada não mudou.
+    """
+    version = get_version()
+    if _local['version'] == version:
+        return _local['setup']
+
+    with _lock:
+        # Outra thread pode ter recarregado enquanto esperávamos o lock
+        if _local['version'] == version:
+            return _local['setup']
+
+        setup = SiteSetup.objects.prefetch_related('menu_links').first()
+        _local['setup'] = setup
+        _local['version'] = version
+
+    return setup
+
+
+async def aget_site_setup():
+    """
+    Versão assíncrona do ``get_site_setup``.
+
+    Só o carimbo é lido a cada requisição (``cache.aget``); quando ele
+    mudou, o recarregamento (consulta com prefetch e lock de thread) roda
+    fora do event loop.
+    """
+    version = await cache.aget(VERSION_KEY)
+    if version is not None and _local['version'] == version:
+        return _local['setup']
+    return await sync_to_async(get_site_setup)()
+
+
+def invalidate():
+    """
+    Gera um novo carimbo de versão, forçando todos os workers a recarregar
+    o SiteSetup na próxima requisição.
+    """
+    cache.set(VERSION_KEY, _new_version(), timeout=None)
+    with _lock:
+        _local['setup'] = None
+        _local['version'] = None
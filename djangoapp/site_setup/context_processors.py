@@ -1,4 +1,4 @@
-from site_setup.models import SiteSetup
+from site_setup.cache import get_site_setup
 
 
 def site_setup(request):
@@ -6,8 +6,11 @@ def site_setup(request):
     Este context processor busca o objeto de configuração do site
     e o adiciona ao contexto de todos os templates.
     """
-    # Busca o primeiro (e único) objeto SiteSetup do banco de dados
-    setup = SiteSetup.objects.first()
+    # Reaproveita o objeto já anexado pelo SiteSetupMiddleware; se o
+    # middleware não rodou, busca no mesmo cache compartilhado.
+    setup = getattr(request, 'site_setup', None)
+    if setup is None:
+        setup = get_site_setup()
 
     return {
         'site_setup': setup,
@@ -1,24 +1,37 @@
-from .models import SiteSetup
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .cache import aget_site_setup, get_site_setup
 
 
 class SiteSetupMiddleware:
+    # Roda nos dois modos: síncrono sob WSGI e assíncrono sob ASGI, sem o
+    # Django precisar adaptar a cadeia (uma thread por requisição).
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        # Código a ser executado para cada requisição ANTES da view
+        if self.async_mode:
+            return self.__acall__(request)
 
-        # Busca a primeira (e única) instância de SiteSetup
-        # Usamos o .first() para não dar erro se a tabela estiver vazia
-        print('--- MIDDLEWARE EXECUTADO! ---')
-        setup = SiteSetup.objects.first()
-        print(f'--- Middleware encontrou: {setup} ---')
+        # Código a ser executado para cada requisição ANTES da view
 
-        # Anexa o objeto de setup ao objeto request
-        request.site_setup = setup
+        # Busca o SiteSetup no cache compartilhado (ver site_setup/cache.py).
+        # Só vai ao banco quando o SiteSetup ou os MenuLinks mudaram.
+        request.site_setup = get_site_setup()
 
         response = self.get_response(request)
 
         # Código a ser executado DEPOIS da view (não precisamos aqui)
 
         return response
+
+    async def __acall__(self, request):
+        # O mesmo, sem ORM síncrono dentro do event loop
+        request.site_setup = await aget_site_setup()
+        return await self.get_response(request)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:47
+
+import utils.model_validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_setup', '0005_alter_sitesetup_favicon'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sitesetup',
+            name='favicon',
+            field=models.ImageField(blank=True, null=True, upload_to='assets/favicon/%Y/%m/', validators=[utils.model_validators.validate_png, utils.model_validators.validate_image_dimensions], verbose_name='Favicon'),
+        ),
+    ]
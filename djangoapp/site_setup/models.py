@@ -1,7 +1,11 @@
 from django.db import models
 from django.conf import settings
-from utils.model_validators import validate_png
-from utils.images import resize_image
+from utils.model_validators import validate_image_dimensions, validate_png
+from jobs.tasks import enqueue_resize
+from utils.model_tracking import FieldTrackerMixin
+
+# Largura final do favicon (também usada pelo manage.py reprocess_media)
+FAVICON_WIDTH = 32
 
 
 class MenuLink(models.Model):
@@ -20,7 +24,7 @@ class MenuLink(models.Model):
         return self.text
 
 
-class SiteSetup(models.Model):
+class SiteSetup(FieldTrackerMixin, models.Model):
     class Meta:
         verbose_name = 'Setup'
         verbose_name_plural = 'Setup'
@@ -38,39 +42,34 @@ class SiteSetup(models.Model):
     favicon = models.ImageField(
         upload_to='assets/favicon/%Y/%m/', verbose_name='Favicon',
         # Assuming validade_png is defined in utils/model_validators
-        null=True, blank=True, validators=[validate_png],
+        null=True, blank=True,
+        validators=[validate_png, validate_image_dimensions],
 
     )
 
+    tracked_fields = ('favicon',)
+
     def save(self, *args, **kwargs):
 
-        # 1. Guarda o estado original do objeto ANTES de salvar
-        # Se self.pk não existe, é um objeto novo.
-        if self.pk:
-            # Busca a versão antiga do objeto diretamente do banco de dados
-            old_instance = SiteSetup.objects.get(pk=self.pk)
-            # Pega o nome do favicon antigo
-            old_favicon_name = str(old_instance.favicon.name)
-        else:
-            # Se é um objeto novo, não há favicon antigo
-            old_favicon_name = None
+        # 1. Verifica se o favicon mudou ANTES de salvar
+        # O FieldTrackerMixin guardou o nome do favicon que veio do banco,
+        # então não é preciso buscar a versão antiga do objeto. Um save
+        # parcial (update_fields) sem o favicon não mexe na imagem.
+        update_fields = kwargs.get('update_fields')
+        favicon_has_changed = (
+            (update_fields is None or 'favicon' in update_fields)
+            and bool(self.favicon) and self.has_changed('favicon')
+        )
 
         # 2. Salva o objeto no banco de dados
         # Isso é importante para que o arquivo de imagem seja enviado para o disco
         # e o self.favicon.name seja atualizado com o caminho final.
         super().save(*args, **kwargs)
 
-        # 3. Verifica se a imagem precisa ser redimensionada
-        # Garante que o campo favicon não está vazio
-        if self.favicon:
-            # Compara o nome do favicon atual com o antigo
-            favicon_has_changed = old_favicon_name != str(self.favicon.name)
-
-            # Se o favicon mudou (ou se é um objeto novo com um favicon), redimensiona.
-            if favicon_has_changed:
-                print(
-                    f"--- Redimensionando favicon: {self.favicon.name} para 32px ---")
-                resize_image(self.favicon, new_width=32)
+        # 3. Se o favicon mudou (ou se é um objeto novo com um favicon),
+        # enfileira o redimensionamento para o worker (manage.py run_jobs).
+        if favicon_has_changed:
+            enqueue_resize(self, 'favicon', width=FAVICON_WIDTH)
 
     def __str__(self):
         return self.title
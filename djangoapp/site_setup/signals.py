@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache
+from .models import MenuLink, SiteSetup
+
+
+@receiver(post_save, sender=SiteSetup)
+@receiver(post_delete, sender=SiteSetup)
+@receiver(post_save, sender=MenuLink)
+@receiver(post_delete, sender=MenuLink)
+def invalidate_site_setup_cache(sender, **kwargs):
+    # Só invalida depois do commit; antes disso outro worker poderia
+    # recarregar os dados antigos já com a versão nova.
+    transaction.on_commit(cache.invalidate)
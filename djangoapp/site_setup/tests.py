@@ -1,3 +1,69 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from site_setup import cache as site_setup_cache
+from site_setup.context_processors import site_setup
+from site_setup.models import MenuLink, SiteSetup
+
+
+class SiteSetupCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site_setup_cache.invalidate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.setup = SiteSetup.objects.create(
+                title='Blog', description='Descrição')
+            MenuLink.objects.create(
+                text='Home', url_or_path='/', site_setup=self.setup)
+
+    def test_second_lookup_does_not_hit_the_database(self):
+        site_setup_cache.get_site_setup()
+        with self.assertNumQueries(0):
+            setup = site_setup_cache.get_site_setup()
+            links = list(setup.menu_links.all())
+        self.assertEqual(setup.title, 'Blog')
+        self.assertEqual([link.text for link in links], ['Home'])
+
+    def test_middleware_and_context_processor_share_the_object(self):
+        request = RequestFactory().get('/')
+        request.site_setup = site_setup_cache.get_site_setup()
+        with self.assertNumQueries(0):
+            context = site_setup(request)
+        self.assertIs(context['site_setup'], request.site_setup)
+
+    def test_saving_site_setup_invalidates(self):
+        site_setup_cache.get_site_setup()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.setup.title = 'Novo título'
+            self.setup.save()
+        self.assertEqual(site_setup_cache.get_site_setup().title, 'Novo título')
+
+    def test_menu_link_changes_invalidate(self):
+        site_setup_cache.get_site_setup()
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuLink.objects.create(
+                text='Sobre', url_or_path='/page/sobre/', site_setup=self.setup)
+        setup = site_setup_cache.get_site_setup()
+        self.assertEqual(setup.menu_links.count(), 2)
+
+    def test_version_stamp_from_another_worker_forces_reload(self):
+        site_setup_cache.get_site_setup()
+        # Simula outro worker alterando o carimbo no cache compartilhado
+        SiteSetup.objects.filter(pk=self.setup.pk).update(title='Outro')
+        cache.set(site_setup_cache.VERSION_KEY, 'outro-worker', timeout=None)
+        self.assertEqual(site_setup_cache.get_site_setup().title, 'Outro')
+
+
+class SiteSetupSaveTests(TestCase):
+    def test_save_without_favicon_change_does_not_reload(self):
+        SiteSetup.objects.create(title='Blog', description='Descrição')
+        setup = SiteSetup.objects.get()
+        setup.title = 'Outro'
+        with mock.patch('site_setup.models.enqueue_resize') as resize:
+            with self.assertNumQueries(1):
+                setup.save(update_fields=['title'])
+            setup.save()
+        resize.assert_not_called()
+        self.assertFalse(setup.has_changed('favicon'))
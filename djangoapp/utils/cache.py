@@ -0,0 +1,367 @@
+"""
+Camada de cache para views e models, sobre o cache do Django (``CACHES``).
+
+- ``get_or_compute``: devolve o valor guardado ou calcula e guarda. Sem
+  "estouro" (stampede) quando uma chave quente expira: só um worker
+  recalcula por vez (trava com ``cache.add``; no ``FileBasedCache``, cujo
+  ``add`` não é atômico, um arquivo criado com ``O_EXCL``), e os demais
+  esperam o valor novo em vez de irem todos ao banco. Perto de expirar, o
+  valor é recalculado antes, com probabilidade que cresce com o custo do
+  cálculo e a proximidade da expiração ("XFetch"), enquanto os demais
+  continuam recebendo o valor atual.
+- Namespaces versionados: a chave leva a versão do namespace, e
+  ``invalidate(namespace)`` troca a versão. Todas as chaves dele deixam
+  de ser lidas de uma vez, em todos os workers, sem apagar nada (as
+  antigas expiram sozinhas).
+- Duas camadas: um LRU do processo (utils/lru.py) na frente do cache
+  compartilhado. A versão de cada namespace também fica no LRU, então uma
+  chave quente não vai ao compartilhado nenhuma vez; em troca, os outros
+  workers veem o ``invalidate`` em até ``local_ttl`` segundos (o worker
+  que invalidou, na hora).
+
+Os limites (tamanho e vida do LRU, trava, espera, ``beta`` do XFetch) vêm
+do settings (``CACHE_LAYER_*``) e podem ser trocados por instância.
+"""
+
+import hashlib
+import math
+import os
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import transaction
+
+from .lru import LRUCache
+
+KEY_PREFIX = 'cache_layer'
+
+# Intervalo entre as consultas de quem espera outro worker calcular
+WAIT_INTERVAL = 0.05
+
+
+class TieredCache:
+    """
+    Cache em duas camadas com namespaces versionados e proteção contra
+    estouro.
+
+    Args:
+        alias: Cache do ``CACHES`` usado como camada compartilhada
+        local_maxsize: Itens no LRU do processo (0 desliga a camada local)
+        local_ttl: Segundos que um valor fica no LRU
+        lock_timeout: Segundos até a trava de um cálculo ser abandonada
+            (ex.: o worker morreu no meio)
+        wait_timeout: Segundos que se espera o cálculo de outro worker
+            antes de calcular também
+        beta: Peso do recálculo antecipado (0 desliga; acima de 1
+            antecipa mais)
+
+    Os argumentos omitidos vêm do settings.
+    """
+
+    def __init__(self, alias='default', local_maxsize=None, local_ttl=None,
+                 lock_timeout=None, wait_timeout=None, beta=None):
+        self.alias = alias
+        self._options = {
+            'local_ttl': local_ttl,
+            'lock_timeout': lock_timeout,
+            'wait_timeout': wait_timeout,
+            'beta': beta,
+        }
+        if local_maxsize is None:
+            local_maxsize = settings.CACHE_LAYER_LOCAL_MAXSIZE
+        self.local = LRUCache(maxsize=local_maxsize)
+
+    def _option(self, name):
+        value = self._options[name]
+        if value is None:
+            value = getattr(settings, f'CACHE_LAYER_{name.upper()}')
+        return value
+
+    @property
+    def shared(self):
+        # O caches[] devolve uma conexão por thread
+        return caches[self.alias]
+
+    # ---------------------------------------------------------------
+    # Chaves e namespaces
+    # ---------------------------------------------------------------
+
+    def _namespace_key(self, namespace):
+        return f'{KEY_PREFIX}:ns:{namespace}'
+
+    def namespace_version(self, namespace):
+        """
+        Versão atual do namespace (criada na primeira vez).
+        """
+        key = self._namespace_key(namespace)
+        version = self.local.get(key)
+        if version is not None:
+            return version
+        version = self.shared.get(key)
+        if version is None:
+            # O add garante que workers concorrentes fiquem com a mesma
+            self.shared.add(key, time.time_ns(), timeout=None)
+            version = self.shared.get(key)
+        self.local.set(key, version, ttl=self._option('local_ttl'))
+        return version
+
+    def make_key(self, key, namespace=None):
+        """
+        Chave completa: namespace e sua versão mais o hash da chave (que
+        pode ter espaços ou ser longa demais para o backend).
+        """
+        digest = hashlib.md5(str(key).encode()).hexdigest()
+        if namespace is None:
+            return f'{KEY_PREFIX}:{digest}'
+        version = self.namespace_version(namespace)
+        return f'{KEY_PREFIX}:{namespace}:{version}:{digest}'
+
+    def invalidate(self, *namespaces):
+        """
+        Troca a versão dos namespaces depois do commit (como o
+        ``invalidate`` de blog/page_cache.py): ninguém regrava o valor
+        antigo com a versão nova.
+        """
+        namespaces = {namespace for namespace in namespaces if namespace}
+        if namespaces:
+            transaction.on_commit(lambda: self._bump(namespaces))
+
+    def _bump(self, namespaces):
+        now = time.time_ns()
+        keys = [self._namespace_key(namespace) for namespace in namespaces]
+        self.shared.set_many({key: now for key in keys}, timeout=None)
+        # Este worker vê a versão nova na hora; os outros, quando a cópia
+        # do LRU deles expirar
+        for key in keys:
+            self.local.set(key, now, ttl=self._option('local_ttl'))
+
+    # ---------------------------------------------------------------
+    # Leitura e cálculo
+    # ---------------------------------------------------------------
+
+    def get_or_compute(self, key, compute, timeout=300, namespace=None):
+        """
+        Valor da chave, calculado por ``compute()`` se não houver.
+
+        Args:
+            key: Chave (qualquer valor com ``str``)
+            compute: Função sem argumentos que calcula o valor
+            timeout: Segundos de vida do valor
+            namespace: Namespace para invalidar junto (opcional)
+
+        Returns:
+            O valor guardado ou recém-calculado (pode ser None)
+        """
+        full_key = self.make_key(key, namespace)
+        entry = self._read(full_key)
+        if entry is not None and not self._recompute_early(entry):
+            return entry[0]
+
+        token = self.acquire(full_key)
+        if token:
+            try:
+                if entry is None:
+                    # Outro worker pode ter guardado o valor entre a
+                    # leitura e a trava
+                    entry = self.shared.get(full_key)
+                    if entry is not None:
+                        self._store_local(full_key, entry)
+                        return entry[0]
+                return self._compute(full_key, compute, timeout)
+            finally:
+                self.release(full_key, token)
+
+        if entry is not None:
+            # Outro worker já está recalculando; o valor ainda vale
+            return entry[0]
+
+        entry = self.wait_for(lambda: self._read(full_key))
+        if entry is not None:
+            return entry[0]
+        # O outro worker demorou demais: calcula também
+        return self._compute(full_key, compute, timeout)
+
+    def _read(self, full_key):
+        entry = self.local.get(full_key)
+        if entry is None:
+            entry = self.shared.get(full_key)
+            if entry is not None:
+                self._store_local(full_key, entry)
+        return entry
+
+    def _store_local(self, full_key, entry):
+        # O LRU não pode guardar além da expiração do valor
+        remaining = entry[2] - time.time()
+        ttl = min(self._option('local_ttl'), remaining)
+        if ttl > 0:
+            self.local.set(full_key, entry, ttl=ttl)
+
+    def _recompute_early(self, entry):
+        """
+        XFetch: recalcula antes de expirar com probabilidade maior quanto
+        mais caro o cálculo (``delta``) e mais perto da expiração.
+        """
+        _, delta, expires_at = entry
+        beta = self._option('beta')
+        if not beta:
+            return False
+        # 1 - random() fica em (0, 1]: o log nunca é de zero
+        jitter = -delta * beta * math.log(1 - random.random())
+        return time.time() + jitter >= expires_at
+
+    def _compute(self, full_key, compute, timeout):
+        start = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - start
+        # (valor, tempo do cálculo, expiração em segundos de relógio)
+        entry = (value, delta, time.time() + timeout)
+        self.shared.set(full_key, entry, timeout=timeout)
+        self._store_local(full_key, entry)
+        return value
+
+    # ---------------------------------------------------------------
+    # Travas (também para quem não usa o get_or_compute, ex.: o cache de
+    # página, que guarda a resposta só depois de renderizada)
+    # ---------------------------------------------------------------
+
+    def acquire(self, key):
+        """
+        Tenta ser o único a calcular ``key``.
+
+        Returns:
+            str | None: O token da trava (para o ``release``), ou None se
+            outro worker já a tem
+        """
+        token = uuid.uuid4().hex
+        timeout = self._option('lock_timeout')
+        if isinstance(self.shared, FileBasedCache):
+            acquired = self._acquire_file(self._lock_path(key), token, timeout)
+        else:
+            acquired = self.shared.add(
+                f'{KEY_PREFIX}:lock:{key}', token, timeout=timeout)
+        return token if acquired else None
+
+    def release(self, key, token):
+        """
+        Libera a trava, se ela ainda é a do ``token`` (uma que expirou
+        pode já ser de outro worker). Sem token, não faz nada.
+        """
+        if not token:
+            return
+        if isinstance(self.shared, FileBasedCache):
+            path = self._lock_path(key)
+
+            def is_mine(lock_path):
+                return self._read_file(lock_path) == token
+
+            # Confere antes de mexer no arquivo e de novo depois de tirá-lo
+            # do lugar (pode ter expirado e mudado de dono entre os dois)
+            if self._check_file(path, is_mine):
+                self._take_file(path, is_mine)
+            return
+        lock_key = f'{KEY_PREFIX}:lock:{key}'
+        # Entre o get e o delete a trava só muda de dono se já expirou
+        if self.shared.get(lock_key) == token:
+            self.shared.delete(lock_key)
+
+    # O add do FileBasedCache confere se o arquivo existe e depois o grava:
+    # dois workers podem ficar com a mesma trava. Aqui a trava é um arquivo
+    # criado com O_EXCL, e a idade dele (mtime) faz o papel do timeout.
+
+    def _lock_path(self, key):
+        digest = hashlib.md5(key.encode()).hexdigest()
+        return os.path.join(self.shared._dir, 'locks', f'{digest}.lock')
+
+    def _acquire_file(self, path, token, timeout):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+            except FileExistsError:
+                # Trava abandonada (ex.: o worker morreu): remove e tenta
+                # de novo uma vez. Uma trava válida nem é tocada.
+                def expired(lock_path):
+                    return self._expired(lock_path, timeout)
+
+                if not (self._check_file(path, expired) and
+                        self._take_file(path, expired)):
+                    return False
+                continue
+            with os.fdopen(fd, 'w') as lock_file:
+                lock_file.write(token)
+            return True
+        return False
+
+    @staticmethod
+    def _expired(path, timeout):
+        return time.time() - os.stat(path).st_mtime >= timeout
+
+    @staticmethod
+    def _read_file(path):
+        with open(path) as lock_file:
+            return lock_file.read()
+
+    @staticmethod
+    def _check_file(path, condition):
+        try:
+            return condition(path)
+        except FileNotFoundError:
+            # Já liberada: para quem quer pegar a trava, o caminho está livre
+            return True
+
+    @staticmethod
+    def _take_file(path, should_remove):
+        """
+        Remove o arquivo de trava se ``should_remove(caminho)``.
+
+        O arquivo é primeiro renomeado (atômico: de dois workers, só um o
+        leva) e conferido já fora do caminho da trava; se não era para
+        removê-lo, volta para o lugar (``link`` falha se outro worker já
+        criou uma trava nova ali).
+
+        Returns:
+            bool: True se o caminho ficou livre
+        """
+        taken = f'{path}.{uuid.uuid4().hex}'
+        try:
+            os.rename(path, taken)
+        except FileNotFoundError:
+            return True
+        try:
+            if should_remove(taken):
+                return True
+            try:
+                os.link(taken, path)
+            except FileExistsError:
+                pass
+            return False
+        finally:
+            os.unlink(taken)
+
+    def wait_for(self, fetch):
+        """
+        Espera outro worker terminar o cálculo.
+
+        Args:
+            fetch: Função sem argumentos que devolve o valor pronto ou None
+
+        Returns:
+            O valor, ou None se o ``wait_timeout`` acabou antes
+        """
+        deadline = time.monotonic() + self._option('wait_timeout')
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            value = fetch()
+            if value is not None:
+                return value
+        return None
+
+    def clear_local(self):
+        """
+        Esvazia o LRU deste processo (o compartilhado não muda).
+        """
+        self.local.clear()
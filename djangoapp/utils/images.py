@@ -1,54 +1,217 @@
 from pathlib import Path
 import os
 from django.conf import settings
-from PIL import Image  # type: ignore
+from PIL import Image, ImageOps  # type: ignore
+
+# Limite de pixels aceito no upload e no processamento. Um JPEG de poucos
+# MB pode ter dimensões que viram centenas de MB de RAM ao decodificar.
+DEFAULT_MAX_IMAGE_PIXELS = 40_000_000
+
+# Fator de folga mantido pelos atalhos de decodificação (draft/reduce):
+# o LANCZOS final sempre parte de pelo menos 2x o tamanho de destino,
+# para não perder qualidade.
+REDUCE_HEADROOM = 2
+
+# O que sobrevive do img.info: perfil de cor e transparência (paleta).
+# EXIF, XMP, comentários etc. são descartados.
+_KEPT_INFO = ('icc_profile', 'transparency')
+
+ORIENTATION_TAG = 0x0112
+
+# Extensões tratadas como imagem (anexos do editor podem ser PDFs etc.)
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+
+class ImageTooLargeError(ValueError):
+    """
+    A imagem tem mais pixels do que ``MAX_IMAGE_PIXELS`` permite.
+    """
+
+
+def is_image_name(name):
+    return Path(name).suffix.lower() in IMAGE_SUFFIXES
+
+
+def max_image_pixels():
+    return getattr(settings, 'MAX_IMAGE_PIXELS', DEFAULT_MAX_IMAGE_PIXELS)
+
+
+def check_dimensions(img, max_pixels=None):
+    """
+    Recusa imagens gigantes olhando só o cabeçalho (antes de decodificar).
+
+    Raises:
+        ImageTooLargeError: se largura x altura passar do limite
+    """
+    max_pixels = max_pixels or max_image_pixels()
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ImageTooLargeError(
+            f'Imagem muito grande: {width}x{height} '
+            f'(máximo de {max_pixels:,} pixels).'.replace(',', '.')
+        )
+
+
+def is_transposed(img):
+    """
+    Se a rotação do EXIF (orientações 5 a 8) troca largura e altura.
+    """
+    return img.getexif().get(ORIENTATION_TAG) in (5, 6, 7, 8)
+
+
+def oriented_size(img):
+    """
+    Tamanho da imagem como ela é exibida (considerando a rotação do EXIF),
+    lido só do cabeçalho.
+    """
+    width, height = img.size
+    if is_transposed(img):
+        return height, width
+    return width, height
+
+
+def open_reduced(path, min_width, max_pixels=None):
+    """
+    Abre uma imagem já reduzida durante a decodificação, sem passar pela
+    versão em tamanho real na memória quando possível.
+
+    - JPEG: ``draft`` decodifica direto em 1/2, 1/4 ou 1/8 do tamanho.
+    - Demais formatos: ``reduce`` (média de blocos inteiros), bem mais
+      barato que o LANCZOS sobre a imagem inteira.
+
+    A imagem retornada tem pelo menos ``min_width * REDUCE_HEADROOM`` de
+    largura (ou a original, se for menor), com a orientação do EXIF
+    aplicada e sem metadados (EXIF, XMP, comentários). O perfil de cor
+    (ICC) é mantido.
+
+    Args:
+        path: Caminho do arquivo
+        min_width: Menor largura que ainda será usada da imagem
+        max_pixels: Limite de pixels (padrão: settings.MAX_IMAGE_PIXELS)
+
+    Returns:
+        tuple: (imagem carregada, formato do arquivo original)
+
+    Raises:
+        ImageTooLargeError: se a imagem passar do limite de pixels
+    """
+    source = Image.open(path)
+    try:
+        check_dimensions(source, max_pixels)
+        image_format = source.format
+        # A largura pedida é a exibida: numa foto girada pelo EXIF ela é a
+        # altura do arquivo, e é esse eixo que o draft e o reduce medem.
+        transposed = is_transposed(source)
+        width, height = source.size
+        shown_width = height if transposed else width
+        wanted = min_width * REDUCE_HEADROOM
+
+        if image_format == 'JPEG' and shown_width > wanted:
+            # O draft escolhe a maior redução que ainda fica >= ao pedido
+            scale = wanted / shown_width
+            source.draft(
+                source.mode, (round(width * scale), round(height * scale)))
+
+        source.load()
+        img = source
+        kept_info = {
+            key: source.info[key] for key in _KEPT_INFO if key in source.info
+        }
+        if img.mode in ('1', 'P'):
+            # Paleta não suporta reduce nem LANCZOS: vira RGB(A), e a
+            # transparência da paleta vira canal alfa.
+            img = img.convert(
+                'RGBA' if 'transparency' in kept_info else 'RGB')
+            kept_info.pop('transparency', None)
+
+        factor = (img.height if transposed else img.width) // wanted
+        if factor >= 2:
+            img = img.reduce(factor)
+
+        # Foto "deitada" de celular: aplica a rotação e descarta o EXIF
+        img = ImageOps.exif_transpose(img)
+        img.info = kept_info
+        return img, image_format
+    finally:
+        source.close()
 
 
 def resize_image(image_django, new_width=800, optimize=True, quality=60):
     """
     Redimensiona uma imagem mantendo a proporção e otimizando a qualidade.
-    Salva a imagem sobre a original de forma segura.
+    Salva a imagem sobre a original de forma segura: a original só é
+    substituída (de forma atômica) quando a nova está pronta.
     """
     # Pega o caminho completo da imagem
     image_path = Path(settings.MEDIA_ROOT / image_django.name).resolve()
 
-    # Abre a imagem usando um gerenciador de contexto para garantir que seja fechada
     try:
-        with Image.open(image_path) as img:
-            original_width, original_height = img.size
-
-            # Se a imagem já for pequena, não faz nada
-            if original_width <= new_width:
-                # Retorna o objeto de imagem original (já fechado pelo 'with')
-                return img
-
-            # Calcula a nova altura mantendo a proporção
-            new_height = round(new_width * original_height / original_width)
-
-            # Redimensiona a imagem com o filtro LANCZOS de alta qualidade
-            new_image = img.resize(
-                (new_width, new_height), Image.LANCZOS)  # type: ignore
-
-            # Prepara os argumentos para salvar, dependendo do formato
-            save_kwargs = {
-                'optimize': optimize,
-            }
-            # O parâmetro 'quality' é mais relevante para JPEGs
-            if img.format and img.format.lower() in ['jpeg', 'jpg']:
-                save_kwargs['quality'] = quality  # type: ignore
-                # Melhora o carregamento em navegadores
-                save_kwargs['progressive'] = True
-
-            # Salva a imagem no mesmo caminho, sobrescrevendo a original
-            new_image.save(
-                image_path,
-                **save_kwargs  # type: ignore
-            )
-
-            return new_image
-
+        return resize_image_file(
+            image_path, new_width, optimize=optimize, quality=quality)
     except FileNotFoundError:
         # Lida com o caso de o arquivo de imagem não existir no disco
         # Você pode logar o erro ou simplesmente retornar None
         print(f"Erro: Arquivo não encontrado em {image_path}")
         return None
+
+
+def resize_image_file(image_path, new_width=800, optimize=True, quality=60,
+                      max_pixels=None):
+    """
+    Versão de ``resize_image`` que recebe o caminho do arquivo.
+
+    A imagem é reduzida já na decodificação (``open_reduced``) e só então
+    passa pelo LANCZOS, o que mantém o pico de memória proporcional ao
+    tamanho final, e não ao do upload. Os metadados são descartados na
+    mesma passada.
+
+    Returns:
+        Image | None: A imagem gravada, ou None se ela já era pequena (ou
+        animada)
+
+    Raises:
+        ImageTooLargeError: se a imagem passar do limite de pixels
+    """
+    image_path = Path(image_path)
+
+    # Lê só o cabeçalho: se a imagem já for pequena, não faz nada
+    with Image.open(image_path) as header:
+        check_dimensions(header, max_pixels)
+        original_width, original_height = oriented_size(header)
+        # Reduzir um GIF/WebP animado perderia os quadros
+        animated = getattr(header, 'is_animated', False)
+    if original_width <= new_width or animated:
+        return None
+
+    img, image_format = open_reduced(image_path, new_width, max_pixels)
+
+    # Calcula a nova altura mantendo a proporção (já com a rotação do EXIF)
+    new_height = round(new_width * img.height / img.width)
+
+    # Redimensiona a imagem com o filtro LANCZOS de alta qualidade
+    new_image = img.resize(
+        (new_width, new_height), Image.LANCZOS)  # type: ignore
+
+    # Prepara os argumentos para salvar, dependendo do formato
+    save_kwargs = {
+        'optimize': optimize,
+    }
+    # Só o que open_reduced manteve (perfil de cor, transparência)
+    save_kwargs.update(img.info)
+    # O parâmetro 'quality' é mais relevante para JPEGs
+    if image_format and image_format.lower() in ['jpeg', 'jpg']:
+        save_kwargs['quality'] = quality  # type: ignore
+        # Melhora o carregamento em navegadores
+        save_kwargs['progressive'] = True
+
+    # Grava em um arquivo temporário e só então troca pela original,
+    # para que o site nunca sirva uma imagem pela metade.
+    tmp_path = image_path.with_name(f'.tmp-{image_path.name}')
+    new_image.save(
+        tmp_path,
+        format=image_format,
+        **save_kwargs  # type: ignore
+    )
+    os.replace(tmp_path, image_path)
+
+    return new_image
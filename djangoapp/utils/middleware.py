@@ -0,0 +1,40 @@
+"""
+WhiteNoise que também roda como middleware assíncrono.
+
+O ``WhiteNoiseMiddleware`` é só síncrono: sob ASGI o Django o adapta e
+cada requisição (mesmo as que não são de arquivo estático) prende uma
+thread enquanto o resto da cadeia roda, o que anula a vantagem das views
+assíncronas. Aqui a busca do arquivo é a mesma (um dicionário em
+memória) e só a abertura do arquivo sai do event loop.
+"""
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # Só com DEBUG: procura nos diretórios a cada requisição
+            static_file = await sync_to_async(self.find_file)(
+                request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,85 @@
+class FieldTrackerMixin:
+    """
+    Mixin de model que guarda os valores de alguns campos como vieram do
+    banco, para saber o que mudou sem recarregar o objeto antes do save.
+
+    O retrato é tirado no ``from_db`` (objetos carregados por queryset) e
+    refeito depois de cada ``save`` (só dos campos salvos, quando há
+    ``update_fields``). Campos adiados com ``defer``/``only`` ficam fora
+    do retrato.
+
+    Uso::
+
+        class Post(FieldTrackerMixin, models.Model):
+            tracked_fields = ('cover', 'is_published')
+
+        post.has_changed('cover')
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._tracked_values = {}
+        instance.snapshot_tracked_fields()
+        return instance
+
+    def _current_value(self, name):
+        field = self._meta.get_field(name)
+        return field.get_prep_value(field.value_from_object(self))
+
+    def snapshot_tracked_fields(self, fields=None):
+        """
+        Guarda os valores atuais dos campos rastreados.
+
+        Args:
+            fields: Limita o retrato a esses campos (ex.: ``update_fields``)
+        """
+        if not hasattr(self, '_tracked_values'):
+            self._tracked_values = {}
+        deferred = self.get_deferred_fields()
+        for name in self.tracked_fields:
+            if fields is not None and name not in fields:
+                continue
+            if self._meta.get_field(name).attname in deferred:
+                self._tracked_values.pop(name, None)
+            else:
+                self._tracked_values[name] = self._current_value(name)
+
+    @property
+    def is_tracked(self):
+        """
+        False para objetos que não vieram do banco nem foram salvos
+        (ex.: ``Post(pk=1, ...)`` montado à mão).
+        """
+        return hasattr(self, '_tracked_values')
+
+    def has_changed(self, name):
+        """
+        Diz se o campo mudou desde que o objeto foi carregado ou salvo.
+
+        Sem retrato do campo (objeto não rastreado, ou campo adiado que foi
+        preenchido depois) o valor é considerado alterado.
+        """
+        field = self._meta.get_field(name)
+        if name not in getattr(self, '_tracked_values', {}):
+            # Campo adiado que continua sem valor não foi alterado
+            return not (
+                self.is_tracked and field.attname in self.get_deferred_fields()
+            )
+        return self._tracked_values[name] != self._current_value(name)
+
+    def previous_value(self, name, default=None):
+        """
+        Valor do campo (como gravado no banco) no último carregamento/save.
+        """
+        return getattr(self, '_tracked_values', {}).get(name, default)
+
+    def changed_fields(self):
+        return [name for name in self.tracked_fields if self.has_changed(name)]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        self.snapshot_tracked_fields(
+            None if update_fields is None else set(update_fields))
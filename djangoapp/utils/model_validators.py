@@ -1,6 +1,23 @@
 from django.core.exceptions import ValidationError
+from utils.images import max_image_pixels
 
 
 def validate_png(image):
     if not image.name.lower().endswith('.png'):
         raise ValidationError('Apenas imagens PNG são permitidas!')
+
+
+def validate_image_dimensions(image):
+    # Só arquivos recém-enviados: os já salvos passaram por aqui no upload,
+    # e lê-los a cada edição no admin é disco à toa (ou um 500, se o
+    # arquivo sumiu do disco).
+    if getattr(image, '_committed', True):
+        return
+    # Lê só o cabeçalho: recusa imagens que ocupariam centenas de MB de RAM
+    # ao serem decodificadas, antes de elas chegarem ao worker.
+    width, height = image.width, image.height
+    if width and height and width * height > max_image_pixels():
+        raise ValidationError(
+            f'Imagem muito grande ({width}x{height}). Envie uma imagem com '
+            f'no máximo {max_image_pixels() // 1_000_000} megapixels.'
+        )
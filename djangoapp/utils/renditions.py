@@ -0,0 +1,191 @@
+"""
+Versões responsivas (renditions) das imagens enviadas.
+
+Para cada imagem são geradas algumas larguras (``RENDITION_WIDTHS``) em
+WebP e em um formato de reserva (JPEG, ou PNG para imagens com
+transparência), gravadas em ``MEDIA_ROOT/renditions/<nome da imagem>/``.
+Um ``manifest.json`` na mesma pasta registra o que foi gerado e a
+impressão digital (tamanho + mtime) do arquivo original: enquanto o
+original não mudar, ``generate_renditions`` só devolve o manifesto.
+
+O manifesto também é guardado no model (ex.: ``Post.cover_renditions``)
+para os templates montarem o ``srcset`` sem ler o disco (``Picture``).
+"""
+
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image  # type: ignore
+
+from utils.images import check_dimensions, open_reduced, oriented_size
+
+RENDITION_WIDTHS = (320, 480, 800, 1200)
+RENDITIONS_DIR = 'renditions'
+MANIFEST_NAME = 'manifest.json'
+
+# Largura usada no 'src' para navegadores sem suporte a srcset
+DEFAULT_WIDTH = 800
+
+WEBP_QUALITY = 75
+JPEG_QUALITY = 70
+
+
+def rendition_dir(name):
+    """
+    Pasta (relativa ao MEDIA_ROOT) das renditions de uma imagem.
+    """
+    return f'{RENDITIONS_DIR}/{Path(name).with_suffix("").as_posix()}'
+
+
+def _fingerprint(path):
+    stat = path.stat()
+    return f'{stat.st_size}-{stat.st_mtime_ns}'
+
+
+def _target_widths(source_width, widths):
+    # Nunca amplia: larguras maiores que a original viram a própria original
+    targets = {width for width in widths if width < source_width}
+    targets.add(min(source_width, max(widths)))
+    return sorted(targets)
+
+
+def _save_atomic(image, path, **save_kwargs):
+    tmp_path = path.with_name(f'.tmp-{path.name}')
+    image.save(tmp_path, **save_kwargs)
+    os.replace(tmp_path, path)
+
+
+def read_manifest(name):
+    path = Path(settings.MEDIA_ROOT) / rendition_dir(name) / MANIFEST_NAME
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def generate_renditions(image_django, widths=RENDITION_WIDTHS, force=False):
+    """
+    Gera (ou reaproveita) as renditions de uma imagem.
+
+    Args:
+        image_django: FieldFile da imagem original (ou o nome do arquivo,
+            relativo ao MEDIA_ROOT)
+        widths: Larguras desejadas, em pixels
+        force: Gera de novo mesmo com o manifesto em dia
+
+    Returns:
+        dict | None: O manifesto, ou None se o arquivo não existir
+    """
+    name = getattr(image_django, 'name', image_django)
+    source = Path(settings.MEDIA_ROOT) / name
+    out_dir = Path(settings.MEDIA_ROOT) / rendition_dir(name)
+    widths = sorted(widths)
+
+    try:
+        fingerprint = _fingerprint(source)
+    except FileNotFoundError:
+        return None
+
+    manifest = read_manifest(name)
+    if (not force and manifest and manifest['fingerprint'] == fingerprint
+            and manifest['widths'] == widths):
+        return manifest
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    base = rendition_dir(name)
+
+    # Só o cabeçalho: recusa imagens gigantes e descobre o tamanho real
+    with Image.open(source) as header:
+        check_dimensions(header)
+        source_width, source_height = oriented_size(header)
+    targets = _target_widths(source_width, widths)
+
+    # Decodifica já reduzida para a maior rendition (draft/reduce), sem
+    # metadados e com a rotação do EXIF aplicada
+    img, _ = open_reduced(source, targets[-1])
+    has_alpha = 'A' in img.getbands()
+    fallback_ext = 'png' if has_alpha else 'jpg'
+    img = img.convert('RGBA' if has_alpha else 'RGB')
+
+    renditions = []
+    for width in targets:
+        height = round(width * source_height / source_width)
+        resized = img if img.size == (width, height) else img.resize(
+            (width, height), Image.LANCZOS, reducing_gap=3.0)
+
+        _save_atomic(resized, out_dir / f'{width}.webp', format='WEBP',
+                     quality=WEBP_QUALITY, method=4)
+        if fallback_ext == 'png':
+            _save_atomic(resized, out_dir / f'{width}.png', format='PNG',
+                         optimize=True)
+        else:
+            _save_atomic(resized, out_dir / f'{width}.jpg', format='JPEG',
+                         quality=JPEG_QUALITY, optimize=True,
+                         progressive=True)
+
+        renditions.append({
+            'width': width,
+            'height': height,
+            'webp': f'{base}/{width}.webp',
+            'fallback': f'{base}/{width}.{fallback_ext}',
+        })
+
+    manifest = {
+        'source': name,
+        'fingerprint': fingerprint,
+        'widths': widths,
+        'width': source_width,
+        'height': source_height,
+        'renditions': renditions,
+    }
+    tmp_manifest = out_dir / f'.tmp-{MANIFEST_NAME}'
+    tmp_manifest.write_text(json.dumps(manifest))
+    os.replace(tmp_manifest, out_dir / MANIFEST_NAME)
+    return manifest
+
+
+class Picture:
+    """
+    Dados para o ``<picture>`` de uma imagem: ``srcset`` em WebP e no
+    formato de reserva, ``src`` padrão e dimensões.
+
+    Sem renditions prontas (ou de outra imagem), usa a original.
+    """
+
+    def __init__(self, image_django, manifest=None):
+        self.image = image_django
+        manifest = manifest or {}
+        if manifest.get('source') != image_django.name:
+            manifest = {}
+        self.renditions = manifest.get('renditions', [])
+        self.width = manifest.get('width')
+        self.height = manifest.get('height')
+
+    def __bool__(self):
+        return bool(self.image)
+
+    def _srcset(self, key):
+        return ', '.join(
+            f'{default_storage.url(item[key])} {item["width"]}w'
+            for item in self.renditions
+        )
+
+    @property
+    def webp_srcset(self):
+        return self._srcset('webp')
+
+    @property
+    def fallback_srcset(self):
+        return self._srcset('fallback')
+
+    @property
+    def src(self):
+        if not self.renditions:
+            return self.image.url
+        candidates = [
+            item for item in self.renditions if item['width'] <= DEFAULT_WIDTH
+        ] or self.renditions[:1]
+        return default_storage.url(candidates[-1]['fallback'])
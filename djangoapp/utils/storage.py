@@ -0,0 +1,63 @@
+"""
+Storage endereçado pelo conteúdo para as imagens enviadas.
+
+O nome do arquivo vira o SHA-256 dos bytes enviados, dentro da pasta do
+``upload_to`` (só o primeiro nível, ex.: ``posts/ab/abcd….jpg``). Enviar
+de novo o mesmo arquivo não grava nada: o campo recebe o nome do que já
+existe, e com ele as renditions e o resize já feitos.
+
+O hash é o do arquivo como foi enviado, mesmo que depois ele seja
+reduzido no lugar (anexos): um novo envio da mesma foto reaproveita a
+versão já processada.
+
+Como um arquivo pode ser usado por vários objetos, ele só é apagado
+quando ninguém mais o usa (contagem de referências em jobs/files.py).
+"""
+
+import hashlib
+import os
+import uuid
+from pathlib import PurePosixPath
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible(path='utils.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+
+    def content_name(self, name, content):
+        """
+        Nome final do arquivo: pasta do upload_to + hash + extensão.
+        """
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+
+        path = PurePosixPath(name)
+        folder = path.parts[0] if len(path.parts) > 1 else ''
+        digest = digest.hexdigest()
+        hashed = f'{digest[:2]}/{digest}{path.suffix.lower()}'
+        return f'{folder}/{hashed}' if folder else hashed
+
+    def get_available_name(self, name, max_length=None):
+        # Sem sufixos aleatórios: o nome final é decidido pelo conteúdo
+        return name
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+
+        # Grava com outro nome e só então troca: quem encontrar o arquivo
+        # pelo hash nunca vê um arquivo pela metade
+        folder, filename = os.path.split(name)
+        tmp_name = super()._save(
+            os.path.join(folder, f'.tmp-{uuid.uuid4().hex}-{filename}'),
+            content)
+        os.replace(self.path(tmp_name), self.path(name))
+        return name